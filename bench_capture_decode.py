@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Bulk Speed/Gear Decode Benchmark
+
+Builds an hour of synthetic bus traffic (default 2000 frames/s: the T6 and
+T7 speed and gear frames every 10-100 ms plus filler IDs) and decodes both
+vehicles' signals:
+
+- per message: can.Message per frame through decode_vw_t6_message and
+  VWT7MessageDecoder, as the live tools do. Timed on --sample frames and
+  extrapolated to the hour.
+- vectorized: capture_decode.decode_frames over the whole frame array
+- capture file: capture_decode.decode_capture on the same hour written to
+  a temporary capture file with its index
+
+Usage:
+    python3 bench_capture_decode.py
+    python3 bench_capture_decode.py --rate 8000 --sample 500000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import can
+import numpy as np
+
+from can_capture import CAPTURE_DTYPE, INDEX_SUFFIX, CaptureWriter, CaptureReader
+from capture_decode import decode_frames, decode_capture
+from decode_vwt7_messages import VWT7MessageDecoder
+from message_generators import get_message_generator
+from pcan_reader import decode_vw_t6_message
+from signal_db import get_vehicle_signals
+
+FILLER_IDS = [0x086, 0x0A8, 0x101, 0x121, 0x187, 0x280, 0x288, 0x320, 0x520, 0x7E8]
+
+def hour_of_traffic(rate: float, duration: float) -> np.ndarray:
+    rng = np.random.default_rng(3)
+    n = int(rate * duration)
+    frames = np.zeros(n, dtype=CAPTURE_DTYPE)
+    frames["timestamp"] = 1700000000.0 + np.arange(n) / rate
+    frames["dlc"] = 8
+    frames["can_id"] = rng.choice(FILLER_IDS, n)
+    frames["data"] = rng.integers(0, 256, (n, 8))
+    speed = (np.sin(np.arange(n) / n * 40) * 60 + 70).astype(int)  # km/h profile
+    slot = np.arange(n) % 40
+    for vehicle, speed_slots, gear_slot in (("VWT6", (0, 20), 10), ("VWT7", (5, 25), 30)):
+        generator = get_message_generator(vehicle)
+        for s in speed_slots:
+            rows = np.flatnonzero(slot == s)
+            table = np.array([list(generator.generate_speed_message(v)) for v in range(256)], dtype=np.uint8)
+            frames["can_id"][rows] = generator.SPEED_MSG_ID
+            frames["data"][rows] = table[speed[rows]]
+        rows = np.flatnonzero(slot == gear_slot)
+        gears = np.array([list(generator.generate_gear_message(g)) for g in ("PARK", "DRIVE")], dtype=np.uint8)
+        frames["can_id"][rows] = generator.GEAR_MSG_ID
+        frames["data"][rows] = gears[(speed[rows] > 15).astype(int)]
+    return frames
+
+def per_message(frames: np.ndarray) -> int:
+    """The live tools' path: one can.Message and one decoder call per frame"""
+    t7 = VWT7MessageDecoder()
+    decoded = 0
+    for frame in frames:
+        msg = can.Message(timestamp=float(frame["timestamp"]), arbitration_id=int(frame["can_id"]),
+                          is_extended_id=False, data=bytes(frame["data"][:frame["dlc"]]))
+        if decode_vw_t6_message(msg):
+            decoded += 1
+        elif msg.arbitration_id == t7.SPEED_MSG_ID:
+            t7.decode_speed_message(msg.data)
+            decoded += 1
+        elif msg.arbitration_id == t7.GEAR_MSG_ID:
+            t7.decode_gear_message(msg.data)
+            decoded += 1
+    return decoded
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized speed/gear decoding")
+    parser.add_argument("--rate", type=float, default=2000.0, help="Frames per second (default: 2000)")
+    parser.add_argument("--duration", type=float, default=3600.0, help="Seconds of traffic (default: 3600)")
+    parser.add_argument("--sample", type=int, default=200000,
+                        help="Frames timed through the per-message decoders (default: 200000)")
+    args = parser.parse_args()
+
+    print("🚗 Bulk Speed/Gear Decode Benchmark")
+    print("=" * 60)
+    frames = hour_of_traffic(args.rate, args.duration)
+    print(f"{len(frames)} frames ({args.duration:g} s at {args.rate:g}/s)")
+    print()
+
+    sample = frames[:args.sample]
+    start = time.perf_counter()
+    per_message(sample)
+    per_frame = (time.perf_counter() - start) / len(sample)
+    scalar_total = per_frame * len(frames)
+    print(f"Per message: {per_frame * 1e6:.2f} µs/frame -> {scalar_total:.1f} s for all frames (extrapolated)")
+
+    total = 0.0
+    for vehicle in ("VWT6", "VWT7"):
+        start = time.perf_counter()
+        signals = decode_frames(frames, get_vehicle_signals(vehicle))
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        print(f"Vectorized {vehicle}: {len(signals.speed)} speed + {len(signals.gear)} gear samples "
+              f"in {elapsed * 1000:.1f} ms")
+    print(f"Vectorized total: {total * 1000:.1f} ms ({scalar_total / total:.0f}x)")
+
+    path = os.path.join(tempfile.gettempdir(), f"bench-decode-{os.getpid()}.cancap")
+    try:
+        with CaptureWriter(path, start_time=float(frames["timestamp"][0])) as writer:
+            writer.write_frames(frames)
+        capture = CaptureReader(path)
+        start = time.perf_counter()
+        for vehicle in ("VWT6", "VWT7"):
+            decode_capture(capture, vehicle)
+        elapsed = time.perf_counter() - start
+        print(f"Capture file (indexed), both vehicles: {elapsed * 1000:.1f} ms")
+        start = time.perf_counter()
+        decode_capture(capture, "VWT6", start=120, end=180)
+        print(f"Capture file, VWT6 120-180 s: {(time.perf_counter() - start) * 1000:.2f} ms")
+        del capture
+    finally:
+        for leftover in (path, path + INDEX_SUFFIX):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+CAN Capture Index Benchmark
+
+Writes a synthetic capture (default 100M frames at 8000 frames/s, about
+3.5 hours and 2.4 GB, 20 IDs with bus-like rates), builds its sidecar index
+and runs the same queries through the index and as a full chunked scan:
+
+- all frames of a slow ID (0x3DC)
+- 0x1A0 between t=120 s and t=180 s
+- 0x1A0 in a one-minute window near the end of the capture
+- everything within a 10 s window
+
+Every query opens a fresh CaptureReader, so its memory maps start empty;
+"pages" is the growth of the process's resident file-backed memory
+(RssFile in /proc/self/status) during the query, in 4 KiB pages, i.e. how
+much of the capture and index it touched (an upper bound: the kernel maps
+page cache in folios of up to 2 MiB, so each binary search probe into the
+index can count for more than one page). The capture is in the page cache
+after being written, so times are warm-cache times; on a cold cache the
+scan additionally pays for reading every page from disk.
+
+Usage:
+    python3 bench_capture_index.py
+    python3 bench_capture_index.py --frames 10000000 --keep /tmp/bench.cancap
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+from can_capture import CAPTURE_DTYPE, INDEX_SUFFIX, CaptureWriter, CaptureReader, build_index
+
+# (CAN ID, relative rate): the T6/T7 speed and gear frames plus filler traffic
+BUS_IDS = [(0x1A0, 10), (0x0FD, 10), (0x440, 5), (0x3DC, 1), (0x086, 10), (0x0A8, 10), (0x101, 5),
+           (0x121, 5), (0x187, 5), (0x1AB, 5), (0x280, 10), (0x288, 5), (0x2C1, 2), (0x320, 2),
+           (0x3C0, 1), (0x470, 1), (0x520, 1), (0x5A0, 1), (0x65F, 1), (0x7E8, 1)]
+
+def resident_file_kb() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssFile:"):
+                return int(line.split()[1])
+    return 0
+
+def write_capture(path: str, frames: int, rate: float, chunk: int = 1 << 22) -> float:
+    """Synthetic capture: IDs drawn by rate, evenly spaced timestamps with jitter"""
+    rng = np.random.default_rng(7)
+    ids = np.array([can_id for can_id, _ in BUS_IDS], dtype=np.uint32)
+    weights = np.array([weight for _, weight in BUS_IDS], dtype=float)
+    weights /= weights.sum()
+    start_time = 1700000000.0
+    started = time.perf_counter()
+    with CaptureWriter(path, start_time=start_time, index=False) as writer:
+        for offset in range(0, frames, chunk):
+            n = min(chunk, frames - offset)
+            block = np.zeros(n, dtype=CAPTURE_DTYPE)
+            block["timestamp"] = (start_time + (np.arange(offset, offset + n) + rng.uniform(0, 0.5, n)) / rate)
+            block["can_id"] = ids[rng.choice(len(ids), n, p=weights)]
+            block["dlc"] = 8
+            block["data"][:, 0] = np.arange(offset, offset + n) & 0xFF
+            writer.write_frames(block)
+    return time.perf_counter() - started
+
+def timed_query(path: str, use_index: bool, **query):
+    reader = CaptureReader(path, use_index=use_index)
+    before = resident_file_kb()
+    start = time.perf_counter()
+    frames = reader.select(**query)
+    elapsed = time.perf_counter() - start
+    pages = max(resident_file_kb() - before, 0) // 4
+    del reader
+    return frames, elapsed, pages
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed capture queries against a full scan")
+    parser.add_argument("--frames", type=int, default=100_000_000, help="Frames to generate (default: 100M)")
+    parser.add_argument("--rate", type=float, default=8000.0, help="Frames per second (default: 8000)")
+    parser.add_argument("--keep", metavar="FILE", help="Write the capture here and keep it (default: temp file)")
+    args = parser.parse_args()
+
+    path = args.keep or os.path.join(tempfile.gettempdir(), f"bench-{os.getpid()}.cancap")
+    print("🗂️  CAN Capture Index Benchmark")
+    print("=" * 60)
+    try:
+        elapsed = write_capture(path, args.frames, args.rate)
+        size = os.path.getsize(path)
+        duration = args.frames / args.rate
+        print(f"Capture: {args.frames} frames, {duration:.0f} s, {size / 1e9:.2f} GB, written in {elapsed:.1f} s")
+
+        start = time.perf_counter()
+        build_index(path)
+        print(f"Index:   {os.path.getsize(path + INDEX_SUFFIX) / 1e6:.0f} MB, "
+              f"built in {time.perf_counter() - start:.1f} s")
+        print()
+
+        late = max(duration - 600.0, 0.0)
+        queries = [
+            ("0x3DC, whole capture", dict(ids=[0x3DC])),
+            ("0x1A0, 120-180 s", dict(ids=[0x1A0], start=120.0, end=180.0)),
+            (f"0x1A0, {late:.0f}-{late + 60:.0f} s", dict(ids=[0x1A0], start=late, end=late + 60.0)),
+            ("all IDs, 1000-1010 s", dict(start=1000.0, end=1010.0)),
+        ]
+        print(f"{'Query':24} | {'frames':>9} | {'index':>9} | {'pages':>7} | {'scan':>9} | {'pages':>7} | "
+              f"{'speedup':>7}")
+        print("-" * 90)
+        for name, query in queries:
+            indexed, index_time, index_pages = timed_query(path, True, **query)
+            scanned, scan_time, scan_pages = timed_query(path, False, **query)
+            if not np.array_equal(indexed, scanned):
+                print(f"❌ {name}: index and scan disagree")
+                return 1
+            print(f"{name:24} | {len(indexed):9d} | {index_time * 1000:7.1f}ms | {index_pages:7d} | "
+                  f"{scan_time * 1000:7.0f}ms | {scan_pages:7d} | {scan_time / index_time:6.0f}x")
+        print("\n✅ Index and scan results identical")
+        return 0
+    finally:
+        if not args.keep:
+            for leftover in (path, path + INDEX_SUFFIX):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Device Log Filter Benchmark
+
+Writes the same synthetic soak log twice, as plain text (what a serial
+capture gives you) and as a binary device log (DeviceLogDemux), and then
+times two queries (one tag; warnings and errors only), each returning
+DeviceLogRecord tuples:
+- text: regex scan over every line, parsing the matches
+- binary: DeviceLogReader filtering the fixed-size index, reading only the
+  matching messages
+
+Usage:
+    python3 bench_device_log.py
+    python3 bench_device_log.py --lines 2000000 --tag VWT6Gen
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+
+from device_log import BinaryLogWriter, DeviceLogReader, parse_log_line
+
+TAGS = ["CarCan", "SerialCmd", "VWT6Gen", "VWT7Gen", "MsgGenFactory", "GUI"]
+
+def synthetic_line(i: int) -> bytes:
+    tag = TAGS[i % 7 % len(TAGS)]
+    level = "W" if i % 97 == 0 else "I"
+    return f"{level} ({i * 10}) {tag}: Sent frame 0x1A0 speed={i % 250} km/h seq={i}".encode()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tag filtering on device logs")
+    parser.add_argument("--lines", type=int, default=500000, help="Log lines to generate (default: 500000)")
+    parser.add_argument("--tag", default="MsgGenFactory", help="Tag to extract (default: MsgGenFactory)")
+    args = parser.parse_args()
+
+    print("🔎 Device Log Filter Benchmark")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, "soak.log")
+        binary_path = os.path.join(tmp, "soak.esplog")
+
+        writer = BinaryLogWriter(binary_path)
+        with open(text_path, "wb") as text:
+            for i in range(args.lines):
+                line = synthetic_line(i)
+                text.write(line + b"\n")
+                writer.write(parse_log_line(line, host_time=float(i)))
+        writer.close()
+
+        tag_pattern = re.compile(rb'[EWIDV] \(\d+\) ' + re.escape(args.tag.encode()) + rb': ')
+        level_pattern = re.compile(rb'[EW] \(\d+\) ')
+        queries = [
+            (f"tag {args.tag}", tag_pattern, {"tags": {args.tag}}),
+            ("level >= W", level_pattern, {"min_level": "W"}),
+        ]
+
+        results = []
+        for name, pattern, filters in queries:
+            start = time.perf_counter()
+            with open(text_path, "rb") as text:
+                text_hits = [parse_log_line(line.rstrip(b"\n"), 0.0) for line in text if pattern.match(line)]
+            text_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            binary_hits = list(DeviceLogReader(binary_path).records(**filters))
+            binary_time = time.perf_counter() - start
+
+            if len(text_hits) != len(binary_hits):
+                raise RuntimeError(f"{name}: text {len(text_hits)} vs binary {len(binary_hits)} matches")
+            results.append((name, len(text_hits), text_time, binary_time))
+
+        binary_size = os.path.getsize(binary_path) + os.path.getsize(binary_path + ".msg")
+        print(f"Lines: {args.lines}")
+        print(f"Text log:   {os.path.getsize(text_path) / 1e6:8.1f} MB")
+        print(f"Binary log: {binary_size / 1e6:8.1f} MB (index {os.path.getsize(binary_path) / 1e6:.1f} MB)")
+        print()
+
+    print(f"{'Query':20} | {'matches':>8} | {'text (s)':>8} | {'binary (s)':>10} | {'speedup':>7}")
+    print("-" * 66)
+    for name, hits, text_time, binary_time in results:
+        print(f"{name:20} | {hits:8d} | {text_time:8.3f} | {binary_time:10.3f} | {text_time / binary_time:6.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
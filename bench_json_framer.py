@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+JSON Framer Microbenchmark
+
+Feeds megabytes of interleaved ESP_LOG text and pretty-printed JSON
+(cJSON_Print format) through the legacy _read_responses buffer loop and the
+incremental JsonFramer, split into serial-read sized chunks, and reports
+throughput and the number of frames recovered by each.
+
+Usage:
+    python3 bench_json_framer.py
+    python3 bench_json_framer.py --megabytes 8 --max-chunk 64
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from typing import List
+
+from json_framer import JsonFramer
+from esp32_emulator import cjson_print
+
+def build_stream(megabytes: float, seed: int = 1) -> bytes:
+    """Generate interleaved ESP_LOG lines and JSON responses"""
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    parts: List[bytes] = []
+    size = 0
+    tick = 0
+    tags = ["CarCan", "SerialCmd", "VWT6Gen", "MsgGenFactory"]
+    while size < target:
+        tick += rng.randint(1, 50)
+        roll = rng.random()
+        if roll < 0.6:
+            tag = rng.choice(tags)
+            text = f"\x1b[0;32mI ({tick}) {tag}: T6 Speed FULL: [{' '.join('%02X' % rng.randint(0, 255) for _ in range(8))}]\x1b[0m\n"
+        elif roll < 0.9:
+            text = cjson_print({
+                "type": "status_update", "vehicle": "VWT6", "gear": "DRIVE",
+                "speed": rng.randint(0, 250), "can_active": True, "uptime": tick // 1000,
+                "firmware_version": "1.0.0", "timestamp": tick,
+            }) + "\n"
+        else:
+            # Large multi-line response with strings containing braces
+            text = cjson_print({
+                "type": "response", "status": "ok", "command": "get_supported_vehicles",
+                "timestamp": tick, "note": "brace } inside { string \\\" escaped",
+                "vehicles": ["VWT5", "VWT6", "VWT61", "VWT7", "MB_SPRINTER"] * 40,
+            }) + "\n"
+        data = text.encode('utf-8')
+        parts.append(data)
+        size += len(data)
+    return b"".join(parts)
+
+def split_chunks(stream: bytes, max_chunk: int, seed: int = 2) -> List[bytes]:
+    rng = random.Random(seed)
+    chunks = []
+    pos = 0
+    while pos < len(stream):
+        n = rng.randint(1, max_chunk)
+        chunks.append(stream[pos:pos + n])
+        pos += n
+    return chunks
+
+def legacy_frames(chunks: List[bytes]) -> int:
+    """The pre-JsonFramer _read_responses buffer loop (printing removed)"""
+    buffer = ""
+    frames = 0
+    for chunk in chunks:
+        data = chunk.decode('utf-8', errors='ignore')
+        ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
+        buffer += ansi_escape.sub('', data)
+        while buffer:
+            json_start = buffer.find('{')
+            if json_start == -1:
+                lines = buffer.split('\n')
+                buffer = lines[-1]
+                break
+            if json_start > 0:
+                buffer = buffer[json_start:]
+            brace_count = 0
+            json_end = -1
+            for i, char in enumerate(buffer):
+                if char == '{':
+                    brace_count += 1
+                elif char == '}':
+                    brace_count -= 1
+                    if brace_count == 0:
+                        json_end = i
+                        break
+            if json_end == -1:
+                break
+            json_str = buffer[:json_end + 1]
+            buffer = buffer[json_end + 1:]
+            ''.join(line.strip() for line in json_str.split('\n'))
+            frames += 1
+    return frames
+
+def framer_frames(chunks: List[bytes]) -> int:
+    framer = JsonFramer()
+    frames = 0
+    for chunk in chunks:
+        for kind, payload in framer.feed(chunk):
+            if kind == JsonFramer.JSON:
+                frames += 1
+    return frames
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial stream JSON framing")
+    parser.add_argument("--megabytes", type=float, default=4.0, help="Size of generated stream (default: 4)")
+    parser.add_argument("--max-chunk", type=int, default=256, help="Maximum bytes per simulated read (default: 256)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only benchmark JsonFramer")
+    args = parser.parse_args()
+
+    print("🧮 JSON Framer Microbenchmark")
+    print("=" * 60)
+    stream = build_stream(args.megabytes)
+    chunks = split_chunks(stream, args.max_chunk)
+    expected = stream.count(b'{\n')
+    print(f"Stream: {len(stream) / 1024 / 1024:.2f} MB in {len(chunks)} chunks, {expected} JSON objects")
+    print()
+
+    runs = [("JsonFramer", framer_frames)]
+    if not args.skip_legacy:
+        runs.insert(0, ("legacy loop", legacy_frames))
+
+    print(f"{'Implementation':14} | {'time (s)':>9} | {'MB/s':>8} | {'frames':>8}")
+    print("-" * 50)
+    for name, func in runs:
+        start = time.perf_counter()
+        frames = func(chunks)
+        elapsed = time.perf_counter() - start
+        print(f"{name:14} | {elapsed:9.3f} | {len(stream) / 1024 / 1024 / elapsed:8.2f} | {frames:8d}")
+
+    # Sanity check: every frame must parse
+    framer = JsonFramer()
+    for chunk in chunks:
+        for kind, payload in framer.feed(chunk):
+            if kind == JsonFramer.JSON:
+                json.loads(payload)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+CAN Capture Throughput Benchmark
+
+Floods a python-can virtual bus at a fixed frame rate and captures it two
+ways:
+- legacy: the old pcan_reader loop (recv, pad, per-byte f-strings, print
+  per frame, line buffered like a terminal)
+- engine: pcan_reader.CaptureEngine (receive thread into a ring buffer,
+  batched formatting, one buffered write per batch)
+
+Lines go to /dev/null through a writer that blocks for --write-latency per
+write() call, standing in for a terminal (0 measures pure CPU cost). The
+capture side's receive queue is bounded (--rx-queue) like a driver queue,
+so a consumer that falls behind loses frames. Every frame carries a
+sequence number; frames sent but never captured count as dropped. CPU is
+per thread (time.thread_time) and is given as a percentage of one core.
+
+Usage:
+    python3 bench_pcan_capture.py
+    python3 bench_pcan_capture.py --rate 8000 --duration 10 --decode-t6
+    python3 bench_pcan_capture.py --write-latency 0        # CPU cost only
+"""
+
+import io
+import os
+import sys
+import time
+import struct
+import argparse
+import threading
+
+import can
+
+from pcan_reader import CaptureEngine, decode_vw_t6_message
+
+class SlowSink(io.RawIOBase):
+    """/dev/null that blocks for latency seconds per write, like a terminal"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.writes = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.writes += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return len(data)
+
+class Flood:
+    """Sends rate frames per second with sequence numbers, on an absolute schedule"""
+
+    def __init__(self, bus: can.BusABC, rate: int, duration: float):
+        self.bus = bus
+        self.rate = rate
+        self.duration = duration
+        self.attempted = 0
+        self.queue_full = 0
+        self.cpu = 0.0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        ids = [0x1A0, 0x440, 0x0FD, 0x3DC, 0x123]
+        total = int(self.rate * self.duration)
+        start = time.perf_counter()
+        for seq in range(total):
+            due = start + seq / self.rate
+            delay = due - time.perf_counter()
+            if delay > 0.001:
+                time.sleep(delay)
+            msg = can.Message(arbitration_id=ids[seq % len(ids)], is_extended_id=False,
+                              data=struct.pack('<IHBB', seq, seq % 250 * 200, 0x50, 0))
+            self.attempted += 1
+            try:
+                self.bus.send(msg)
+            except can.CanOperationError:
+                self.queue_full += 1  # Receive queue full: lost at the "driver"
+        self.cpu = time.thread_time()
+
+def legacy_capture(bus: can.BusABC, output, stop: threading.Event, decode_t6: bool, result: dict):
+    """The original pcan_reader receive/print loop"""
+    start_time = time.time()
+    message_count = 0
+    while not stop.is_set():
+        message = bus.recv(timeout=0.1)
+        if message is None:
+            continue
+        message_count += 1
+        elapsed = time.time() - start_time
+        data_bytes = list(message.data) + [None] * (8 - len(message.data))
+        data_str = ' '.join(f'{b:02X}' if b is not None else '--' for b in data_bytes)
+        decoded = ""
+        if decode_t6:
+            decoded_msg = decode_vw_t6_message(message)
+            if decoded_msg:
+                decoded = f" | {decoded_msg}"
+        print(f"{elapsed:8.3f}s | 0x{message.arbitration_id:03X} | {message.dlc}   | {data_str:<31}{decoded}",
+              file=output)
+    result["captured"] = message_count
+    result["cpu"] = time.thread_time()
+
+def run(mode: str, args) -> dict:
+    channel = f"bench-{mode}"
+    sender = can.Bus(interface="virtual", channel=channel)
+    receiver = can.Bus(interface="virtual", channel=channel, rx_queue_size=args.rx_queue)
+    flood = Flood(sender, args.rate, args.duration)
+    result = {"mode": mode}
+    # Line buffered for the legacy loop (like a terminal), block buffered for the engine
+    sink = SlowSink(args.write_latency)
+    output = io.TextIOWrapper(io.BufferedWriter(sink, 1 << 16), line_buffering=(mode == "legacy"))
+    try:
+        start = time.perf_counter()
+        if mode == "legacy":
+            stop = threading.Event()
+            consumer = threading.Thread(target=legacy_capture,
+                                        args=(receiver, output, stop, args.decode_t6, result))
+            consumer.start()
+            flood.thread.start()
+            flood.thread.join()
+            time.sleep(args.drain)
+            stop.set()
+            consumer.join()
+        else:
+            engine = CaptureEngine(receiver, output, decode_t6=args.decode_t6)
+            engine.start()
+            flood.thread.start()
+            flood.thread.join()
+            time.sleep(args.drain)
+            stats = engine.stop()
+            result["captured"] = stats.written
+            result["overruns"] = stats.overruns
+            result["cpu"] = stats.recv_cpu + stats.format_cpu
+            result["recv_cpu"] = stats.recv_cpu
+            result["format_cpu"] = stats.format_cpu
+        wall = time.perf_counter() - start
+    finally:
+        output.close()
+        sender.shutdown()
+        receiver.shutdown()
+
+    result["attempted"] = flood.attempted
+    result["queue_full"] = flood.queue_full
+    result["dropped"] = flood.attempted - result["captured"]
+    result["wall"] = wall
+    result["sender_cpu"] = flood.cpu
+    result["writes"] = sink.writes
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CAN capture against a flooded virtual bus")
+    parser.add_argument("--rate", type=int, default=8000, help="Frames per second (default: 8000)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Flood duration in seconds (default: 5)")
+    parser.add_argument("--rx-queue", type=int, default=4096,
+                        help="Receive queue size in frames, like a driver queue (default: 4096)")
+    parser.add_argument("--drain", type=float, default=0.5,
+                        help="Seconds the consumer may catch up after the flood (default: 0.5)")
+    parser.add_argument("--write-latency", type=float, default=0.0001,
+                        help="Seconds each output write() blocks, like a terminal (default: 0.0001)")
+    parser.add_argument("--decode-t6", action="store_true", help="Also decode VW T6 frames")
+    args = parser.parse_args()
+
+    print("📡 CAN Capture Throughput Benchmark")
+    print("=" * 60)
+    print(f"{args.rate} frames/s for {args.duration:g} s, receive queue {args.rx_queue} frames, "
+          f"{args.write_latency * 1e6:.0f} µs per write, {os.cpu_count()} CPU(s)")
+    print()
+
+    results = [run("legacy", args), run("engine", args)]
+
+    print(f"{'Mode':8} | {'sent':>7} | {'captured':>8} | {'dropped':>7} | {'drop %':>6} | "
+          f"{'capture CPU':>11} | {'sender CPU':>10} | {'writes':>6}")
+    print("-" * 87)
+    for r in results:
+        cpu_pct = r["cpu"] / r["wall"] * 100
+        print(f"{r['mode']:8} | {r['attempted']:7d} | {r['captured']:8d} | {r['dropped']:7d} | "
+              f"{r['dropped'] / r['attempted'] * 100:5.1f}% | {cpu_pct:10.1f}% | "
+              f"{r['sender_cpu'] / r['wall'] * 100:9.1f}% | {r['writes']:6d}")
+    engine = results[1]
+    print(f"\nEngine CPU split: receive {engine['recv_cpu'] / engine['wall'] * 100:.1f}%, "
+          f"format {engine['format_cpu'] / engine['wall'] * 100:.1f}%, "
+          f"ring overruns {engine['overruns']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+ESP32Controller Ping Latency Benchmark
+
+Measures ping round-trip latency (p50/p99) and idle CPU usage of the
+ESP32Controller background reader against the pty-backed ESP32Emulator,
+comparing the legacy in_waiting polling loop with the blocking reader.
+
+Usage:
+    python3 bench_ping_latency.py
+    python3 bench_ping_latency.py --pings 500 --modes blocking
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from typing import Dict
+
+from esp32_controller import ESP32Controller
+from esp32_emulator import ESP32Emulator
+
+def run_mode(mode: str, pings: int, idle_seconds: float) -> Dict[str, float]:
+    """Benchmark a single reader mode"""
+    with ESP32Emulator(log_commands=True) as emulator:
+        controller = ESP32Controller(emulator.port, reader_mode=mode)
+        if not controller.connect():
+            raise RuntimeError(f"Failed to connect to emulator on {emulator.port}")
+
+        try:
+            # Warm up
+            for _ in range(5):
+                controller.ping()
+
+            samples = []
+            failures = 0
+            for _ in range(pings):
+                start = time.perf_counter()
+                ok = controller.ping()
+                elapsed = time.perf_counter() - start
+                if ok:
+                    samples.append(elapsed * 1000.0)
+                else:
+                    failures += 1
+
+            # Idle CPU usage of the reader thread (whole process)
+            cpu_start = time.process_time()
+            time.sleep(idle_seconds)
+            idle_cpu = (time.process_time() - cpu_start) / idle_seconds * 100.0
+        finally:
+            controller.disconnect()
+
+    if len(samples) < 2:
+        raise RuntimeError(f"Fewer than two successful pings in mode '{mode}'")
+
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        'p50': cuts[49],
+        'p99': cuts[98],
+        'mean': statistics.mean(samples),
+        'failures': failures,
+        'idle_cpu': idle_cpu,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ESP32Controller ping latency")
+    parser.add_argument("--pings", type=int, default=200, help="Number of pings per mode (default: 200)")
+    parser.add_argument("--idle", type=float, default=2.0, help="Idle CPU measurement window in seconds (default: 2.0)")
+    parser.add_argument("--modes", nargs="+", default=["poll", "blocking"],
+                        choices=["poll", "blocking"], help="Reader modes to compare")
+    args = parser.parse_args()
+
+    print("⏱️  ESP32Controller Ping Latency Benchmark")
+    print("=" * 60)
+    print(f"Pings per mode: {args.pings}")
+    print()
+
+    results = {}
+    for mode in args.modes:
+        print(f"🔄 Running '{mode}' reader...")
+        results[mode] = run_mode(mode, args.pings, args.idle)
+
+    print()
+    print(f"{'Mode':10} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'mean (ms)':>9} | {'fail':>4} | {'idle CPU':>8}")
+    print("-" * 64)
+    for mode, r in results.items():
+        print(f"{mode:10} | {r['p50']:9.2f} | {r['p99']:9.2f} | {r['mean']:9.2f} | "
+              f"{r['failures']:4d} | {r['idle_cpu']:7.1f}%")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
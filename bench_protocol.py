@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Command Protocol Benchmark
+
+Compares JSON (pretty and compact) with the binary COBS/CRC protocol for a
+set_speed sweep against the pty-backed ESP32Emulator:
+- bytes per command on the wire (request + response + status update)
+- the resulting ceiling in commands per second on a serial link
+  (10 bits per byte on the wire)
+- commands per second the host stack reaches against the emulator
+
+ESP_LOG lines are disabled in the emulator so only protocol bytes are counted.
+
+Usage:
+    python3 bench_protocol.py
+    python3 bench_protocol.py --commands 2000 --baud 921600
+"""
+
+import sys
+import time
+import argparse
+from typing import Dict
+
+from esp32_controller import ESP32Controller
+from esp32_emulator import ESP32Emulator
+
+class CountingEmulator(ESP32Emulator):
+    """Emulator that counts the bytes it sends"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tx_bytes = 0
+
+    def _write_bytes(self, data: bytes):
+        self.tx_bytes += len(data)
+        super()._write_bytes(data)
+
+class CountingController(ESP32Controller):
+    """Controller that counts the bytes of the commands it sends"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tx_bytes = 0
+
+    def _encode_command(self, command, future, **kwargs):
+        request_id, data = super()._encode_command(command, future, **kwargs)
+        self.tx_bytes += len(data)
+        return request_id, data
+
+def run_format(compact: bool, protocol: str, commands: int) -> Dict[str, float]:
+    """Run a set_speed sweep in one wire format"""
+    with CountingEmulator(log_commands=False) as emulator:
+        controller = CountingController(emulator.port, compact=compact, protocol=protocol)
+        if not controller.connect():
+            raise RuntimeError(f"Failed to connect to emulator on {emulator.port}")
+        try:
+            if protocol == "binary" and not controller._binary:
+                raise RuntimeError("Binary protocol negotiation failed")
+            time.sleep(0.1)  # Let negotiation output drain before counting
+
+            emulator.tx_bytes = 0
+            controller.tx_bytes = 0
+            failures = 0
+            start = time.perf_counter()
+            for i in range(commands):
+                if not controller.set_speed(i % 251):
+                    failures += 1
+            elapsed = time.perf_counter() - start
+            time.sleep(0.1)  # Trailing status update
+        finally:
+            controller.disconnect()
+
+    return {
+        'request': controller.tx_bytes / commands,
+        'response': emulator.tx_bytes / commands,
+        'rate': commands / elapsed,
+        'failures': failures,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs binary command protocol")
+    parser.add_argument("--commands", type=int, default=500, help="set_speed commands per format (default: 500)")
+    parser.add_argument("--baud", type=int, default=115200, help="Serial baud rate (default: 115200)")
+    args = parser.parse_args()
+
+    link_bytes_per_s = args.baud / 10.0
+
+    print("📦 Command Protocol Benchmark")
+    print("=" * 78)
+    print(f"Link: {args.baud} baud ({link_bytes_per_s:.0f} bytes/s), {args.commands} set_speed commands per format")
+    print()
+
+    formats = [
+        ("pretty", False, "json"),
+        ("compact", True, "json"),
+        ("binary", False, "binary"),
+    ]
+
+    print(f"{'Format':8} | {'req B':>6} | {'resp B':>6} | {'link max/s':>10} | {'host cmd/s':>10} | {'fail':>4}")
+    print("-" * 60)
+    for name, compact, protocol in formats:
+        r = run_format(compact, protocol, args.commands)
+        # Full duplex: the busier direction limits the command rate
+        link_rate = link_bytes_per_s / max(r['request'], r['response'])
+        print(f"{name:8} | {r['request']:6.1f} | {r['response']:6.1f} | {link_rate:10.1f} | "
+              f"{r['rate']:10.0f} | {r['failures']:4d}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
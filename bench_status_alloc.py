@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Status Parsing Allocation Benchmark
+
+Measures, with tracemalloc, what turning one status_update frame into a
+status record costs:
+- dict: json.loads + a regular dataclass with a per-instance __dict__ (the
+  previous ESP32Status)
+- dict+tuple: json.loads + ESP32Status.from_response (binary protocol and
+  unexpected layouts still take this path)
+- direct: parse_status_frame, straight from the frame bytes
+
+For each path it reports the memory kept per status (retained), the
+temporary memory while parsing one frame (peak) and the parse time.
+
+Usage:
+    python3 bench_status_alloc.py
+    python3 bench_status_alloc.py --frames 100000 --compact
+"""
+
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, List, Any
+
+from esp32_controller import ESP32Status, parse_status_frame
+from esp32_emulator import cjson_print, cjson_print_unformatted
+from bench_status_throughput import status_frame
+
+@dataclass
+class DictStatus:
+    """ESP32Status as it was before: a plain dataclass"""
+    vehicle: str
+    gear: str
+    speed: int
+    can_active: bool
+    uptime: int
+    firmware_version: str = "unknown"
+
+def parse_dict(frame: bytes) -> DictStatus:
+    response = json.loads(frame)
+    return DictStatus(
+        vehicle=response.get('vehicle', 'unknown'),
+        gear=response.get('gear', 'unknown'),
+        speed=response.get('speed', 0),
+        can_active=response.get('can_active', False),
+        uptime=response.get('uptime', 0),
+        firmware_version=response.get('firmware_version', 'unknown')
+    )
+
+def parse_dict_tuple(frame: bytes) -> ESP32Status:
+    return ESP32Status.from_response(json.loads(frame))
+
+def measure(parse: Callable[[bytes], Any], frames: List[bytes]):
+    """(retained bytes per status, peak temporary bytes per frame, microseconds per frame)"""
+    # Warm up caches (interned strings, regex) outside the measurement
+    for frame in frames[:100]:
+        parse(frame)
+
+    start = time.perf_counter()
+    for frame in frames:
+        parse(frame)
+    elapsed_us = (time.perf_counter() - start) / len(frames) * 1e6
+
+    results: List[Any] = [None] * len(frames)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for i, frame in enumerate(frames):
+        results[i] = parse(frame)
+    retained = (tracemalloc.get_traced_memory()[0] - base) / len(frames)
+
+    peak = 0
+    for frame in frames[:1000]:
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        parse(frame)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+    return retained, peak, elapsed_us
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark status_update parsing allocations")
+    parser.add_argument("--frames", type=int, default=20000, help="Status frames to parse (default: 20000)")
+    parser.add_argument("--compact", action="store_true", help="Single-line frames instead of cJSON_Print")
+    args = parser.parse_args()
+
+    fmt = cjson_print_unformatted if args.compact else cjson_print
+    frames = [fmt(status_frame(i)).encode() for i in range(args.frames)]
+
+    print("🧮 Status Parsing Allocation Benchmark")
+    print("=" * 66)
+    print(f"Frames: {args.frames} ({'compact' if args.compact else 'pretty'}, {len(frames[0])} bytes)")
+    print()
+    print(f"{'Path':12} | {'retained B/status':>17} | {'peak B/frame':>12} | {'us/frame':>9}")
+    print("-" * 60)
+    for name, parse in [("dict", parse_dict), ("dict+tuple", parse_dict_tuple), ("direct", parse_status_frame)]:
+        retained, peak, elapsed_us = measure(parse, frames)
+        print(f"{name:12} | {retained:17.1f} | {peak:12d} | {elapsed_us:9.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Status Update Throughput Benchmark
+
+Compares pretty-printed (cJSON_Print) and compact (cJSON_PrintUnformatted)
+status_update frames:
+- bytes per frame and the resulting ceiling in status updates per second
+  on a 115200 baud link (10 bits per byte on the wire)
+- host-side framing + json.loads rate of JsonFramer in brace-matching mode
+  versus the single-line fast path
+
+Usage:
+    python3 bench_status_throughput.py
+    python3 bench_status_throughput.py --frames 50000 --baud 921600
+"""
+
+import sys
+import json
+import time
+import argparse
+
+from json_framer import JsonFramer
+from esp32_emulator import cjson_print, cjson_print_unformatted
+
+def status_frame(i: int) -> dict:
+    return {
+        "type": "status_update", "vehicle": "VWT7", "gear": "DRIVE",
+        "speed": i % 251, "can_active": True, "uptime": i // 10,
+        "firmware_version": "1.0.0", "timestamp": i * 100,
+    }
+
+def host_rate(stream: bytes, frames: int, single_line: bool, chunk: int = 64) -> float:
+    """Frames per second the host can frame and decode"""
+    framer = JsonFramer(single_line=single_line)
+    decoded = 0
+    start = time.perf_counter()
+    for pos in range(0, len(stream), chunk):
+        for kind, payload in framer.feed(stream[pos:pos + chunk]):
+            if kind == JsonFramer.JSON:
+                json.loads(payload)
+                decoded += 1
+    elapsed = time.perf_counter() - start
+    if decoded != frames:
+        raise RuntimeError(f"Decoded {decoded} of {frames} frames")
+    return decoded / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark status_update throughput")
+    parser.add_argument("--frames", type=int, default=20000, help="Status frames per format (default: 20000)")
+    parser.add_argument("--baud", type=int, default=115200, help="Serial baud rate (default: 115200)")
+    args = parser.parse_args()
+
+    link_bytes_per_s = args.baud / 10.0
+
+    print("📈 Status Update Throughput Benchmark")
+    print("=" * 70)
+    print(f"Link: {args.baud} baud ({link_bytes_per_s:.0f} bytes/s)")
+    print()
+
+    formats = [
+        ("pretty", cjson_print, False),
+        ("compact", cjson_print_unformatted, True),
+    ]
+
+    print(f"{'Format':8} | {'bytes/frame':>11} | {'link max/s':>10} | {'host max/s':>10} | {'updates/s':>9}")
+    print("-" * 62)
+    for name, formatter, single_line in formats:
+        stream = "".join(formatter(status_frame(i)) + "\n" for i in range(args.frames)).encode('utf-8')
+        bytes_per_frame = len(stream) / args.frames
+        link_rate = link_bytes_per_s / bytes_per_frame
+        parse_rate = host_rate(stream, args.frames, single_line)
+        print(f"{name:8} | {bytes_per_frame:11.1f} | {link_rate:10.1f} | {parse_rate:10.0f} | "
+              f"{min(link_rate, parse_rate):9.1f}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Binary framed protocol for the ESP32 serial command link
+
+Compact alternative to JSON for high-rate control (e.g. speed sweeps). It is
+implemented on the firmware side in main/BinaryProtocol.* and
+SerialCommandHandler. JSON stays available at all times: the firmware
+answers each request in the format it arrived in.
+
+Wire format (all integers little endian):
+
+    0x00 | COBS( type:u8 | seq:u16 | command:u8 | fields... | crc16:u16 ) | 0x00
+
+- type:    MSG_COMMAND, MSG_RESPONSE, MSG_ERROR, MSG_STATUS_UPDATE or MSG_SETPOINT_ACK
+- seq:     sequence number, echoed in the response (request correlation ID);
+           for setpoint commands the setpoint sequence number
+- command: command code (0 for status updates)
+- fields:  key:u8 followed by a value whose encoding is fixed per key
+- crc16:   CRC-16/CCITT-FALSE over everything before it
+
+COBS removes every 0x00 from the frame, so 0x00 only ever appears as a frame
+delimiter and ESP_LOG text can safely interleave with frames.
+
+Decoded messages are plain dicts with the same keys as the JSON protocol
+({"type": "response", "status": "ok", "command": "set_speed", "id": 7, ...}),
+so everything above the framing layer is shared.
+"""
+
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from json_framer import JsonFramer
+
+# Message types
+MSG_COMMAND = 0x01
+MSG_RESPONSE = 0x02
+MSG_ERROR = 0x03
+MSG_STATUS_UPDATE = 0x04
+MSG_SETPOINT_ACK = 0x05
+
+MESSAGE_TYPES = {
+    MSG_COMMAND: "command",
+    MSG_RESPONSE: "response",
+    MSG_ERROR: "error",
+    MSG_STATUS_UPDATE: "status_update",
+    MSG_SETPOINT_ACK: "setpoint_ack",
+}
+
+# Command codes (must match main/BinaryProtocol.h)
+COMMANDS = {
+    "ping": 0x01,
+    "get_status": 0x02,
+    "set_vehicle": 0x03,
+    "set_gear": 0x04,
+    "set_speed": 0x05,
+    "set_can_active": 0x06,
+    "get_supported_vehicles": 0x07,
+    "reset_settings": 0x08,
+    "set_state": 0x09,
+    "set_format": 0x0A,
+    "set_protocol": 0x0B,
+    "setpoint": 0x0C,
+}
+COMMAND_NAMES = {code: name for name, code in COMMANDS.items()}
+
+# Vehicle IDs (button_id_t in main/common.h) and Gear enum order
+VEHICLE_IDS = {
+    "VWT5": 1, "VWT6": 2, "VWT61": 3, "VWT7": 4, "MB_SPRINTER": 5,
+    "MB_SPRINTER_2023": 6, "JEEP_RENEGADE": 7, "JEEP_RENEGADE_MHEV": 8, "MB_VIANO": 9,
+}
+VEHICLE_NAMES = {code: name for name, code in VEHICLE_IDS.items()}
+GEARS = ["PARK", "REVERSE", "NEUTRAL", "DRIVE"]
+PROTOCOLS = ["json", "binary"]
+STATUSES = ["ok", "error"]
+
+# Field keys and value encodings
+_U8, _U16, _U32, _STR, _VEHICLE, _GEAR, _BOOL, _VEHICLES, _PROTOCOL, _STATUS = range(10)
+
+FIELDS: Dict[str, Tuple[int, int]] = {
+    "vehicle": (0x01, _VEHICLE),
+    "gear": (0x02, _GEAR),
+    "speed": (0x03, _U8),
+    "can_active": (0x04, _BOOL),
+    "active": (0x05, _BOOL),
+    "uptime": (0x06, _U32),
+    "firmware_version": (0x07, _STR),
+    "vehicles": (0x08, _VEHICLES),
+    "message": (0x09, _STR),
+    "compact": (0x0A, _BOOL),
+    "protocol": (0x0B, _PROTOCOL),
+    "status": (0x0C, _STATUS),
+    "seq": (0x0D, _U16),
+    "received": (0x0E, _U32),
+    "lost": (0x0F, _U32),
+    "ack": (0x10, _BOOL),
+}
+FIELD_KEYS = {key: (name, encoding) for name, (key, encoding) in FIELDS.items()}
+
+MIN_FRAME_SIZE = 6  # type + seq + command + crc
+
+class ProtocolError(ValueError):
+    """Raised for frames that fail COBS, CRC or field decoding"""
+
+def _crc16_table() -> List[int]:
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+_CRC16_TABLE = _crc16_table()
+
+def crc16_ccitt(data: bytes, crc: int = 0xFFFF) -> int:
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)"""
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+def cobs_encode(data: bytes) -> bytes:
+    """Consistent Overhead Byte Stuffing: output contains no 0x00 bytes"""
+    out = bytearray()
+    block = bytearray()
+    for byte in data:
+        if byte == 0:
+            out.append(len(block) + 1)
+            out += block
+            block.clear()
+        else:
+            block.append(byte)
+            if len(block) == 254:
+                out.append(255)
+                out += block
+                block.clear()
+    out.append(len(block) + 1)
+    out += block
+    return bytes(out)
+
+def cobs_decode(data: bytes) -> bytes:
+    """Inverse of cobs_encode; raises ProtocolError on malformed input"""
+    out = bytearray()
+    pos = 0
+    size = len(data)
+    while pos < size:
+        code = data[pos]
+        if code == 0:
+            raise ProtocolError("Invalid COBS code")
+        end = pos + code
+        if end > size:
+            raise ProtocolError("Truncated COBS block")
+        out += data[pos + 1:end]
+        pos = end
+        if code < 255 and pos < size:
+            out.append(0)
+    return bytes(out)
+
+def _encode_fields(fields: Dict[str, Any]) -> bytes:
+    out = bytearray()
+    for name, value in fields.items():
+        if name not in FIELDS:
+            continue
+        key, encoding = FIELDS[name]
+        out.append(key)
+        if encoding == _U8:
+            # Out-of-range values become 0xFF so the device rejects them instead of wrapping
+            value = int(value)
+            out.append(value if 0 <= value <= 0xFF else 0xFF)
+        elif encoding == _U16:
+            out += struct.pack('<H', int(value) & 0xFFFF)
+        elif encoding == _U32:
+            out += struct.pack('<I', int(value) & 0xFFFFFFFF)
+        elif encoding == _BOOL:
+            out.append(1 if value else 0)
+        elif encoding == _STR:
+            text = str(value).encode('utf-8')[:255]
+            out.append(len(text))
+            out += text
+        elif encoding == _VEHICLE:
+            out.append(VEHICLE_IDS.get(value, 0))
+        elif encoding == _GEAR:
+            out.append(GEARS.index(value) if value in GEARS else 0xFF)
+        elif encoding == _PROTOCOL:
+            out.append(PROTOCOLS.index(value) if value in PROTOCOLS else 0xFF)
+        elif encoding == _STATUS:
+            out.append(STATUSES.index(value) if value in STATUSES else 1)
+        elif encoding == _VEHICLES:
+            ids = [VEHICLE_IDS.get(v, 0) for v in value][:255]
+            out.append(len(ids))
+            out += bytes(ids)
+    return bytes(out)
+
+def _decode_fields(data: bytes, pos: int, message: Dict[str, Any]):
+    try:
+        while pos < len(data):
+            key = data[pos]
+            pos += 1
+            if key not in FIELD_KEYS:
+                raise ProtocolError(f"Unknown field key 0x{key:02X}")
+            name, encoding = FIELD_KEYS[key]
+            if encoding == _U16:
+                message[name] = struct.unpack_from('<H', data, pos)[0]
+                pos += 2
+            elif encoding == _U32:
+                message[name] = struct.unpack_from('<I', data, pos)[0]
+                pos += 4
+            elif encoding in (_STR, _VEHICLES):
+                length = data[pos]
+                raw = data[pos + 1:pos + 1 + length]
+                if len(raw) != length:
+                    raise ProtocolError("Truncated field")
+                pos += 1 + length
+                if encoding == _STR:
+                    message[name] = raw.decode('utf-8', errors='replace')
+                else:
+                    message[name] = [VEHICLE_NAMES.get(b, "UNKNOWN") for b in raw]
+            else:
+                value = data[pos]
+                pos += 1
+                if encoding == _U8:
+                    message[name] = value
+                elif encoding == _BOOL:
+                    message[name] = bool(value)
+                elif encoding == _VEHICLE:
+                    message[name] = VEHICLE_NAMES.get(value, "UNKNOWN")
+                elif encoding == _GEAR:
+                    message[name] = GEARS[value] if value < len(GEARS) else "UNKNOWN"
+                elif encoding == _PROTOCOL:
+                    message[name] = PROTOCOLS[value] if value < len(PROTOCOLS) else "unknown"
+                elif encoding == _STATUS:
+                    message[name] = STATUSES[value] if value < len(STATUSES) else "error"
+    except (IndexError, struct.error):
+        raise ProtocolError("Truncated field")
+
+def encode_frame(msg_type: int, seq: int, command: int, fields: Dict[str, Any]) -> bytes:
+    """Build a complete delimited frame"""
+    raw = struct.pack('<BHB', msg_type, seq & 0xFFFF, command) + _encode_fields(fields)
+    raw += struct.pack('<H', crc16_ccitt(raw))
+    return b'\x00' + cobs_encode(raw) + b'\x00'
+
+def encode_command(command: str, seq: int, **fields) -> bytes:
+    """Build a command frame, e.g. encode_command("set_speed", 7, speed=120)"""
+    if command not in COMMANDS:
+        raise ValueError(f"Command '{command}' has no binary encoding")
+    return encode_frame(MSG_COMMAND, seq, COMMANDS[command], fields)
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """Build a frame from a JSON-style message dict (inverse of decode_frame)"""
+    msg_type = next((code for code, name in MESSAGE_TYPES.items() if name == message.get("type")), MSG_COMMAND)
+    command = COMMANDS.get(message.get("command") or "", 0)
+    fields = {k: v for k, v in message.items() if k in FIELDS}
+    return encode_frame(msg_type, message.get("id", 0), command, fields)
+
+def decode_frame(encoded: bytes) -> Dict[str, Any]:
+    """Decode the bytes between two delimiters into a message dict"""
+    raw = cobs_decode(encoded)
+    if len(raw) < MIN_FRAME_SIZE:
+        raise ProtocolError("Frame too short")
+    body, crc = raw[:-2], struct.unpack('<H', raw[-2:])[0]
+    if crc16_ccitt(body) != crc:
+        raise ProtocolError("CRC mismatch")
+
+    msg_type, seq, command = struct.unpack_from('<BHB', body)
+    if msg_type not in MESSAGE_TYPES:
+        raise ProtocolError(f"Unknown message type 0x{msg_type:02X}")
+
+    message: Dict[str, Any] = {"type": MESSAGE_TYPES[msg_type]}
+    if command:
+        message["command"] = COMMAND_NAMES.get(command, f"0x{command:02X}")
+    if msg_type not in (MSG_STATUS_UPDATE, MSG_SETPOINT_ACK):
+        message["id"] = seq
+    _decode_fields(body, 4, message)
+    if msg_type == MSG_ERROR:
+        message.setdefault("status", "error")
+    return message
+
+class BinaryFramer:
+    """
+    Splits a serial stream that carries binary frames, JSON and log text.
+
+    Bytes outside 0x00 ... 0x00 frames are handed to a JsonFramer, so JSON
+    responses and ESP_LOG lines keep working alongside binary frames. A
+    segment that fails COBS/CRC is treated as text and its closing delimiter
+    as the start of the next frame, which resynchronises after line noise.
+    """
+
+    TEXT = JsonFramer.TEXT
+    JSON = JsonFramer.JSON
+    BINARY = 2
+
+    def __init__(self, max_frame_size: int = 1024, text: Optional[JsonFramer] = None):
+        self.max_frame_size = max_frame_size
+        # Pass an existing JsonFramer to switch a running stream without losing buffered bytes
+        self.text = text if text is not None else JsonFramer()
+        self._frame = bytearray()
+        self._in_frame = False
+        self.crc_errors = 0
+
+    def reset(self):
+        self.text.reset()
+        self._frame.clear()
+        self._in_frame = False
+
+    def set_single_line(self, enabled: bool):
+        self.text.set_single_line(enabled)
+
+    def feed(self, data: bytes) -> List[Tuple[int, Any]]:
+        out: List[Tuple[int, Any]] = []
+        pos = 0
+        while pos < len(data):
+            delimiter = data.find(b'\x00', pos)
+            end = len(data) if delimiter == -1 else delimiter
+            if self._in_frame:
+                self._frame += data[pos:end]
+                if len(self._frame) > self.max_frame_size:
+                    # Not a frame after all: give the bytes back to the text path
+                    out.extend(self.text.feed(bytes(self._frame)))
+                    self._frame.clear()
+                    self._in_frame = False
+            elif end > pos:
+                out.extend(self.text.feed(data[pos:end]))
+
+            if delimiter == -1:
+                break
+            pos = delimiter + 1
+
+            if not self._in_frame:
+                self._in_frame = True
+            elif self._frame:
+                segment = bytes(self._frame)
+                self._frame.clear()
+                try:
+                    out.append((self.BINARY, decode_frame(segment)))
+                    self._in_frame = False
+                except ProtocolError:
+                    # Probably text between frames: keep this delimiter as an opener
+                    self.crc_errors += 1
+                    out.extend(self.text.feed(segment))
+        return out
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Binary CAN capture files
+
+A capture is a 64-byte header followed by fixed-size 24-byte frame records,
+so a multi-gigabyte overnight recording opens instantly with numpy.memmap:
+nothing is read until a column is touched, and filtering by ID streams
+through the file in chunks instead of loading it into RAM.
+
+File format (little endian):
+
+    header   magic b"CANCAP1\\n" | version:u16 | header_size:u16 | record_size:u16 |
+             reserved:u16 | start_time:f64 | bitrate:u32 | channel:32s (NUL padded) | 4 pad
+    record   timestamp:f64 | can_id:u32 | flags:u8 | dlc:u8 | reserved:u16 | data:8 x u8
+
+timestamp is the bus timestamp in seconds (epoch time for PCAN and the
+virtual bus), dlc the frame's DLC, at most 8 (remote frames keep the
+requested length but carry no data; bytes past the payload are zero) and
+flags a combination of FLAG_EXTENDED, FLAG_REMOTE, FLAG_ERROR and FLAG_FD
+(CAN FD payloads are truncated to 8 bytes). The frame count follows from the
+file size; a partially written trailing record is ignored.
+
+When a capture is closed, a sidecar index <path>.idx is built so that
+queries like "all 0x1A0 frames between t=120 s and t=180 s" only touch the
+pages holding those frames instead of scanning the whole file:
+
+    header     magic b"CANIDX1\\n" | version:u16 | position_size:u16 | id_count:u32 |
+               frame_count:u64 | origin:f64 | bucket_width:f64 | bucket_count:u64
+    id table   id_count x (can_id:u32 | reserved:u32 | first:u64 | count:u64), sorted by ID
+    buckets    bucket_count + 1 x u64: first frame of each time bucket, then frame_count
+    positions  frame_count x u32 (u64 past 4G frames): frame numbers grouped by ID,
+               ascending; the id table gives each ID's slice
+
+Bucket k covers timestamps from origin + k * bucket_width (origin is the
+capture start time). Frames are recorded in receive order, so timestamps
+are assumed to be non-decreasing; the buckets use the running maximum, so
+a frame stamped slightly out of order stays in its neighbours' bucket.
+Queries read one extra bucket past their end for such frames, so indexed
+results equal a full scan as long as no frame is stamped more than one
+bucket width before an earlier one.
+The index is ignored when it does not match the capture's frame count.
+
+Usage:
+    python3 pcan_reader.py --write night.cancap --quiet    # Record
+
+    capture = CaptureReader("night.cancap")
+    frames = capture.frames                                 # numpy.memmap, CAPTURE_DTYPE
+    gears = capture.select(ids=[0x3DC])                     # Via the index if there is one
+    speeds = capture.select(ids=[0x1A0], start=120, end=180)   # Seconds since the capture start
+
+    python3 can_capture.py night.cancap --summary
+    python3 can_capture.py night.cancap --id 0x1A0 --limit 20
+    python3 can_capture.py night.cancap --id 0x1A0 --start 120 --end 180
+    python3 can_capture.py night.cancap --index             # (Re)build the index
+"""
+
+import os
+import sys
+import time
+import struct
+import argparse
+from typing import Optional, Dict, Iterable, Iterator, Tuple
+
+import numpy as np
+
+MAGIC = b"CANCAP1\n"
+VERSION = 1
+_HEADER = struct.Struct('<8sHHHHdI32s4x')
+HEADER_SIZE = _HEADER.size    # 64
+
+FLAG_EXTENDED = 0x01
+FLAG_REMOTE = 0x02
+FLAG_ERROR = 0x04
+FLAG_FD = 0x08
+
+CAPTURE_DTYPE = np.dtype([("timestamp", "<f8"), ("can_id", "<u4"), ("flags", "u1"), ("dlc", "u1"),
+                          ("reserved", "<u2"), ("data", "u1", (8,))])
+_RECORD = struct.Struct('<dIBBH8s')   # Same layout, for single frames
+RECORD_SIZE = CAPTURE_DTYPE.itemsize  # 24
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"CANIDX1\n"
+_INDEX_HEADER = struct.Struct('<8sHHIQddQ')
+_INDEX_ID_DTYPE = np.dtype([("can_id", "<u4"), ("reserved", "<u4"), ("first", "<u8"), ("count", "<u8")])
+DEFAULT_BUCKET_WIDTH = 1.0   # Seconds
+
+def message_flags(msg) -> int:
+    """Capture flags of a can.Message"""
+    return ((FLAG_EXTENDED if msg.is_extended_id else 0) | (FLAG_REMOTE if msg.is_remote_frame else 0)
+            | (FLAG_ERROR if msg.is_error_frame else 0) | (FLAG_FD if msg.is_fd else 0))
+
+class CaptureWriter:
+    """Writes a capture file; frames are appended as they come, the index is built on close()"""
+
+    def __init__(self, path: str, bitrate: int = 500000, channel: str = "",
+                 start_time: Optional[float] = None, index: bool = True,
+                 bucket_width: float = DEFAULT_BUCKET_WIDTH):
+        self.path = path
+        self.frames = 0
+        self.index = index
+        self.bucket_width = bucket_width
+        if os.path.exists(path + INDEX_SUFFIX):
+            os.remove(path + INDEX_SUFFIX)  # Belongs to the capture being overwritten
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, HEADER_SIZE, RECORD_SIZE, 0,
+                                      time.time() if start_time is None else start_time,
+                                      bitrate, channel.encode('utf-8')[:32]))
+
+    def write_message(self, msg):
+        """Append one can.Message"""
+        self._file.write(_RECORD.pack(msg.timestamp, msg.arbitration_id, message_flags(msg),
+                                      min(msg.dlc, 8), 0, bytes(msg.data[:8])))
+        self.frames += 1
+
+    def write_frames(self, frames: np.ndarray):
+        """Append an array of CAPTURE_DTYPE records"""
+        self._file.write(np.ascontiguousarray(frames, dtype=CAPTURE_DTYPE).tobytes())
+        self.frames += len(frames)
+
+    def write_ring(self, ring, start: int, end: int):
+        """Append frames start..end (absolute positions) of a pcan_reader.FrameRing"""
+        capacity = ring.capacity
+        first = start % capacity
+        count = end - start
+        # At most two contiguous pieces: up to the end of the ring, then from slot 0
+        pieces = [(first, min(first + count, capacity))]
+        if first + count > capacity:
+            pieces.append((0, first + count - capacity))
+
+        timestamps = np.frombuffer(ring.timestamps, dtype=np.float64)
+        ids = np.frombuffer(ring.ids, dtype=f"u{ring.ids.itemsize}")
+        flags = np.frombuffer(ring.flags, dtype=np.uint8)
+        dlcs = np.frombuffer(ring.dlcs, dtype=np.uint8)
+        lengths = np.frombuffer(ring.lengths, dtype=np.uint8)
+        data = np.frombuffer(ring.data, dtype=np.uint8).reshape(-1, 8)
+        for a, b in pieces:
+            records = np.zeros(b - a, dtype=CAPTURE_DTYPE)
+            records["timestamp"] = timestamps[a:b]
+            records["can_id"] = ids[a:b]
+            records["flags"] = flags[a:b]
+            records["dlc"] = dlcs[a:b]
+            # Ring slots keep stale bytes past the payload (remote frames have none): zero them
+            records["data"] = data[a:b] * (np.arange(8) < lengths[a:b, None])
+            self._file.write(records.tobytes())
+        self.frames += count
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            if self.index:
+                build_index(self.path, self.bucket_width)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+def build_index(path: str, bucket_width: float = DEFAULT_BUCKET_WIDTH, chunk_size: int = 1 << 20) -> str:
+    """
+    Write the sidecar index of a capture (see module docstring) and return
+    its path. Two chunked passes: ID counts and time buckets, then the
+    per-ID frame numbers, written straight into the memory-mapped file.
+    """
+    capture = CaptureReader(path, use_index=False)
+    frames = capture.frames
+    frame_count = len(frames)
+    origin = capture.start_time
+
+    # Pass 1: frames per ID and the first frame of every time bucket
+    counts: Dict[int, int] = {}
+    bucket_starts = []
+    next_bucket = 0
+    latest = -np.inf
+    for offset in range(0, frame_count, chunk_size):
+        chunk = frames[offset:offset + chunk_size]
+        ids, n = np.unique(chunk["can_id"], return_counts=True)
+        for can_id, count in zip(ids.tolist(), n.tolist()):
+            counts[can_id] = counts.get(can_id, 0) + count
+        stamps = np.array(chunk["timestamp"])
+        stamps[0] = max(stamps[0], latest)
+        np.maximum.accumulate(stamps, out=stamps)
+        latest = stamps[-1]
+        buckets = np.maximum(np.floor((stamps - origin) / bucket_width), 0).astype(np.int64)
+        if buckets[-1] >= next_bucket:
+            wanted = np.arange(next_bucket, buckets[-1] + 1)
+            bucket_starts.append(offset + np.searchsorted(buckets, wanted, side="left"))
+            next_bucket = int(buckets[-1]) + 1
+    bucket_starts.append(np.array([frame_count]))
+    bucket_table = np.concatenate(bucket_starts).astype("<u8")
+
+    table = np.zeros(len(counts), dtype=_INDEX_ID_DTYPE)
+    table["can_id"] = sorted(counts)
+    table["count"] = [counts[can_id] for can_id in table["can_id"].tolist()]
+    table["first"][1:] = np.cumsum(table["count"])[:-1]
+    position_dtype = np.dtype("<u4" if frame_count < 1 << 32 else "<u8")
+
+    index_path = path + INDEX_SUFFIX
+    temporary = index_path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(_INDEX_HEADER.pack(INDEX_MAGIC, VERSION, position_dtype.itemsize, len(table), frame_count,
+                                   origin, bucket_width, len(bucket_table) - 1))
+        f.write(table.tobytes())
+        f.write(bucket_table.tobytes())
+        positions_offset = f.tell()
+        f.truncate(positions_offset + frame_count * position_dtype.itemsize)
+
+    # Pass 2: frame numbers grouped by ID, in capture order within each ID
+    if frame_count:
+        positions = np.memmap(temporary, dtype=position_dtype, mode="r+", offset=positions_offset,
+                              shape=(frame_count,))
+        cursors = dict(zip(table["can_id"].tolist(), table["first"].tolist()))
+        for offset in range(0, frame_count, chunk_size):
+            ids = np.array(frames[offset:offset + chunk_size]["can_id"])
+            order = np.argsort(ids, kind="stable")
+            present, firsts = np.unique(ids[order], return_index=True)
+            ends = np.append(firsts[1:], len(ids))
+            for can_id, a, b in zip(present.tolist(), firsts.tolist(), ends.tolist()):
+                cursor = cursors[can_id]
+                positions[cursor:cursor + b - a] = order[a:b] + offset
+                cursors[can_id] = cursor + b - a
+        positions.flush()
+        del positions
+    os.replace(temporary, index_path)
+    return index_path
+
+class CaptureIndex:
+    """Memory-mapped sidecar index of a capture (see build_index)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(_INDEX_HEADER.size)
+        if len(header) < _INDEX_HEADER.size or header[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a capture index")
+        (_, version, position_size, id_count, self.frame_count, self.origin, self.bucket_width,
+         bucket_count) = _INDEX_HEADER.unpack(header)
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported index version {version}")
+        offset = _INDEX_HEADER.size
+        self.ids = np.fromfile(path, dtype=_INDEX_ID_DTYPE, count=id_count, offset=offset)
+        offset += id_count * _INDEX_ID_DTYPE.itemsize
+        self.buckets = np.fromfile(path, dtype="<u8", count=bucket_count + 1, offset=offset)
+        offset += (bucket_count + 1) * 8
+        if self.frame_count:
+            self.positions = np.memmap(path, dtype=f"<u{position_size}", mode="r", offset=offset,
+                                       shape=(self.frame_count,))
+        else:
+            self.positions = np.zeros(0, dtype=f"<u{position_size}")
+
+    @classmethod
+    def open(cls, capture_path: str, frame_count: int) -> Optional["CaptureIndex"]:
+        """The index of a capture, None if there is none or it is out of date"""
+        try:
+            index = cls(capture_path + INDEX_SUFFIX)
+        except (OSError, ValueError):
+            return None
+        return index if index.frame_count == frame_count else None
+
+    def counts(self) -> Dict[int, int]:
+        return dict(zip(self.ids["can_id"].tolist(), self.ids["count"].tolist()))
+
+    def frame_range(self, start: Optional[float], end: Optional[float]) -> Tuple[int, int]:
+        """
+        Frame numbers [first, last) holding every frame stamped within
+        [start, end). last extends one bucket further: a frame stamped up to
+        one bucket width before its predecessors is filed under the later
+        bucket (see the module docstring).
+        """
+        last_bucket = len(self.buckets) - 2
+        first = last = None
+        if start is not None:
+            bucket = int(np.floor((start - self.origin) / self.bucket_width))
+            first = 0 if bucket < 0 else self.frame_count if bucket > last_bucket else int(self.buckets[bucket])
+        if end is not None:
+            bucket = int(np.floor((end - self.origin) / self.bucket_width))
+            bucket += 1   # Padding for out-of-order frames
+            last = 0 if bucket < 0 else self.frame_count if bucket > last_bucket else int(self.buckets[bucket + 1])
+        return (0 if first is None else first), (self.frame_count if last is None else last)
+
+    def positions_of(self, can_id: int, first: int = 0, last: Optional[int] = None) -> np.ndarray:
+        """Frame numbers of one ID within [first, last), found by binary search"""
+        row = np.searchsorted(self.ids["can_id"], can_id)
+        if row >= len(self.ids) or self.ids["can_id"][row] != can_id:
+            return self.positions[:0]
+        begin = int(self.ids["first"][row])
+        positions = self.positions[begin:begin + int(self.ids["count"][row])]
+        a = np.searchsorted(positions, first, side="left") if first else 0
+        b = np.searchsorted(positions, last, side="left") if last is not None else len(positions)
+        return positions[a:b]
+
+class CaptureReader:
+    """Memory-mapped read access to a capture file and its index"""
+
+    def __init__(self, path: str, use_index: bool = True):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a CAN capture file")
+        (_, self.version, header_size, record_size, _, self.start_time, self.bitrate,
+         channel) = _HEADER.unpack(header)
+        if self.version != VERSION or header_size != HEADER_SIZE or record_size != RECORD_SIZE:
+            raise ValueError(f"{path}: unsupported capture version {self.version}")
+        self.channel = channel.rstrip(b"\0").decode('utf-8', errors='replace')
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+        if count:
+            self.frames = np.memmap(path, dtype=CAPTURE_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.frames = np.zeros(0, dtype=CAPTURE_DTYPE)  # mmap cannot map zero bytes
+        self.index = CaptureIndex.open(path, count) if use_index else None
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the first to the last frame"""
+        if not len(self.frames):
+            return 0.0
+        return float(self.frames[-1]["timestamp"] - self.frames[0]["timestamp"])
+
+    def chunks(self, chunk_size: int = 1 << 20) -> Iterator[np.ndarray]:
+        """Consecutive memmap slices of at most chunk_size frames"""
+        for start in range(0, len(self.frames), chunk_size):
+            yield self.frames[start:start + chunk_size]
+
+    def select(self, ids: Optional[Iterable[int]] = None, start: Optional[float] = None,
+               end: Optional[float] = None, chunk_size: int = 1 << 20) -> np.ndarray:
+        """
+        Frames with one of the given IDs, stamped within [start, end) seconds
+        after the capture start, copied into memory in capture order. With no
+        filter at all the memmap itself is returned.
+
+        With an index only the matching frames (or the time buckets) are
+        read; without one the file is scanned in chunks.
+        """
+        if ids is None and start is None and end is None:
+            return self.frames
+        t0 = None if start is None else self.start_time + start
+        t1 = None if end is None else self.start_time + end
+
+        if self.index is not None:
+            first, last = self.index.frame_range(t0, t1)
+            if ids is None:
+                frames = np.array(self.frames[first:last])
+            else:
+                parts = [self.index.positions_of(can_id, first, last) for can_id in sorted(set(ids))]
+                positions = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+                if len(parts) > 1:
+                    positions.sort()
+                frames = self.frames[positions]
+            return frames[self._in_window(frames, t0, t1)] if t0 is not None or t1 is not None else frames
+
+        wanted = None if ids is None else np.fromiter(set(ids), dtype=np.uint32)
+        parts = []
+        for chunk in self.chunks(chunk_size):
+            mask = self._in_window(chunk, t0, t1)
+            if wanted is not None:
+                mask &= np.isin(chunk["can_id"], wanted)
+            parts.append(chunk[mask])
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=CAPTURE_DTYPE)
+
+    @staticmethod
+    def _in_window(frames: np.ndarray, t0: Optional[float], t1: Optional[float]) -> np.ndarray:
+        mask = np.ones(len(frames), dtype=bool)
+        if t0 is not None:
+            mask &= frames["timestamp"] >= t0
+        if t1 is not None:
+            mask &= frames["timestamp"] < t1
+        return mask
+
+    def count_by_id(self, chunk_size: int = 1 << 20) -> Dict[int, int]:
+        """Frames per CAN ID (from the index when there is one)"""
+        if self.index is not None:
+            return self.index.counts()
+        counts: Dict[int, int] = {}
+        for chunk in self.chunks(chunk_size):
+            ids, n = np.unique(chunk["can_id"], return_counts=True)
+            for can_id, count in zip(ids.tolist(), n.tolist()):
+                counts[can_id] = counts.get(can_id, 0) + count
+        return counts
+
+def format_frame(frame, origin: float) -> str:
+    """One frame as a pcan_reader style line"""
+    dlc = int(frame["dlc"])
+    # A remote frame requests dlc bytes but carries none
+    length = 0 if frame["flags"] & FLAG_REMOTE else dlc
+    data = bytes(frame["data"][:length]).hex(' ').upper()
+    data += " --" * (8 - length) if length else "-- " * 7 + "--"
+    return f"{frame['timestamp'] - origin:8.3f}s | 0x{int(frame['can_id']):03X} | {dlc}   | {data:<31}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a binary CAN capture")
+    parser.add_argument("path", help="Capture file written by pcan_reader.py --write")
+    parser.add_argument("--id", type=lambda x: int(x, 0), action="append", help="Only this CAN ID (repeatable)")
+    parser.add_argument("--limit", type=int, help="Print at most this many frames")
+    parser.add_argument("--start", type=float, help="Only frames from this many seconds after the start")
+    parser.add_argument("--end", type=float, help="Only frames before this many seconds after the start")
+    parser.add_argument("--summary", action="store_true", help="Frame counts per ID instead of frames")
+    parser.add_argument("--index", action="store_true", help="(Re)build the sidecar index and exit")
+    args = parser.parse_args()
+
+    if args.index:
+        start = time.perf_counter()
+        index_path = build_index(args.path)
+        print(f"🗂️  Wrote {index_path} in {time.perf_counter() - start:.1f} s")
+        return 0
+
+    capture = CaptureReader(args.path)
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(capture.start_time))
+    print(f"📼 {args.path}: {len(capture)} frames, {capture.duration:.1f} s, "
+          f"{capture.channel or 'unknown channel'} at {capture.bitrate} bit/s, started {started}")
+
+    if args.summary:
+        for can_id, count in sorted(capture.count_by_id().items()):
+            rate = count / capture.duration if capture.duration else 0.0
+            print(f"   0x{can_id:03X}: {count:10d} frames ({rate:.1f}/s)")
+        return 0
+
+    frames = capture.select(args.id, args.start, args.end)
+    if args.limit is not None:
+        frames = frames[:args.limit]
+    for frame in frames:
+        print(format_frame(frame, capture.start_time))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Vectorized VW T6/T7 speed and gear decoding for whole captures
+
+The live tools decode one can.Message at a time (pcan_reader's
+decode_vw_t6_message, decode_vwt7_messages.VWT7MessageDecoder). For
+post-processing, decode_frames() takes a CAPTURE_DTYPE frame array (see
+can_capture.py) and decodes every speed and gear frame in it with a few
+NumPy operations, using the vehicle's layout from signals/ (signal_db.py):
+
+    VW T6   speed  0x1A0 bytes 2-3 (LE) x 0.005 km/h    gear  0x440 byte 1
+    VW T7   speed  0x0FD bytes 4-5 (LE) x 0.01 km/h     gear  0x3DC byte 5
+
+Values match the per-message decoders. Frames too short to hold the signal
+(which the per-message decoders reject or report as 0 km/h / UNKNOWN) and
+remote or error frames are skipped. Gears are returned as raw codes; use
+gear_names() for the strings.
+
+Usage:
+    capture = CaptureReader("night.cancap")
+    signals = decode_capture(capture, "VWT6", start=120, end=180)   # Uses the index
+    signals.speed_time, signals.speed                              # km/h
+    signals.gear_time, signals.gear_names()
+
+    python3 capture_decode.py night.cancap --vehicle VWT7
+    python3 capture_decode.py night.cancap --vehicle VWT6 --csv speed.csv
+"""
+
+import sys
+import time
+import argparse
+from dataclasses import dataclass
+from typing import Optional, List
+
+import numpy as np
+
+from can_capture import FLAG_REMOTE, FLAG_ERROR, CaptureReader
+from signal_db import Signal, VehicleSignals, get_vehicle_signals, vehicle_signals
+
+@dataclass
+class DecodedSignals:
+    """Speed and gear samples in capture order"""
+    signals: VehicleSignals
+    speed_time: np.ndarray   # Bus timestamps, seconds
+    speed: np.ndarray        # km/h
+    gear_time: np.ndarray
+    gear: np.ndarray         # Raw gear codes (uint8)
+
+    def gear_names(self) -> np.ndarray:
+        """Gear codes as strings, UNKNOWN(0xNN) for codes the vehicle does not define"""
+        codes, inverse = np.unique(self.gear, return_inverse=True)
+        names = np.array([self.signals.gear.name_of(int(code)) for code in codes], dtype=object)
+        return names[inverse]
+
+    def gear_changes(self) -> List[int]:
+        """Indices into gear/gear_time where the gear differs from the previous frame"""
+        if len(self.gear) == 0:
+            return []
+        return [0] + (np.flatnonzero(np.diff(self.gear) != 0) + 1).tolist()
+
+def _signal_frames(frames: np.ndarray, ids: np.ndarray, signal: Signal) -> np.ndarray:
+    # One full-width comparison; the DLC and flag checks only see this ID's frames
+    candidates = np.take(frames, np.flatnonzero(ids == signal.message_id))  # take() beats a boolean mask on records
+    usable = (candidates["dlc"] >= signal.min_length) & ((candidates["flags"] & (FLAG_REMOTE | FLAG_ERROR)) == 0)
+    return candidates if usable.all() else candidates[usable]
+
+def _raw_values(frames: np.ndarray, signal: Signal) -> np.ndarray:
+    """The signal's raw value in every frame (the vectorized Signal.extract)"""
+    data = frames["data"]
+    if signal.length == 1:
+        return np.array(data[:, signal.start_byte])
+    raw = np.zeros(len(frames), dtype=np.uint32)
+    for index, shift in signal.byte_shifts():
+        raw |= data[:, index].astype(np.uint32) << shift
+    return raw
+
+def decode_frames(frames: np.ndarray, signals: VehicleSignals) -> DecodedSignals:
+    """Decode every speed and gear frame of a CAPTURE_DTYPE array"""
+    ids = np.ascontiguousarray(frames["can_id"])
+    speed_frames = _signal_frames(frames, ids, signals.speed)
+    gear_frames = _signal_frames(frames, ids, signals.gear)
+    return DecodedSignals(signals=signals,
+                          speed_time=np.array(speed_frames["timestamp"]),
+                          speed=_raw_values(speed_frames, signals.speed) * signals.speed.factor,
+                          gear_time=np.array(gear_frames["timestamp"]),
+                          gear=_raw_values(gear_frames, signals.gear))
+
+def decode_capture(capture: CaptureReader, vehicle: str, start: Optional[float] = None,
+                   end: Optional[float] = None) -> DecodedSignals:
+    """Decode a capture file (or the [start, end) seconds of it), reading only the two IDs"""
+    signals = get_vehicle_signals(vehicle)
+    if signals is None:
+        raise ValueError(f"No signal definition for vehicle {vehicle!r} (known: {', '.join(vehicle_signals())})")
+    frames = capture.select(ids=[signals.speed.message_id, signals.gear.message_id], start=start, end=end)
+    return decode_frames(frames, signals)
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode VW speed and gear signals from a binary CAN capture")
+    parser.add_argument("path", help="Capture file written by pcan_reader.py --write")
+    parser.add_argument("--vehicle", default="VWT6", choices=sorted(vehicle_signals()), help="Vehicle (default: VWT6)")
+    parser.add_argument("--start", type=float, help="From this many seconds after the capture start")
+    parser.add_argument("--end", type=float, help="Up to this many seconds after the capture start")
+    parser.add_argument("--csv", metavar="FILE", help="Write the speed samples (seconds, km/h) to a CSV file")
+    args = parser.parse_args()
+
+    capture = CaptureReader(args.path)
+    started = time.perf_counter()
+    decoded = decode_capture(capture, args.vehicle, args.start, args.end)
+    elapsed = time.perf_counter() - started
+    origin = capture.start_time
+
+    vehicle = decoded.signals
+    print(f"🚗 {vehicle.name}: {len(decoded.speed)} speed and {len(decoded.gear)} gear frames "
+          f"decoded in {elapsed * 1000:.1f} ms")
+    if len(decoded.speed):
+        print(f"   Speed (0x{vehicle.speed.message_id:03X}): min {decoded.speed.min():.1f}, "
+              f"mean {decoded.speed.mean():.1f}, max {decoded.speed.max():.1f} km/h")
+    changes = decoded.gear_changes()
+    if changes:
+        names = decoded.gear_names()
+        print(f"   Gear (0x{vehicle.gear.message_id:03X}): {len(changes) - 1} changes")
+        for i in changes:
+            print(f"   {decoded.gear_time[i] - origin:10.3f}s  {names[i]}")
+
+    if args.csv:
+        rows = np.column_stack((decoded.speed_time - origin, decoded.speed))
+        np.savetxt(args.csv, rows, fmt="%.6f,%.3f", header="seconds,speed_kmh", comments="")
+        print(f"💾 {len(rows)} speed samples written to {args.csv}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
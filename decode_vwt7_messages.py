@@ -15,6 +15,12 @@ import time
 import sys
 from typing import Optional, Dict
 
+from signal_db import get_vehicle_signals
+
+# Layout from signals/VWT7.json
+T7_SIGNALS = get_vehicle_signals("VWT7")
+T7_GEARS = T7_SIGNALS.gear.names
+
 class VWT7MessageDecoder:
     """Decoder for VWT7 CAN messages"""
     
@@ -24,16 +30,11 @@ class VWT7MessageDecoder:
         self.bus: Optional[can.Bus] = None
         
         # VWT7 message IDs
-        self.SPEED_MSG_ID = 0x0FD
-        self.GEAR_MSG_ID = 0x3DC
+        self.SPEED_MSG_ID = T7_SIGNALS.speed.message_id
+        self.GEAR_MSG_ID = T7_SIGNALS.gear.message_id
         
         # Gear mapping
-        self.gear_map = {
-            0x05: "PARK",
-            0x04: "REVERSE", 
-            0x03: "NEUTRAL",
-            0x02: "DRIVE"
-        }
+        self.gear_map = T7_GEARS
         
         # Message counters
         self.message_counts: Dict[int, int] = {}
@@ -62,19 +63,15 @@ class VWT7MessageDecoder:
     
     def decode_speed_message(self, data: bytes) -> float:
         """Decode VWT7 speed message"""
-        if len(data) >= 6:
-            # Speed is in bytes 4-5, little endian
-            speed_raw = data[4] | (data[5] << 8)
-            speed_kmh = speed_raw * 0.01  # VWT7 speed factor
-            return speed_kmh
-        return 0.0
+        # Bytes 4-5, little endian, 0.01 km/h per bit
+        speed_kmh = T7_SIGNALS.speed.decode(data)
+        return 0.0 if speed_kmh is None else speed_kmh
     
     def decode_gear_message(self, data: bytes) -> str:
         """Decode VWT7 gear message"""
-        if len(data) >= 6:
-            gear_value = data[5]
-            return self.gear_map.get(gear_value, f"UNKNOWN(0x{gear_value:02X})")
-        return "UNKNOWN"
+        # Byte 5
+        gear = T7_SIGNALS.gear.decode(data)
+        return "UNKNOWN" if gear is None else gear
     
     def process_message(self, message: can.Message):
         """Process and decode a received message"""
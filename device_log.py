@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+ESP32 device log demultiplexer
+
+Turns the firmware's ESP_LOG text lines ("I (1234) CarCan: Speed set to: 50 km/h")
+into compact DeviceLogRecord tuples (level, tag, device tick, message) and
+hands them to:
+- a bounded in-memory queue (oldest records are dropped when it is full)
+- optionally an append-only binary log file
+
+The binary log is two append-only files: fixed-size index records
+(level, tag number, device tick, host time, message offset/length) and a
+heap with the message text. DeviceLogReader filters a long soak log by tag
+or level on the index alone - vectorised with NumPy when it is installed -
+and only reads the messages of matching records, without decoding or
+regex-scanning any text.
+
+File format (little endian):
+
+    <path>       b"ESPLOG2\n" then 28-byte records:
+                 kind:u8 | level:u8 | tag_id:u16 | tick:u32 | host_time:f64 | offset:u64 | length:u32
+    <path>.msg   message bytes referenced by offset/length
+
+kind 0 defines a tag (its name is the message), kind 1 is a log record.
+Reopening a log for writing first cuts off what a crash left behind (a
+torn index record, heap bytes no record points to), so appends line up.
+
+Usage:
+    demux = DeviceLogDemux(log_path="soak.esplog")
+    controller.log_demux = demux          # ESP32Controller feeds every text line
+    record = demux.get(timeout=1.0)
+
+    for record in DeviceLogReader("soak.esplog").records(tags={"CarCan"}, min_level="W"):
+        print(record)
+
+    python3 device_log.py soak.esplog --tag SerialCmd --level W
+"""
+
+import os
+import re
+import mmap
+import sys
+import time
+import struct
+import argparse
+import threading
+from collections import deque
+from typing import Optional, List, Dict, Iterator, Iterable, NamedTuple
+
+# "I (1234) Tag: message"; ANSI colors are already stripped by JsonFramer
+_LOG_LINE = re.compile(rb'([EWIDV]) \((\d+)\) ([^:]{1,64}): ?(.*)', re.DOTALL)
+
+LEVELS = "EWIDV"  # Most to least severe, as in esp_log_level_t
+UNPARSED_LEVEL = "?"
+
+MAGIC = b"ESPLOG2\n"
+HEAP_SUFFIX = ".msg"
+_RECORD = struct.Struct('<BBHIdQI')
+_KIND_TAG = 0x00
+_KIND_RECORD = 0x01
+
+class DeviceLogRecord(NamedTuple):
+    """One ESP_LOG line; lines that are not ESP_LOG output get level "?" and tag "" """
+    level: str
+    tag: str
+    tick: int          # Device time in ms (RTOS ticks)
+    message: str
+    host_time: float   # time.time() when the line was received
+
+def parse_log_line(line: bytes, host_time: Optional[float] = None) -> DeviceLogRecord:
+    """Parse one text line from the device"""
+    if host_time is None:
+        host_time = time.time()
+    match = _LOG_LINE.match(line)
+    if not match:
+        return DeviceLogRecord(UNPARSED_LEVEL, "", 0, line.decode('utf-8', errors='replace'), host_time)
+    level, tick, tag, message = match.groups()
+    return DeviceLogRecord(level.decode(), tag.decode('utf-8', errors='replace'), int(tick),
+                           message.decode('utf-8', errors='replace'), host_time)
+
+def _level_rank(level: str) -> int:
+    index = LEVELS.find(level)
+    return len(LEVELS) if index < 0 else index
+
+def _record_dtype():
+    import numpy as np
+    return np.dtype([("kind", "u1"), ("level", "u1"), ("tag_id", "<u2"), ("tick", "<u4"),
+                     ("host_time", "<f8"), ("offset", "<u8"), ("length", "<u4")])
+
+def _trim_tail(path: str):
+    """
+    Cut what a crash left behind: a partially written trailing index record,
+    index records whose message never reached the heap, and heap bytes past
+    the last indexed message.
+    """
+    heap_path = path + HEAP_SUFFIX
+    heap_size = os.path.getsize(heap_path) if os.path.exists(heap_path) else 0
+    end = 0
+    with open(path, "r+b") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a device log file")
+        count = (os.fstat(f.fileno()).st_size - len(MAGIC)) // _RECORD.size
+        while count:
+            f.seek(len(MAGIC) + (count - 1) * _RECORD.size)
+            offset, length = _RECORD.unpack(f.read(_RECORD.size))[5:]
+            if offset + length <= heap_size:
+                end = offset + length
+                break
+            count -= 1
+        f.truncate(len(MAGIC) + count * _RECORD.size)
+    if heap_size > end:
+        os.truncate(heap_path, end)
+
+class BinaryLogWriter:
+    """Append-only binary device log (see module docstring for the format)"""
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._tags: Dict[str, int] = {}
+        if os.path.exists(path) and os.path.getsize(path) > len(MAGIC):
+            # Continue an existing log after its last complete record; reuse its tag numbers
+            _trim_tail(path)
+            self._tags = {name: tag_id for tag_id, name in DeviceLogReader(path).tags().items()}
+            self._index = open(path, "ab")
+            self._heap = open(path + HEAP_SUFFIX, "ab")
+        else:
+            self._index = open(path, "wb")
+            self._index.write(MAGIC)
+            self._heap = open(path + HEAP_SUFFIX, "wb")
+        self._offset = self._heap.tell()
+        self._last_flush = time.monotonic()
+
+    def _append(self, kind: int, level: int, tag_id: int, tick: int, host_time: float, data: bytes):
+        # Message first, so an index record never points past the end of the heap
+        self._heap.write(data)
+        self._index.write(_RECORD.pack(kind, level, tag_id, tick & 0xFFFFFFFF, host_time,
+                                       self._offset, len(data)))
+        self._offset += len(data)
+
+    def _tag_id(self, tag: str) -> int:
+        tag_id = self._tags.get(tag)
+        if tag_id is None:
+            tag_id = len(self._tags)
+            self._append(_KIND_TAG, 0, tag_id, 0, 0.0, tag.encode('utf-8'))
+            self._tags[tag] = tag_id
+        return tag_id
+
+    def write(self, record: DeviceLogRecord):
+        self._append(_KIND_RECORD, ord(record.level), self._tag_id(record.tag), record.tick,
+                     record.host_time, record.message.encode('utf-8'))
+        # Buffered; flushed at most once per interval so a crash loses little
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+
+    def flush(self):
+        self._heap.flush()
+        self._index.flush()
+
+    def close(self):
+        if not self._index.closed:
+            self.flush()
+            self._index.close()
+            self._heap.close()
+
+class DeviceLogReader:
+    """Reads a binary device log, filtering on the fixed-size index only"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _record_count(self) -> int:
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a device log file")
+            size = os.fstat(f.fileno()).st_size
+        # Ignore a partially written trailing record
+        return (size - len(MAGIC)) // _RECORD.size
+
+    def _index(self):
+        """Index as a NumPy memmap (nothing is read until filtered), or a list of tuples without NumPy"""
+        count = self._record_count()
+        try:
+            import numpy as np
+        except ImportError:
+            with open(self.path, "rb") as f:
+                f.seek(len(MAGIC))
+                return list(_RECORD.iter_unpack(f.read(count * _RECORD.size)))
+        if count == 0:
+            return np.zeros(0, dtype=_record_dtype())  # mmap cannot map zero bytes
+        return np.memmap(self.path, dtype=_record_dtype(), mode="r", offset=len(MAGIC), shape=(count,))
+
+    def tags(self) -> Dict[int, str]:
+        """Tag table (tag_id -> name)"""
+        return self._tags(self._index())
+
+    def _tags(self, index) -> Dict[int, str]:
+        if isinstance(index, list):
+            definitions = [(tag_id, offset, length) for kind, _, tag_id, _, _, offset, length in index
+                           if kind == _KIND_TAG]
+        else:
+            rows = index[index["kind"] == _KIND_TAG]
+            definitions = zip(rows["tag_id"].tolist(), rows["offset"].tolist(), rows["length"].tolist())
+        table = {}
+        with open(self.path + HEAP_SUFFIX, "rb") as heap:
+            for tag_id, offset, length in definitions:
+                heap.seek(offset)
+                table[tag_id] = heap.read(length).decode('utf-8', errors='replace')
+        return table
+
+    def records(self, tags: Optional[Iterable[str]] = None, min_level: Optional[str] = None,
+                since: Optional[float] = None) -> Iterator[DeviceLogRecord]:
+        """
+        Yield records, optionally only the given tags, levels at least as
+        severe as min_level ("E", "W", "I", ...) and host times >= since.
+        Messages of records that are filtered out are never read.
+        """
+        index = self._index()
+        table = self._tags(index)
+        tag_ids = None
+        if tags is not None:
+            names = set(tags)
+            tag_ids = {tag_id for tag_id, name in table.items() if name in names}
+        levels = None
+        if min_level:
+            levels = {ord(level) for level in LEVELS[:_level_rank(min_level) + 1]}
+
+        if isinstance(index, list):
+            matches = [row for row in index if row[0] == _KIND_RECORD
+                       and (tag_ids is None or row[2] in tag_ids)
+                       and (levels is None or row[1] in levels)
+                       and (since is None or row[4] >= since)]
+        else:
+            import numpy as np
+            mask = index["kind"] == _KIND_RECORD
+            if tag_ids is not None:
+                mask &= np.isin(index["tag_id"], list(tag_ids))
+            if levels is not None:
+                mask &= np.isin(index["level"], list(levels))
+            if since is not None:
+                mask &= index["host_time"] >= since
+            selected = index[mask]
+            matches = zip(selected["kind"].tolist(), selected["level"].tolist(), selected["tag_id"].tolist(),
+                          selected["tick"].tolist(), selected["host_time"].tolist(),
+                          selected["offset"].tolist(), selected["length"].tolist())
+
+        with open(self.path + HEAP_SUFFIX, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as heap:
+                for _, level, tag_id, tick, host_time, offset, length in matches:
+                    yield DeviceLogRecord(chr(level), table.get(tag_id, ""), tick,
+                                          heap[offset:offset + length].decode('utf-8', errors='replace'),
+                                          host_time)
+
+class DeviceLogDemux:
+    """
+    Parses device text lines and fans them out to a bounded queue and an
+    optional binary log. feed_line() is called from the controller's reader.
+    """
+
+    def __init__(self, maxsize: int = 10000, log_path: Optional[str] = None):
+        self._queue: deque = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.writer = BinaryLogWriter(log_path) if log_path else None
+
+    def feed_line(self, line: bytes):
+        record = parse_log_line(line)
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(record)
+            self._cond.notify()
+        if self.writer:
+            self.writer.write(record)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[DeviceLogRecord]:
+        """Oldest queued record, waiting up to timeout; None if there is none"""
+        with self._cond:
+            if not self._queue and not self._cond.wait_for(lambda: self._queue, timeout):
+                return None
+            return self._queue.popleft()
+
+    def drain(self) -> List[DeviceLogRecord]:
+        """Take every queued record"""
+        with self._cond:
+            records = list(self._queue)
+            self._queue.clear()
+        return records
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter a binary ESP32 device log")
+    parser.add_argument("path", help="Device log file written by DeviceLogDemux")
+    parser.add_argument("--tag", action="append", help="Only this tag (repeatable)")
+    parser.add_argument("--level", choices=list(LEVELS), help="Minimum level (E, W, I, D, V)")
+    parser.add_argument("--tags", action="store_true", help="List the tags in the log and exit")
+    args = parser.parse_args()
+
+    reader = DeviceLogReader(args.path)
+    if args.tags:
+        for tag_id, name in sorted(reader.tags().items()):
+            print(f"{tag_id:5d}  {name}")
+        return 0
+
+    for record in reader.records(tags=args.tag, min_level=args.level):
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.host_time))
+        print(f"{stamp} {record.level} ({record.tick}) {record.tag}: {record.message}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
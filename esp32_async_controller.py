@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Asyncio ESP32 CAN Simulator Controller
+
+asyncio-native counterpart of ESP32Controller. It uses a pyserial-asyncio
+transport instead of a background reader thread, and it reuses the same
+framing, command encoding and response dispatch (ESP32Protocol). A single
+event loop can therefore drive many simulators concurrently.
+
+Serial ports and socket:// URLs are opened by pyserial-asyncio; loopback://
+links to an in-process ESP32Emulator (see transport.py) have no file
+descriptor to poll, so a helper thread reads them instead.
+
+Usage:
+    async with AsyncESP32Controller("/dev/ttyACM0") as controller:
+        await controller.set_vehicle("VWT7")
+        await controller.set_gear("PARK")
+        await controller.set_speed(120)
+        await controller.apply_state(vehicle="VWT7", gear="DRIVE", speed=50)
+        status = await controller.get_status()
+
+    # Many boards from one loop
+    controllers = [AsyncESP32Controller(port) for port in ports]
+    await asyncio.gather(*(c.connect() for c in controllers))
+    await asyncio.gather(*(c.set_speed(50) for c in controllers))
+
+Requirements:
+    pip3 install pyserial-asyncio
+"""
+
+import asyncio
+import threading
+from typing import Optional, Dict
+
+import serial_asyncio
+
+from esp32_controller import (ESP32Protocol, ESP32Status, SetpointStats, WireProtocol,
+                              READY_PROBE_INTERVAL, RESET_PULSE)
+from esp32_logging import tx_log, rx_log
+from transport import LOOPBACK_SCHEME, open_transport
+
+class _SerialProtocol(asyncio.Protocol):
+    """asyncio protocol that hands received bytes to the controller"""
+
+    def __init__(self, controller: "AsyncESP32Controller"):
+        self.controller = controller
+
+    def data_received(self, data: bytes):
+        self.controller._process_chunk(data)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.controller._connection_lost(exc)
+
+class _LinkTransport(asyncio.Transport):
+    """
+    asyncio transport over a blocking transport.py link, read by a helper
+    thread. The link is exposed as .serial like pyserial-asyncio's transport.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, protocol: asyncio.Protocol, link):
+        super().__init__(extra={"serial": link})
+        self.serial = link
+        self._loop = loop
+        self._protocol = protocol
+        self._closing = False
+        self._lost = False
+        self._loop.call_soon(self._protocol.connection_made, self)
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        error = None
+        try:
+            while not self._closing:
+                chunk = self.serial.read(max(1, self.serial.in_waiting))
+                if chunk:
+                    self._loop.call_soon_threadsafe(self._data_received, chunk)
+        except Exception as e:
+            error = e
+        try:
+            self._loop.call_soon_threadsafe(self._call_connection_lost, error)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def _data_received(self, data: bytes):
+        if not self._lost:
+            self._protocol.data_received(data)
+
+    def _call_connection_lost(self, exc: Optional[Exception]):
+        # close() and the reader thread may both report the end of the link
+        if self._lost:
+            return
+        self._lost = True
+        self._closing = True
+        self._protocol.connection_lost(None if self._closed_locally else exc)
+
+    @property
+    def _closed_locally(self) -> bool:
+        return not self.serial.is_open
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def write(self, data: bytes):
+        if self._closing:
+            return
+        try:
+            self.serial.write(data)
+        except OSError as e:
+            self._closing = True
+            self._loop.call_soon(self._call_connection_lost, e)
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        self.serial.cancel_read()
+        self.serial.close()
+        self._loop.call_soon(self._call_connection_lost, None)
+
+    def abort(self):
+        self.close()
+
+class AsyncESP32Controller(ESP32Protocol):
+    """asyncio serial controller for ESP32 CAN simulator"""
+
+    def __init__(self, port: str = "/dev/ttyACM0", baudrate: int = 115200, timeout: float = 5.0,
+                 compact: bool = False, protocol: str = "json", ready_timeout: float = 3.0,
+                 reset_on_connect: bool = False, dtr: Optional[bool] = None, rts: Optional[bool] = None):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.compact = compact
+        self.protocol = WireProtocol(protocol)
+        self.ready_timeout = ready_timeout
+        self.reset_on_connect = reset_on_connect
+        # Applied right after open (pyserial-asyncio opens the port itself)
+        self.dtr = dtr
+        self.rts = rts
+
+        # Response handling
+        self._init_protocol()
+        self._response_timeout = 5.0
+
+        self._transport: Optional[asyncio.Transport] = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._transport is not None and not self._transport.is_closing()
+
+    async def connect(self) -> bool:
+        """Connect to ESP32 via serial"""
+        loop = asyncio.get_running_loop()
+        try:
+            print(f"🔌 Connecting to ESP32 on {self.port} at {self.baudrate} baud...")
+
+            # Always start in pretty JSON; compact and binary are negotiated below
+            self._reset_framing()
+            if self.port.startswith(LOOPBACK_SCHEME):
+                link = open_transport(self.port, timeout=1.0, dtr=self.dtr, rts=self.rts)
+                self._transport = _LinkTransport(loop, _SerialProtocol(self), link)
+            else:
+                self._transport, _ = await serial_asyncio.create_serial_connection(
+                    loop, lambda: _SerialProtocol(self), self.port, baudrate=self.baudrate
+                )
+
+            port = self._transport.serial
+            if self.dtr is not None:
+                port.dtr = self.dtr
+            if self.rts is not None:
+                port.rts = self.rts
+            if self.reset_on_connect:
+                await self._reset_board()
+
+            # Clear any pending data
+            port.reset_input_buffer()
+            self._framer.reset()
+            self._ready_event = asyncio.Event()
+            # The board may have rebooted since the last report
+            self._invalidate_status()
+
+            if not await self._wait_ready():
+                raise ConnectionError(f"no response from ESP32 within {self.ready_timeout:.1f} s")
+
+            # Ask for single-line JSON; older firmware just keeps pretty output
+            if self.compact and not await self.set_compact(True):
+                print("⚠️  Compact output not supported, using pretty-printed JSON")
+            
+            # Negotiated in JSON so older firmware simply answers "Unknown command"
+            if self.protocol == WireProtocol.BINARY and not await self.set_protocol("binary"):
+                print("⚠️  Binary protocol not supported, using JSON")
+
+            print("✅ Connected to ESP32 successfully!")
+            return True
+
+        except Exception as e:
+            print(f"❌ Failed to connect: {e}")
+            if self._transport:
+                self._transport.close()
+                self._transport = None
+            return False
+
+    async def _reset_board(self):
+        """Reboot the board through the auto-reset circuit (RTS -> EN, DTR -> IO0)"""
+        port = self._transport.serial
+        try:
+            port.dtr = False
+            port.rts = True
+            await asyncio.sleep(RESET_PULSE)
+            port.rts = False
+        except OSError as e:
+            print(f"⚠️  Could not reset board via DTR/RTS: {e}")
+
+    async def _wait_ready(self) -> bool:
+        """Wait for the boot status_update or a reply to a ping probe"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.ready_timeout
+        while not self._ready_event.is_set():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            request_id, probe = self._encode_command("ping", loop.create_future())
+            try:
+                self._transport.write(probe)
+                await asyncio.wait_for(self._ready_event.wait(), min(READY_PROBE_INTERVAL, remaining))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._forget_pending(request_id)
+        return True
+
+    async def disconnect(self):
+        """Disconnect from ESP32"""
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+            # Let the transport run connection_lost()
+            await asyncio.sleep(0)
+            print("🔌 Disconnected from ESP32")
+        self._cancel_pending()
+
+    def _connection_lost(self, exc: Optional[Exception]):
+        if exc:
+            rx_log.error("⚠️  Error reading from ESP32: %s", exc)
+        self._transport = None
+        self._cancel_pending()
+
+    async def _send_command(self, command: str, **kwargs) -> Optional[Dict]:
+        """Send command and wait for response"""
+        if not self.is_connected:
+            tx_log.error("❌ Not connected to ESP32")
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        request_id, cmd_json = self._encode_command(command, future, **kwargs)
+
+        try:
+            self._transport.write(cmd_json)
+
+            # Wait for response; data_received() completes the future
+            timeout = kwargs.get('timeout', self._response_timeout)
+            return await asyncio.wait_for(future, timeout=timeout)
+
+        except asyncio.TimeoutError:
+            tx_log.warning("⏰ Timeout waiting for response to '%s'", command)
+            return None
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise  # The caller itself was cancelled
+            tx_log.warning("🔌 Disconnected while waiting for response to '%s'", command)
+            return None
+        except Exception as e:
+            tx_log.error("❌ Error sending command '%s': %s", command, e)
+            return None
+        finally:
+            self._forget_pending(request_id)
+
+    # === High-level API methods ===
+
+    async def ping(self) -> bool:
+        """Test ESP32 connection"""
+        response = await self._send_command("ping")
+        return response is not None and response.get('status') == 'ok'
+
+    async def get_status(self, max_age: Optional[float] = None) -> Optional[ESP32Status]:
+        """Get current ESP32 status; a cached status at most max_age seconds old is returned as is"""
+        cached = self._fresh_status(max_age)
+        if cached is not None:
+            return cached
+        response = await self._send_command("get_status")
+        if response and response.get('status') == 'ok':
+            return ESP32Status.from_response(response)
+        return None
+
+    async def set_vehicle(self, vehicle: str) -> bool:
+        """Set vehicle type"""
+        response = await self._send_command("set_vehicle", vehicle=vehicle)
+        return response is not None and response.get('status') == 'ok'
+
+    async def set_gear(self, gear: str) -> bool:
+        """Set gear position"""
+        response = await self._send_command("set_gear", gear=gear)
+        return response is not None and response.get('status') == 'ok'
+
+    async def set_speed(self, speed: int) -> bool:
+        """Set speed in km/h"""
+        response = await self._send_command("set_speed", speed=speed)
+        return response is not None and response.get('status') == 'ok'
+
+    async def apply_state(self, vehicle: Optional[str] = None, gear: Optional[str] = None,
+                          speed: Optional[int] = None) -> bool:
+        """Set vehicle, gear and speed atomically in one round trip (None = unchanged)"""
+        fields = self._state_fields(vehicle, gear, speed)
+        response = await self._send_command("set_state", **fields)
+        if self._is_unknown_command(response):
+            # Firmware without set_state: one command per field
+            setters = {"vehicle": self.set_vehicle, "gear": self.set_gear, "speed": self.set_speed}
+            for key, value in fields.items():
+                if not await setters[key](value):
+                    return False
+            return True
+        return response is not None and response.get('status') == 'ok'
+
+    async def set_can_active(self, active: bool) -> bool:
+        """Enable/disable CAN transmission"""
+        response = await self._send_command("set_can_active", active=active)
+        return response is not None and response.get('status') == 'ok'
+
+    async def set_compact(self, enabled: bool) -> bool:
+        """Switch ESP32 output between single-line and pretty-printed JSON"""
+        response = await self._send_command("set_format", compact=enabled)
+        return response is not None and response.get('status') == 'ok'
+    
+    async def set_protocol(self, protocol: str) -> bool:
+        """Switch commands and status updates between "json" and "binary" frames"""
+        response = await self._send_command("set_protocol", protocol=WireProtocol(protocol).value)
+        return response is not None and response.get('status') == 'ok'
+
+    # === Setpoint streaming ===
+    
+    def start_setpoint_stream(self):
+        """Start a new setpoint stream (resets sequence numbers and loss counters)"""
+        self._setpoint_seq = 0
+    
+    def send_setpoint(self, speed: Optional[int] = None, gear: Optional[str] = None,
+                      ack: bool = False) -> Optional[int]:
+        """Stream a speed/gear setpoint without waiting for a reply (returns its seq)"""
+        if not self.is_connected:
+            return None
+        seq, data = self._encode_setpoint(speed, gear, ack)
+        self._transport.write(data)
+        return seq
+    
+    async def flush_setpoints(self, timeout: Optional[float] = None) -> Optional[SetpointStats]:
+        """Request an immediate setpoint_ack and return the stream statistics"""
+        if not self.is_connected:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        seq, data = self._encode_setpoint(None, None, ack=True, future=future)
+        try:
+            self._transport.write(data)
+            return await asyncio.wait_for(future, timeout=timeout or self._response_timeout)
+        except asyncio.TimeoutError:
+            tx_log.warning("⏰ Timeout waiting for setpoint acknowledgement")
+            return None
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            return None
+        finally:
+            self._forget_setpoint_waiter(seq)
+    
+    async def get_supported_vehicles(self) -> Optional[list]:
+        """Get list of supported vehicles"""
+        response = await self._send_command("get_supported_vehicles")
+        if response and response.get('status') == 'ok':
+            return response.get('vehicles', [])
+        return None
+
+    async def reset_settings(self) -> bool:
+        """Reset ESP32 to default settings"""
+        response = await self._send_command("reset_settings")
+        return response is not None and response.get('status') == 'ok'
+
+    async def __aenter__(self):
+        """Async context manager entry"""
+        if await self.connect():
+            return self
+        else:
+            raise ConnectionError("Failed to connect to ESP32")
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit"""
+        await self.disconnect()
@@ -6,25 +6,77 @@ This module provides a Python interface to control the ESP32 CAN simulator
 via serial communication using JSON commands. It supports setting vehicle type,
 gear, speed, and retrieving status information.
 
-Future: Can be extended to support WiFi communication.
+The port can also be a socket://host:port URL (TCP, e.g. a WiFi bridge or
+ser2net) or loopback://name (an in-process emulator); see transport.py.
+
+Traffic, device log lines and status updates are reported through the
+esp32.tx / esp32.rx / esp32.device / esp32.status loggers (see
+esp32_logging); by default only warnings and errors are shown.
 
 Usage:
-    controller = ESP32Controller("/dev/ttyACM0")
+    controller = ESP32Controller("/dev/ttyACM0")      # or "socket://192.168.4.1:3333"
     controller.connect()
     controller.set_vehicle("VWT7")
     controller.set_gear("PARK")
     controller.set_speed(120)
+    controller.apply_state(vehicle="VWT7", gear="DRIVE", speed=50)  # One round trip
     status = controller.get_status()
+    
+    # Local mirror kept current by status_update pushes and command acks
+    status = controller.cached_status                # No I/O, may be None
+    status = controller.get_status(max_age=0.5)      # Round trip only if older than 0.5 s
+
+    # connect() returns as soon as the firmware answers (status_update or
+    # ping), at most ready_timeout seconds. DTR/RTS are left to pyserial
+    # unless given; reset_on_connect pulses EN to reboot the board first.
+    controller = ESP32Controller("/dev/ttyACM0", dtr=False, rts=False)   # Never reset on open
+    controller = ESP32Controller("/dev/ttyACM0", reset_on_connect=True)  # Start from a fresh boot
+
+    # Supervised mode for soak tests: when the port disappears (USB hub
+    # reset, re-enumeration) reconnect with backoff and replay the last
+    # requested vehicle/gear/speed/can_active. Use a stable path such as
+    # /dev/serial/by-id/... so the board is found again.
+    controller = ESP32Controller(port, auto_reconnect=True)
+    controller.on_reconnect = lambda outage: print(outage.duration)
+
+    # Compact binary frames instead of JSON (falls back to JSON on old firmware)
+    controller = ESP32Controller("/dev/ttyACM0", protocol="binary")
+
+    # Fire-and-forget setpoints for profile replay (50-100 Hz)
+    controller.start_setpoint_stream()
+    for speed in speeds:
+        controller.send_setpoint(speed=speed, gear="DRIVE")
+        time.sleep(0.01)
+    stats = controller.flush_setpoints()  # sent / received / lost
+
+    # Accelerated time against the emulator: response, ready and reconnect
+    # timeouts are in simulated seconds (see sim_clock.py)
+    controller = ESP32Controller(emulator.port, clock=VirtualClock(speedup=600))
 """
 
-import serial
+import re
 import json
 import time
+import logging
 import threading
-from typing import Optional, Dict, Any, Callable
+import itertools
+from concurrent.futures import Future, CancelledError, TimeoutError as FutureTimeoutError
+from typing import Optional, Dict, Any, Callable, Tuple, List, NamedTuple
 from enum import Enum
 from dataclasses import dataclass
 
+from json_framer import JsonFramer
+from binary_protocol import BinaryFramer, encode_command
+from esp32_logging import tx_log, rx_log, device_log, status_log, configure_logging
+from device_log import DeviceLogDemux
+from transport import open_transport
+from sim_clock import Clock, WALL_CLOCK
+
+# Interval between ping probes while waiting for the firmware to answer
+READY_PROBE_INTERVAL = 0.2
+# How long EN is held low by reset_on_connect
+RESET_PULSE = 0.1
+
 class VehicleType(Enum):
     """Supported vehicle types"""
     VWT7 = "VWT7"
@@ -40,272 +92,678 @@ class Gear(Enum):
     NEUTRAL = "NEUTRAL"
     DRIVE = "DRIVE"
 
-@dataclass
-class ESP32Status:
-    """Current ESP32 simulator status"""
+class ESP32Status(NamedTuple):
+    """
+    Current ESP32 simulator status.
+    
+    Immutable and without a per-instance __dict__: one status is built for
+    every status_update, so it is kept as small as possible. Use
+    status._replace(speed=50) to derive a changed copy.
+    """
     vehicle: str
     gear: str
     speed: int
     can_active: bool
     uptime: int
     firmware_version: str = "unknown"
+    
+    @classmethod
+    def from_response(cls, response: Dict[str, Any]) -> "ESP32Status":
+        """Build a status from a get_status response or status_update frame"""
+        return cls(
+            vehicle=response.get('vehicle', 'unknown'),
+            gear=response.get('gear', 'unknown'),
+            speed=response.get('speed', 0),
+            can_active=response.get('can_active', False),
+            uptime=response.get('uptime', 0),
+            firmware_version=response.get('firmware_version', 'unknown')
+        )
+
+# status_update exactly as SerialCommandHandler::sendStatusUpdate() prints it,
+# pretty (cJSON_Print) or compact; anything else goes through json.loads
+_STATUS_FRAME = re.compile(
+    rb'\{\s*"type":\s*"status_update",\s*"vehicle":\s*"([^"\\]*)",\s*"gear":\s*"([^"\\]*)",'
+    rb'\s*"speed":\s*(-?\d+),\s*"can_active":\s*(true|false),\s*"uptime":\s*(\d+),'
+    rb'\s*"firmware_version":\s*"([^"\\]*)",\s*"timestamp":\s*\d+\s*\}\s*')
+
+# Decoded vehicle/gear/version strings, so repeated frames share one str object
+_STATUS_STRINGS: Dict[bytes, str] = {}
+_STATUS_STRINGS_MAX = 256
+
+def _status_string(raw: bytes) -> str:
+    value = _STATUS_STRINGS.get(raw)
+    if value is None:
+        value = raw.decode('utf-8', errors='replace')
+        if len(_STATUS_STRINGS) < _STATUS_STRINGS_MAX:
+            _STATUS_STRINGS[raw] = value
+    return value
+
+def parse_status_frame(frame: bytes) -> Optional[ESP32Status]:
+    """
+    Parse a status_update text frame straight into an ESP32Status, without
+    building the intermediate dict json.loads would. None if the frame is
+    not a status_update in the firmware's field order.
+    """
+    match = _STATUS_FRAME.fullmatch(frame)
+    if match is None:
+        return None
+    vehicle, gear, speed, can_active, uptime, firmware_version = match.groups()
+    return ESP32Status(_status_string(vehicle), _status_string(gear), int(speed),
+                       can_active == b'true', int(uptime), _status_string(firmware_version))
+
+# Command acknowledgements whose data updates the status mirror
+# (not set_can_active: the firmware only echoes the requested value and
+# keeps the CAN output running, so its ack says nothing about the device)
+_STATUS_ACKS = {"get_status", "set_vehicle", "set_gear", "set_speed", "set_state"}
+# Response keys mirrored into ESP32Status
+_STATUS_KEYS = {"vehicle": "vehicle", "gear": "gear", "speed": "speed", "can_active": "can_active",
+                "uptime": "uptime", "firmware_version": "firmware_version"}
+
+@dataclass
+class Outage:
+    """One lost-and-recovered connection in supervised mode"""
+    started: float          # clock.time() when the loss was detected
+    duration: float         # Seconds until the link was ready again
+    attempts: int           # Reconnect attempts needed
+    error: str              # Why the connection was lost
+    state_restored: bool    # Desired state replayed successfully
+
+@dataclass
+class SetpointStats:
+    """Setpoint stream counters; received/lost come from the latest setpoint_ack"""
+    sent: int = 0
+    acked_seq: Optional[int] = None
+    received: int = 0
+    lost: int = 0
+
+class ReaderMode(Enum):
+    """How the background reader waits for serial data"""
+    BLOCKING = "blocking"  # Block in read() until bytes arrive (default)
+    POLL = "poll"          # Legacy: poll in_waiting every 10 ms
+
+class WireProtocol(Enum):
+    """Command encoding on the serial link"""
+    JSON = "json"          # JSON lines (default, always understood)
+    BINARY = "binary"      # COBS/CRC frames, see binary_protocol.py
+
+class ESP32Protocol:
+    """
+    Command encoding and response dispatch shared by the sync and async controllers.
+    
+    Subclasses feed received bytes into _process_chunk(); responses complete the
+    future registered for their request ID, whichever future type the caller uses.
+    """
+    
+    def _init_protocol(self):
+        # Pending requests keyed by correlation ID: id -> (command, future)
+        self._pending: Dict[int, Tuple[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self._framer = JsonFramer()
+        # Switched on by the set_protocol acknowledgement
+        self._binary = False
+        
+        # Setpoint streaming: seq 0 starts a stream, then 1..65535 wrapping to 1
+        self._setpoint_seq = 0
+        self._setpoint_waiters: Dict[int, Any] = {}
+        self.setpoint_stats = SetpointStats()
+        
+        # Event callbacks
+        self.on_status_update: Optional[Callable[[ESP32Status], None]] = None
+        self.on_error: Optional[Callable[[str], None]] = None
+        self.on_setpoint_ack: Optional[Callable[[SetpointStats], None]] = None
+        
+        # Optional structured sink for ESP_LOG lines (see device_log)
+        self.log_demux: Optional[DeviceLogDemux] = None
+        
+        # Set by the first frame after connecting (threading or asyncio Event)
+        self._ready_event: Optional[Any] = None
+        
+        # Time source for timestamps and status ages (a VirtualClock for
+        # accelerated-time scenarios)
+        self.clock: Clock = WALL_CLOCK
+        
+        # Status mirror: (status, clock.monotonic() of the last update), replaced
+        # as a whole so readers on other threads always see a consistent pair
+        self._status_snapshot: Tuple[Optional[ESP32Status], float] = (None, 0.0)
+    
+    @property
+    def cached_status(self) -> Optional[ESP32Status]:
+        """Last known status without any I/O (None until the device reported one)"""
+        return self._status_snapshot[0]
+    
+    @property
+    def status_age(self) -> Optional[float]:
+        """Seconds since the status mirror was last updated, None if empty"""
+        status, updated = self._status_snapshot
+        return None if status is None else self.clock.monotonic() - updated
+    
+    def _fresh_status(self, max_age: Optional[float]) -> Optional[ESP32Status]:
+        """The cached status if it is at most max_age seconds old"""
+        status, updated = self._status_snapshot
+        if max_age is None or status is None or self.clock.monotonic() - updated > max_age:
+            return None
+        return status
+    
+    def _invalidate_status(self):
+        self._status_snapshot = (None, 0.0)
+    
+    def _reset_framing(self):
+        """
+        Back to pretty-printed JSON framing for a new link. A rebooted board
+        starts in its default output format, so compact and binary mode are
+        only negotiated again once it has answered the ready probe.
+        """
+        self._framer = JsonFramer()
+        self._binary = False
+    
+    def _update_status(self, response: Dict[str, Any]) -> Optional[ESP32Status]:
+        """Merge the status fields of a frame into the mirror"""
+        changes = {field: response[key] for key, field in _STATUS_KEYS.items() if key in response}
+        current = self._status_snapshot[0]
+        if current is None:
+            # Only a full report (get_status, status_update) can start the mirror
+            if 'vehicle' not in changes or 'gear' not in changes:
+                return None
+            status = ESP32Status.from_response(changes)
+        elif changes:
+            status = current._replace(**changes)
+        else:
+            status = current
+        self._status_snapshot = (status, self.clock.monotonic())
+        return status
+    
+    def _encode_command(self, command: str, future: Any, **kwargs) -> Tuple[int, bytes]:
+        """Build the wire form of a command and register its pending future"""
+        # The ID is echoed back so responses can't be confused
+        request_id = next(self._request_ids)
+        if self._binary:
+            # Binary frames carry a 16-bit sequence number
+            request_id &= 0xFFFF
+            frame = encode_command(command, request_id, **kwargs)
+            with self._pending_lock:
+                self._pending[request_id] = (command, future)
+            if tx_log.isEnabledFor(logging.DEBUG):
+                tx_log.debug("📤 Sending: %s", dict(command=command, id=request_id, **kwargs))
+                tx_log.debug("📤 Raw command: %s", frame.hex())
+            return request_id, frame
+        
+        cmd_dict = {
+            "command": command,
+            "id": request_id,
+            "timestamp": int(self.clock.time() * 1000)
+        }
+        cmd_dict.update(kwargs)
+        
+        with self._pending_lock:
+            self._pending[request_id] = (command, future)
+        
+        cmd_json = json.dumps(cmd_dict) + '\r\n'  # Use CRLF for ESP32
+        tx_log.debug("📤 Sending: %s", cmd_dict)
+        tx_log.debug("📤 Raw command: %r", cmd_json)
+        return request_id, cmd_json.encode('utf-8')
+    
+    def _encode_setpoint(self, speed: Optional[int], gear: Optional[str], ack: bool = False,
+                         future: Any = None) -> Tuple[int, bytes]:
+        """Build a fire-and-forget setpoint; future (if any) completes on its setpoint_ack"""
+        seq = self._setpoint_seq
+        self._setpoint_seq = seq % 0xFFFF + 1
+        if seq == 0:
+            self.setpoint_stats = SetpointStats()
+        self.setpoint_stats.sent += 1
+        
+        fields = self._state_fields(None, gear, speed)
+        if ack:
+            fields["ack"] = True
+        if future is not None:
+            with self._pending_lock:
+                self._setpoint_waiters[seq] = future
+        
+        # Hot path (up to 100 Hz): no logging, no timestamp, compact separators
+        if self._binary:
+            return seq, encode_command("setpoint", seq, **fields)
+        cmd_dict = {"command": "setpoint", "seq": seq}
+        cmd_dict.update(fields)
+        return seq, (json.dumps(cmd_dict, separators=(',', ':')) + '\r\n').encode('utf-8')
+    
+    def _forget_setpoint_waiter(self, seq: int):
+        with self._pending_lock:
+            self._setpoint_waiters.pop(seq, None)
+    
+    @staticmethod
+    def _state_fields(vehicle: Optional[str], gear: Optional[str], speed: Optional[int]) -> Dict[str, Any]:
+        """set_state arguments, leaving out fields that should stay unchanged"""
+        fields = {"vehicle": vehicle, "gear": gear, "speed": speed}
+        return {key: value for key, value in fields.items() if value is not None}
+    
+    @staticmethod
+    def _is_unknown_command(response: Optional[Dict]) -> bool:
+        return response is not None and response.get('message') == 'Unknown command'
+    
+    def _forget_pending(self, request_id: int):
+        with self._pending_lock:
+            self._pending.pop(request_id, None)
+    
+    def _process_chunk(self, chunk: bytes):
+        """Split received bytes into JSON frames, binary frames and ESP32 log lines"""
+        for kind, payload in self._framer.feed(chunk):
+            if kind == BinaryFramer.BINARY:
+                # Already decoded into the same dict form as JSON
+                self._handle_json_response(payload)
+                continue
+            
+            if kind == JsonFramer.TEXT:
+                if self.log_demux is not None:
+                    self.log_demux.feed_line(payload)
+                if device_log.isEnabledFor(logging.INFO):
+                    device_log.info("ESP32: %s", payload.decode('utf-8', errors='ignore'))
+                continue
+            
+            # Skip if this is our own command echo (e.g. "Processing command: {...}")
+            if b'"command"' in payload and b'"timestamp"' in payload and b'"type"' not in payload:
+                continue
+            
+            # Pushed at high rates: parsed directly, without json.loads
+            if b'"status_update"' in payload:
+                status = parse_status_frame(payload)
+                if status is not None:
+                    self._handle_status(status)
+                    continue
+            
+            self._process_response(payload)
+    
+    def _process_response(self, frame: bytes):
+        """Process a complete JSON frame from ESP32"""
+        try:
+            response = json.loads(frame)
+            self._handle_json_response(response)
+                
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            # Brace-balanced but not valid JSON (probably debug output)
+            rx_log.warning("❌ JSON decode error: %s", e)
+            if device_log.isEnabledFor(logging.INFO):
+                device_log.info("ESP32: %s", frame.decode('utf-8', errors='ignore'))
+        except Exception as e:
+            rx_log.warning("⚠️  Error processing response: %s", e)
+    
+    def _handle_json_response(self, response: Dict[str, Any]):
+        """Handle a JSON response from ESP32"""
+        response_type = response.get('type', 'unknown')
+        command = response.get('command', '')
+        
+        # Any decoded frame proves the command handler is up
+        if self._ready_event is not None:
+            self._ready_event.set()
+        
+        if response_type == 'setpoint_ack':
+            # Periodic and is sent at streaming rate: handled without logging
+            self._handle_setpoint_ack(response)
+            return
+        
+        if response_type == 'response':
+            # Command response
+            if command == 'set_format' and response.get('status') == 'ok':
+                # Everything after this acknowledgement uses the new format
+                self._framer.set_single_line(bool(response.get('compact')))
+            elif command == 'set_protocol' and response.get('status') == 'ok':
+                self._switch_protocol(response.get('protocol') == 'binary')
+            elif command in _STATUS_ACKS and response.get('status') == 'ok':
+                self._update_status(response)
+            self._resolve_pending(response)
+            
+        elif response_type == 'status_update':
+            # Status update notification (binary, or text in an unexpected layout)
+            status = self._update_status(response)
+            if status is not None:
+                self._handle_status(status)
+                
+        elif response_type == 'error':
+            # Error notification
+            error_msg = response.get('message', 'Unknown error')
+            rx_log.warning("❌ ESP32 Error: %s", error_msg)
+            # Fail the waiting command now instead of letting it time out
+            self._resolve_pending(response)
+            if self.on_error:
+                self.on_error(error_msg)
+        
+        if response_type != 'status_update':
+            rx_log.debug("📨 ESP32 Response: %s", response)
+    
+    def _handle_status(self, status: ESP32Status):
+        """A complete status was pushed by the firmware"""
+        if self._ready_event is not None:
+            self._ready_event.set()
+        self._status_snapshot = (status, self.clock.monotonic())
+        status_log.debug("📊 Status update: %s", status)
+        if self.on_status_update:
+            self.on_status_update(status)
+    
+    def _handle_setpoint_ack(self, response: Dict[str, Any]):
+        stats = self.setpoint_stats
+        seq = response.get('seq')
+        stats.acked_seq = seq
+        stats.received = response.get('received', stats.received)
+        stats.lost = response.get('lost', stats.lost)
+        
+        with self._pending_lock:
+            future = self._setpoint_waiters.pop(seq, None)
+        if future is not None and not future.done():
+            future.set_result(SetpointStats(stats.sent, stats.acked_seq, stats.received, stats.lost))
+        if self.on_setpoint_ack:
+            self.on_setpoint_ack(stats)
+    
+    def _switch_protocol(self, binary: bool):
+        """Change command encoding; called from the reader on the set_protocol ack"""
+        if binary and not isinstance(self._framer, BinaryFramer):
+            # Wrap the current framer so buffered text survives the switch
+            self._framer = BinaryFramer(text=self._framer)
+        self._binary = binary
+    
+    def _resolve_pending(self, response: Dict[str, Any]):
+        """Complete the pending request a response belongs to"""
+        request_id = response.get('id')
+        command = response.get('command')
+        
+        with self._pending_lock:
+            if request_id in self._pending:
+                _, future = self._pending.pop(request_id)
+            elif request_id is None and command:
+                # Firmware without ID echo: match the oldest request for this command
+                match = next((rid for rid, (cmd, _) in self._pending.items() if cmd == command), None)
+                if match is None:
+                    return
+                _, future = self._pending.pop(match)
+            else:
+                return
+        
+        if not future.done():
+            future.set_result(response)
+    
+    def _cancel_pending(self):
+        """Wake every caller still waiting for a response"""
+        with self._pending_lock:
+            futures = [future for _, future in self._pending.values()]
+            futures.extend(self._setpoint_waiters.values())
+            self._pending.clear()
+            self._setpoint_waiters.clear()
+        for future in futures:
+            future.cancel()
 
-class ESP32Controller:
+class ESP32Controller(ESP32Protocol):
     """Serial controller for ESP32 CAN simulator"""
     
-    def __init__(self, port: str = "/dev/ttyACM0", baudrate: int = 115200, timeout: float = 5.0):
+    def __init__(self, port: str = "/dev/ttyACM0", baudrate: int = 115200, timeout: float = 5.0,
+                 reader_mode: str = "blocking", compact: bool = False, protocol: str = "json",
+                 ready_timeout: float = 3.0, reset_on_connect: bool = False,
+                 dtr: Optional[bool] = None, rts: Optional[bool] = None,
+                 auto_reconnect: bool = False, reconnect_delay: float = 0.5,
+                 reconnect_max_delay: float = 10.0, clock: Clock = WALL_CLOCK):
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
-        self.serial: Optional[serial.Serial] = None
+        self.reader_mode = ReaderMode(reader_mode)
+        self.compact = compact
+        self.protocol = WireProtocol(protocol)
+        self.ready_timeout = ready_timeout
+        self.reset_on_connect = reset_on_connect
+        # Modem line states on open; None keeps pyserial's default (asserted)
+        self.dtr = dtr
+        self.rts = rts
+        # serial.Serial, or a TCP/loopback transport with the same API
+        self.serial: Optional[Any] = None
         
         # Response handling
+        self._init_protocol()
+        # Timeouts and delays below are in seconds of this clock
+        self.clock = clock
         self._response_callbacks: Dict[str, Callable] = {}
-        self._command_responses: Dict[str, Dict] = {}
         self._response_timeout = 5.0
+        self._write_lock = threading.Lock()
         
         # Background reading
         self._read_thread: Optional[threading.Thread] = None
         self._running = False
         
-        # Event callbacks
-        self.on_status_update: Optional[Callable[[ESP32Status], None]] = None
-        self.on_error: Optional[Callable[[str], None]] = None
+        # Supervised reconnect: retry with exponential backoff, then replay
+        # the last requested state (desired_state: vehicle/gear/speed/can_active)
+        self.auto_reconnect = auto_reconnect
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.desired_state: Dict[str, Any] = {}
+        self.outages: List[Outage] = []
+        self.on_connection_lost: Optional[Callable[[str], None]] = None
+        self.on_reconnect: Optional[Callable[[Outage], None]] = None
+        self._supervisor: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
         
     def connect(self) -> bool:
         """Connect to ESP32 via serial"""
+        self._stop_event.clear()
+        return self._open_link()
+    
+    def _open_link(self) -> bool:
+        """Open the port, wait for the firmware and negotiate the output format"""
         try:
             print(f"🔌 Connecting to ESP32 on {self.port} at {self.baudrate} baud...")
             
-            self.serial = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=1.0,
-                write_timeout=self.timeout
-            )
+            self.serial = open_transport(self.port, baudrate=self.baudrate, timeout=1.0,
+                                         write_timeout=self.timeout, dtr=self.dtr, rts=self.rts)
             
-            # Wait for ESP32 to boot up
-            time.sleep(2.0)
+            if self.reset_on_connect:
+                self._reset_board()
             
             # Clear any pending data
             self.serial.reset_input_buffer()
             self.serial.reset_output_buffer()
             
+            # Always start in pretty JSON; compact and binary are negotiated below
+            self._reset_framing()
+            self._ready_event = threading.Event()
+            # The board may have rebooted since the last report
+            self._invalidate_status()
+            
             # Start background reading thread
             self._running = True
             self._read_thread = threading.Thread(target=self._read_responses, daemon=True)
             self._read_thread.start()
-# print(f"📡 Background reader thread started")  # Debug disabled
             
-            # Connection established - skip ping test for now
+            if not self._wait_ready():
+                raise ConnectionError(f"no response from ESP32 within {self.ready_timeout:.1f} s")
+            
+            # Ask for single-line JSON; older firmware just keeps pretty output
+            if self.compact and not self.set_compact(True):
+                print("⚠️  Compact output not supported, using pretty-printed JSON")
+            
+            # Negotiated in JSON so older firmware simply answers "Unknown command"
+            if self.protocol == WireProtocol.BINARY and not self.set_protocol("binary"):
+                print("⚠️  Binary protocol not supported, using JSON")
+            
             print("✅ Connected to ESP32 successfully!")
             return True
                 
         except Exception as e:
             print(f"❌ Failed to connect: {e}")
+            self._running = False
             if self.serial:
+                if self.reader_mode == ReaderMode.BLOCKING and self.serial.is_open:
+                    self.serial.cancel_read()
+                if self._read_thread and self._read_thread.is_alive():
+                    self._read_thread.join(timeout=1.0)
                 self.serial.close()
                 self.serial = None
             return False
     
+    def _reset_board(self):
+        """Reboot the board through the auto-reset circuit (RTS -> EN, DTR -> IO0)"""
+        try:
+            # IO0 high (normal boot), EN low, then release EN
+            self.serial.dtr = False
+            self.serial.rts = True
+            time.sleep(RESET_PULSE)
+            self.serial.rts = False
+        except OSError as e:
+            print(f"⚠️  Could not reset board via DTR/RTS: {e}")
+    
+    def _wait_ready(self) -> bool:
+        """
+        Wait until the firmware answers: its boot status_update or a reply to
+        one of the ping probes sent every READY_PROBE_INTERVAL seconds.
+        """
+        deadline = self.clock.monotonic() + self.ready_timeout
+        while not self._ready_event.is_set():
+            remaining = deadline - self.clock.monotonic()
+            if remaining <= 0:
+                return False
+            request_id, probe = self._encode_command("ping", Future())
+            try:
+                with self._write_lock:
+                    self.serial.write(probe)
+                    self.serial.flush()
+                self.clock.wait(self._ready_event, min(READY_PROBE_INTERVAL, remaining))
+            finally:
+                self._forget_pending(request_id)
+        return True
+    
     def disconnect(self):
-        """Disconnect from ESP32"""
+        """Disconnect from ESP32 (and stop reconnecting)"""
+        self._stop_event.set()
+        supervisor = self._supervisor
+        if supervisor and supervisor is not threading.current_thread():
+            supervisor.join(timeout=self.ready_timeout + 1.0)
+        if self._close_link():
+            print("🔌 Disconnected from ESP32")
+    
+    def _close_link(self) -> bool:
+        """Stop the reader, fail pending commands and close the port; True if it was open"""
         self._running = False
         
+        # Wake the reader if it is blocked in read()
+        if self.serial and self.serial.is_open and self.reader_mode == ReaderMode.BLOCKING:
+            try:
+                self.serial.cancel_read()
+            except Exception:
+                pass
+        
         if self._read_thread and self._read_thread.is_alive():
             self._read_thread.join(timeout=1.0)
         
+        self._cancel_pending()
+        
+        was_open = False
         if self.serial and self.serial.is_open:
-            self.serial.close()
-            print("🔌 Disconnected from ESP32")
+            was_open = True
+            try:
+                self.serial.close()
+            except Exception:
+                pass  # The device may already be gone
         
         self.serial = None
+        return was_open
+    
+    def _read_chunk(self) -> bytes:
+        """Read whatever bytes are available, waiting according to reader_mode"""
+        if self.reader_mode == ReaderMode.BLOCKING:
+            # read(1) sleeps in select() until a byte arrives (or the port
+            # timeout expires / cancel_read() is called), then drain the rest
+            data = self.serial.read(1)
+            if data and self.serial.in_waiting > 0:
+                data += self.serial.read(self.serial.in_waiting)
+            return data
+        
+        if self.serial.in_waiting > 0:
+            return self.serial.read(self.serial.in_waiting)
+        time.sleep(0.01)  # Small delay to prevent busy waiting
+        return b""
     
     def _read_responses(self):
         """Background thread to read responses from ESP32"""
-        import re
-        buffer = ""
-        
-# print(f"📡 Reader thread starting...")  # Debug disabled
-        
         while self._running and self.serial and self.serial.is_open:
             try:
-                if self.serial.in_waiting > 0:
-                    data = self.serial.read(self.serial.in_waiting).decode('utf-8', errors='ignore')
-                    # print(f"📨 Received {len(data)} bytes: {repr(data[:100])}")  # Debug disabled
-                    
-                    # Remove ANSI color codes
-                    ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-                    clean_data = ansi_escape.sub('', data)
-                    # print(f"🧹 Clean data: {repr(clean_data[:100])}")  # Debug disabled
-                    
-                    buffer += clean_data
-                    
-                    # Look for complete JSON objects using brace matching
-                    while buffer:
-                        # Find start of JSON
-                        json_start = buffer.find('{')
-                        if json_start == -1:
-                            # No JSON start, process any lines and clear buffer
-                            lines = buffer.split('\n')
-                            for line in lines[:-1]:  # Process all complete lines
-                                line = line.strip()
-                                if line and not line.startswith('{'):
-                                    # Print ALL debug lines to see if SerialCmd is working
-                                    print(f"ESP32: {line}")
-                            buffer = lines[-1]  # Keep incomplete line
-                            break
-                        
-                        # Handle any text before JSON
-                        if json_start > 0:
-                            pre_json = buffer[:json_start]
-                            lines = pre_json.split('\n')
-                            for line in lines:
-                                line = line.strip()
-                                if line and not line.startswith('{'):
-                                    # Print ALL debug lines to see if SerialCmd is working
-                                    print(f"ESP32: {line}")
-                            buffer = buffer[json_start:]
-                        
-                        # Find matching closing brace
-                        brace_count = 0
-                        json_end = -1
-                        for i, char in enumerate(buffer):
-                            if char == '{':
-                                brace_count += 1
-                            elif char == '}':
-                                brace_count -= 1
-                                if brace_count == 0:
-                                    json_end = i
-                                    break
-                        
-                        if json_end == -1:
-                            # Incomplete JSON, wait for more data
-                            break
-                        
-                        # Extract and process complete JSON
-                        json_str = buffer[:json_end + 1]
-                        buffer = buffer[json_end + 1:]
-                        
-                        # Clean up multiline JSON formatting and whitespace
-                        clean_json = ''.join(line.strip() for line in json_str.split('\n'))
-                        
-                        # Debug output (disabled for cleaner interface)
-                        # print(f"🔍 Found JSON: {clean_json}")
-                        
-                        # Skip if this is our own command echo
-                        if '"command"' in clean_json and '"timestamp"' in clean_json and '"type"' not in clean_json:
-                            # print(f"📤 Skipping command echo")
-                            continue  # This is the command we sent, not a response
-                        
-                        # print(f"📥 Processing response: {clean_json}")
-                        self._process_response(clean_json)
-                
-                time.sleep(0.01)  # Small delay to prevent busy waiting
+                chunk = self._read_chunk()
+                if chunk:
+                    self._process_chunk(chunk)
                 
             except Exception as e:
                 if self._running:  # Only log errors if we're supposed to be running
-                    print(f"⚠️  Error reading from ESP32: {e}")
+                    rx_log.error("⚠️  Error reading from ESP32: %s", e)
+                    supervising = self._supervisor is not None and self._supervisor.is_alive()
+                    if self.auto_reconnect and not supervising and not self._stop_event.is_set():
+                        self._running = False
+                        self._supervisor = threading.Thread(target=self._reconnect, args=(e,), daemon=True)
+                        self._supervisor.start()
                 break
     
-    def _process_response(self, line: str):
-        """Process a response line from ESP32"""
-        try:
-            # print(f"🧮 Processing line: {repr(line)}")  # Debug disabled
-            # Try to parse as JSON
-            if line.startswith('{') and line.endswith('}'):
-                response = json.loads(line)
-                # print(f"✅ Parsed JSON: {response}")  # Debug disabled
-                self._handle_json_response(response)
-            else:
-                # Handle non-JSON responses (debug output, etc.)
-                print(f"ESP32: {line}")
-                
-        except json.JSONDecodeError as e:
-            # Non-JSON line (probably debug output)
-            print(f"❌ JSON decode error: {e}")
-            print(f"ESP32: {line}")
-        except Exception as e:
-            print(f"⚠️  Error processing response: {e}")
-    
-    def _handle_json_response(self, response: Dict[str, Any]):
-        """Handle a JSON response from ESP32"""
-        response_type = response.get('type', 'unknown')
-        command = response.get('command', '')
-        
-        # print(f"🎯 Handling JSON response: type={response_type}, command={command}")  # Debug disabled
-        
-        if response_type == 'response':
-            # Command response
-            # print(f"💾 Storing response for command '{command}': {response}")  # Debug disabled  
-            self._command_responses[command] = response
-            
-        elif response_type == 'status_update':
-            # Status update notification
-            if self.on_status_update:
-                status = ESP32Status(
-                    vehicle=response.get('vehicle', 'unknown'),
-                    gear=response.get('gear', 'unknown'),
-                    speed=response.get('speed', 0),
-                    can_active=response.get('can_active', False),
-                    uptime=response.get('uptime', 0),
-                    firmware_version=response.get('firmware_version', 'unknown')
-                )
-                self.on_status_update(status)
-                
-        elif response_type == 'error':
-            # Error notification
-            error_msg = response.get('message', 'Unknown error')
-            print(f"❌ ESP32 Error: {error_msg}")
-            if self.on_error:
-                self.on_error(error_msg)
+    def _reconnect(self, error: Exception):
+        """Supervisor thread: reconnect with backoff and replay the desired state"""
+        started = self.clock.time()
+        lost_at = self.clock.monotonic()
+        print(f"🔌 Connection to {self.port} lost: {error}")
+        self._close_link()
+        if self.on_connection_lost:
+            self.on_connection_lost(str(error))
         
-        # Debug: print all responses
-        print(f"📨 ESP32 Response: {response}")
+        delay = self.reconnect_delay
+        attempts = 0
+        while not self.clock.wait(self._stop_event, delay):
+            attempts += 1
+            if self._open_link():
+                if self._stop_event.is_set():
+                    self._close_link()  # disconnect() raced with the reconnect
+                    return
+                # The firmware may have rebooted: restart setpoint sequencing too
+                self.start_setpoint_stream()
+                outage = Outage(started, self.clock.monotonic() - lost_at, attempts, str(error),
+                                self._replay_state())
+                self.outages.append(outage)
+                print(f"✅ Reconnected to {self.port} after {outage.duration:.1f} s "
+                      f"({attempts} attempts, state {'restored' if outage.state_restored else 'NOT restored'})")
+                if self.on_reconnect:
+                    self.on_reconnect(outage)
+                return
+            delay = min(delay * 2, self.reconnect_max_delay)
+    
+    def _replay_state(self) -> bool:
+        """Send desired_state to the (possibly rebooted) firmware"""
+        state = dict(self.desired_state)
+        fields = {key: state[key] for key in ("vehicle", "gear", "speed") if key in state}
+        ok = True
+        if fields:
+            ok = self.apply_state(**fields)
+        if "can_active" in state:
+            ok = self.set_can_active(state["can_active"]) and ok
+        return ok
     
     def _send_command_sync(self, command: str, **kwargs) -> Optional[Dict]:
         """Send command and wait for response"""
         if not self.serial or not self.serial.is_open:
-            print("❌ Not connected to ESP32")
+            tx_log.error("❌ Not connected to ESP32")
             return None
         
-        # Build command
-        cmd_dict = {
-            "command": command,
-            "timestamp": int(time.time() * 1000)
-        }
-        cmd_dict.update(kwargs)
-        
-        # Clear any previous response
-        if command in self._command_responses:
-            del self._command_responses[command]
+        future: Future = Future()
+        request_id, cmd_json = self._encode_command(command, future, **kwargs)
         
         try:
             # Send command
-            cmd_json = json.dumps(cmd_dict) + '\r\n'  # Use CRLF for ESP32
-            print(f"📤 Sending: {cmd_dict}")
-            print(f"📤 Raw command: {repr(cmd_json)}")
-            self.serial.write(cmd_json.encode('utf-8'))
-            self.serial.flush()
-            print(f"📤 Command sent successfully")
+            with self._write_lock:
+                self.serial.write(cmd_json)
+                self.serial.flush()
+            tx_log.debug("📤 Command sent successfully")
             
-            # Wait for response
+            # Wait for response; the reader thread completes the future
             timeout = kwargs.get('timeout', self._response_timeout)
-            start_time = time.time()
-            
-            while (time.time() - start_time) < timeout:
-                if command in self._command_responses:
-                    response = self._command_responses[command]
-                    del self._command_responses[command]  # Clean up
-                    return response
-                time.sleep(0.01)
+            return future.result(timeout=self.clock.to_real(timeout))
             
-            print(f"⏰ Timeout waiting for response to '{command}'")
+        except FutureTimeoutError:
+            tx_log.warning("⏰ Timeout waiting for response to '%s'", command)
+            return None
+        except CancelledError:
+            tx_log.warning("🔌 Disconnected while waiting for response to '%s'", command)
             return None
-            
         except Exception as e:
-            print(f"❌ Error sending command '{command}': {e}")
+            tx_log.error("❌ Error sending command '%s': %s", command, e)
             return None
+        finally:
+            self._forget_pending(request_id)
     
     # === High-level API methods ===
     
@@ -314,40 +772,113 @@ class ESP32Controller:
         response = self._send_command_sync("ping")
         return response is not None and response.get('status') == 'ok'
     
-    def get_status(self) -> Optional[ESP32Status]:
-        """Get current ESP32 status"""
+    def get_status(self, max_age: Optional[float] = None) -> Optional[ESP32Status]:
+        """
+        Get current ESP32 status. With max_age, the cached status is returned
+        without a round trip if it was updated at most max_age seconds ago.
+        """
+        cached = self._fresh_status(max_age)
+        if cached is not None:
+            return cached
         response = self._send_command_sync("get_status")
         if response and response.get('status') == 'ok':
-            return ESP32Status(
-                vehicle=response.get('vehicle', 'unknown'),
-                gear=response.get('gear', 'unknown'),
-                speed=response.get('speed', 0),
-                can_active=response.get('can_active', False),
-                uptime=response.get('uptime', 0),
-                firmware_version=response.get('firmware_version', 'unknown')
-            )
+            return ESP32Status.from_response(response)
         return None
     
     def set_vehicle(self, vehicle: str) -> bool:
         """Set vehicle type"""
+        self.desired_state["vehicle"] = vehicle
         response = self._send_command_sync("set_vehicle", vehicle=vehicle)
         return response is not None and response.get('status') == 'ok'
     
     def set_gear(self, gear: str) -> bool:
         """Set gear position"""
+        self.desired_state["gear"] = gear
         response = self._send_command_sync("set_gear", gear=gear)
         return response is not None and response.get('status') == 'ok'
     
     def set_speed(self, speed: int) -> bool:
         """Set speed in km/h"""
+        self.desired_state["speed"] = speed
         response = self._send_command_sync("set_speed", speed=speed)
         return response is not None and response.get('status') == 'ok'
     
+    def apply_state(self, vehicle: Optional[str] = None, gear: Optional[str] = None,
+                    speed: Optional[int] = None) -> bool:
+        """Set vehicle, gear and speed atomically in one round trip (None = unchanged)"""
+        fields = self._state_fields(vehicle, gear, speed)
+        self.desired_state.update(fields)
+        response = self._send_command_sync("set_state", **fields)
+        if self._is_unknown_command(response):
+            # Firmware without set_state: one command per field
+            setters = {"vehicle": self.set_vehicle, "gear": self.set_gear, "speed": self.set_speed}
+            return all(setters[key](value) for key, value in fields.items())
+        return response is not None and response.get('status') == 'ok'
+    
     def set_can_active(self, active: bool) -> bool:
         """Enable/disable CAN transmission"""
+        self.desired_state["can_active"] = active
         response = self._send_command_sync("set_can_active", active=active)
         return response is not None and response.get('status') == 'ok'
     
+    def set_compact(self, enabled: bool) -> bool:
+        """Switch ESP32 output between single-line and pretty-printed JSON"""
+        response = self._send_command_sync("set_format", compact=enabled)
+        return response is not None and response.get('status') == 'ok'
+    
+    def set_protocol(self, protocol: str) -> bool:
+        """Switch commands and status updates between "json" and "binary" frames"""
+        response = self._send_command_sync("set_protocol", protocol=WireProtocol(protocol).value)
+        return response is not None and response.get('status') == 'ok'
+    
+    # === Setpoint streaming ===
+    
+    def start_setpoint_stream(self):
+        """Start a new setpoint stream (resets sequence numbers and loss counters)"""
+        self._setpoint_seq = 0
+    
+    def send_setpoint(self, speed: Optional[int] = None, gear: Optional[str] = None,
+                      ack: bool = False) -> Optional[int]:
+        """
+        Stream a speed/gear setpoint without waiting for a reply.
+        
+        The firmware applies the latest setpoint on its next CAN tick and
+        acknowledges every 10th one (or this one if ack=True); see
+        setpoint_stats / on_setpoint_ack. Returns the sequence number.
+        """
+        if speed is not None:
+            self.desired_state["speed"] = speed
+        if gear is not None:
+            self.desired_state["gear"] = gear
+        if not self.serial or not self.serial.is_open:
+            return None
+        seq, data = self._encode_setpoint(speed, gear, ack)
+        try:
+            with self._write_lock:
+                self.serial.write(data)
+        except Exception as e:
+            tx_log.error("❌ Error sending setpoint: %s", e)
+            return None
+        return seq
+    
+    def flush_setpoints(self, timeout: Optional[float] = None) -> Optional[SetpointStats]:
+        """Request an immediate setpoint_ack and return the stream statistics"""
+        if not self.serial or not self.serial.is_open:
+            return None
+        future: Future = Future()
+        seq, data = self._encode_setpoint(None, None, ack=True, future=future)
+        try:
+            with self._write_lock:
+                self.serial.write(data)
+            return future.result(timeout=self.clock.to_real(timeout or self._response_timeout))
+        except FutureTimeoutError:
+            tx_log.warning("⏰ Timeout waiting for setpoint acknowledgement")
+            return None
+        except CancelledError:
+            return None
+        finally:
+            self._forget_setpoint_waiter(seq)
+    
     def get_supported_vehicles(self) -> Optional[list]:
         """Get list of supported vehicles"""
         response = self._send_command_sync("get_supported_vehicles")
@@ -357,6 +888,7 @@ class ESP32Controller:
     
     def reset_settings(self) -> bool:
         """Reset ESP32 to default settings"""
+        self.desired_state.clear()
         response = self._send_command_sync("reset_settings")
         return response is not None and response.get('status') == 'ok'
     
@@ -386,7 +918,8 @@ def test_connection(port: str = "/dev/ttyACM0") -> bool:
         return False
 
 if __name__ == "__main__":
-    # Simple test/demo
+    # Simple test/demo: show device log and warnings (DEBUG for a full traffic dump)
+    configure_logging()
     print("🚗 ESP32 Controller Test")
     print("=" * 50)
     
@@ -0,0 +1,710 @@
+#!/usr/bin/env python3
+"""
+ESP32 CAN Simulator Emulator
+
+Host-side stand-in for the ESP32 firmware. It opens a pseudo terminal (pty)
+and answers the same JSON commands as SerialCommandHandler, using the same
+pretty-printed response format as cJSON_Print and the same ESP_LOG style
+debug lines. Binary COBS/CRC frames (binary_protocol.py) are answered in
+binary, like on the firmware. ESP32Controller can connect to the pty slave exactly like it
+connects to /dev/ttyACM0, which makes it possible to run the host stack
+and benchmarks without hardware.
+
+The emulator can also be served in-process over a loopback transport
+(no pty, no kernel: the whole host stack runs at memory speed) or over TCP
+(see transport.py); emulator.port is then a loopback:// or socket:// URL
+that ESP32Controller opens the same way.
+
+With can_channel set, a TWAI task publishes the gear and speed frames of
+the current vehicle every 100 ms on a python-can bus (the in-process
+"virtual" interface by default), encoded like the firmware's message
+generators (message_generators.py), so the CAN output can be checked
+without a board or a PCAN dongle.
+
+With a VirtualClock (sim_clock.py) the emulator runs in accelerated time:
+uptime, response delays and the TWAI cadence follow the simulated clock.
+Frames on the virtual bus are stamped with their simulated tick time, and
+a tick that is due while the host is busy is sent late rather than
+skipped, like a device that never misses its schedule.
+
+Usage:
+    emulator = ESP32Emulator()
+    emulator.start()
+    controller = ESP32Controller(emulator.port)
+    ...
+    emulator.stop()
+
+    emulator = ESP32Emulator(transport="loopback")      # port: loopback://esp32-emulator-1
+    emulator = ESP32Emulator(transport="tcp")           # port: socket://127.0.0.1:<free port>
+
+    emulator = ESP32Emulator(can_channel="sim")         # CAN on can.Bus(interface="virtual", channel="sim")
+    emulator = ESP32Emulator(can_channel="sim", clock=VirtualClock(speedup=600))
+
+    python3 esp32_emulator.py          # Run standalone and print the pty path
+    python3 esp32_emulator.py --tcp 3333
+"""
+
+import os
+import tty
+import json
+import time
+import socket
+import select
+import argparse
+import itertools
+import threading
+from typing import Optional, Dict, Any
+
+import binary_protocol
+from transport import TcpTransport, register_loopback, unregister_loopback
+from message_generators import get_message_generator
+from sim_clock import Clock, WALL_CLOCK
+
+TRANSPORTS = ("pty", "loopback", "tcp")
+
+SUPPORTED_VEHICLES = [
+    "VWT5", "VWT6", "VWT61", "VWT7", "MB_SPRINTER", "MB_SPRINTER_2023",
+    "JEEP_RENEGADE", "JEEP_RENEGADE_MHEV", "MB_VIANO"
+]
+
+SUPPORTED_GEARS = ["PARK", "REVERSE", "NEUTRAL", "DRIVE"]
+
+FIRMWARE_VERSION = "1.0.0"
+
+SETPOINT_ACK_INTERVAL = 10
+
+# twai_task: vTaskDelay(pdMS_TO_TICKS(100)) between periodic messages
+CAN_PERIOD = 0.1
+
+def cjson_print(obj: Dict[str, Any]) -> str:
+    """Format a flat object the way cJSON_Print does (tab indented)"""
+    items = [f'\t{json.dumps(key)}:\t{json.dumps(value)}' for key, value in obj.items()]
+    return "{\n" + ",\n".join(items) + "\n}"
+
+def cjson_print_unformatted(obj: Dict[str, Any]) -> str:
+    """Format an object the way cJSON_PrintUnformatted does (single line)"""
+    return json.dumps(obj, separators=(',', ':'))
+
+class ESP32Emulator:
+    """Pty-, loopback- or TCP-backed emulation of the ESP32 serial command interface"""
+
+    _instances = itertools.count(1)
+
+    def __init__(self, response_delay: float = 0.0, log_commands: bool = True,
+                 transport: str = "pty", tcp_port: int = 0, can_channel: Optional[str] = None,
+                 can_interface: str = "virtual", can_period: float = CAN_PERIOD,
+                 clock: Clock = WALL_CLOCK):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport '{transport}', expected one of {TRANSPORTS}")
+        self.response_delay = response_delay
+        self.log_commands = log_commands
+        self.transport = transport
+        self.tcp_port = tcp_port
+        self.can_channel = can_channel
+        self.can_interface = can_interface
+        self.can_period = can_period
+        self.clock = clock
+
+        # Simulated controller state (matches CarCanController defaults)
+        self.vehicle = "VWT6"
+        self.gear = "PARK"
+        self.speed = 0
+        self.can_active = True
+        self.compact_output = False
+        self.binary_output = False
+
+        # Setpoint stream statistics (reported in setpoint_ack)
+        self.setpoint_last_seq = 0
+        self.setpoint_received = 0
+        self.setpoint_lost = 0
+        self._setpoint_stream_active = False
+
+        self.commands_received = 0
+        self.can_frames_sent = 0
+
+        self._master_fd: Optional[int] = None
+        self._slave_fd: Optional[int] = None
+        # Loopback/TCP: the current host connection (like the open side of a UART)
+        self._link: Optional[Any] = None
+        self._link_event = threading.Event()   # Set by _accept()
+        self._server: Optional[socket.socket] = None
+        self._loopback_name = f"esp32-emulator-{next(self._instances)}"
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._boot_time = self.clock.monotonic()
+        self._write_lock = threading.Lock()
+        self._request_id: Optional[int] = None
+        self._request_binary = False
+        self._reset_input()
+        # Held while several state fields change, like CarCanController's state_mutex
+        self._state_lock = threading.Lock()
+        self._can_bus: Optional[Any] = None
+        self._can_thread: Optional[threading.Thread] = None
+        self._can_stop = threading.Event()
+
+    @property
+    def port(self) -> str:
+        """Port a controller should open: pty path, loopback:// or socket:// URL"""
+        if self.transport == "loopback":
+            return f"loopback://{self._loopback_name}"
+        if self.transport == "tcp":
+            if self._server is None:
+                raise RuntimeError("Emulator not started")
+            host, port = self._server.getsockname()[:2]
+            return f"socket://{host}:{port}"
+        if self._slave_fd is None:
+            raise RuntimeError("Emulator not started")
+        return os.ttyname(self._slave_fd)
+
+    def start(self):
+        """Open the pty (or start listening) and start answering commands"""
+        if self.transport == "pty":
+            self._master_fd, self._slave_fd = os.openpty()
+            # Raw mode so the line discipline neither echoes nor rewrites our output
+            tty.setraw(self._slave_fd)
+            tty.setraw(self._master_fd)
+        elif self.transport == "loopback":
+            register_loopback(self._loopback_name, self._accept)
+        else:
+            self._server = socket.create_server(("127.0.0.1", self.tcp_port))
+
+        self._boot_time = self.clock.monotonic()
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+        if self.can_channel is not None:
+            import can  # Only needed for CAN output
+            options = {}
+            if self.can_interface == "virtual":
+                options["preserve_timestamps"] = True  # Keep the simulated tick times
+            self._can_bus = can.Bus(interface=self.can_interface, channel=self.can_channel, **options)
+            self._can_stop.clear()
+            self._can_thread = threading.Thread(target=self._twai_task, daemon=True)
+            self._can_thread.start()
+
+        # Firmware sends an initial status update once the handler is up
+        self._send_status_update()
+
+    def stop(self):
+        """Stop the emulator and close the pty or connections"""
+        self._running = False
+        self._can_stop.set()
+        if self._can_thread and self._can_thread.is_alive():
+            self._can_thread.join(timeout=1.0)
+        if self._can_bus is not None:
+            self._can_bus.shutdown()
+            self._can_bus = None
+        if self.transport == "loopback":
+            unregister_loopback(self._loopback_name)
+        link, self._link = self._link, None
+        if link is not None:
+            link.close()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for fd in (self._master_fd, self._slave_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master_fd = None
+        self._slave_fd = None
+
+    def reboot(self):
+        """
+        Simulate a power cycle: drop the host connection (loopback/TCP; a pty
+        stays open like a UART) and come back with the firmware defaults
+        """
+        link, self._link = self._link, None
+        with self._state_lock:
+            self.vehicle = "VWT6"
+            self.gear = "PARK"
+            self.speed = 0
+        self.can_active = True
+        self.compact_output = False
+        self.binary_output = False
+        self.setpoint_last_seq = 0
+        self.setpoint_received = 0
+        self.setpoint_lost = 0
+        self._setpoint_stream_active = False
+        self._boot_time = self.clock.monotonic()
+        if link is not None:
+            link.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _accept(self, link: Any):
+        """A host opened the port; a new connection replaces the previous one"""
+        old, self._link = self._link, link
+        self._link_event.set()
+        if old is not None:
+            old.close()
+
+    # === Serial I/O ===
+
+    def _tick_ms(self) -> int:
+        return int((self.clock.monotonic() - self._boot_time) * 1000)
+
+    def _write(self, text: str):
+        self._write_bytes(text.encode('utf-8'))
+
+    def _write_bytes(self, data: bytes):
+        with self._write_lock:
+            if self.transport != "pty":
+                link = self._link
+                if link is None:
+                    return  # Nobody connected: the bytes are lost, as on a UART
+                try:
+                    link.write(data)
+                except (ConnectionError, OSError):
+                    pass
+                return
+            while data and self._master_fd is not None:
+                try:
+                    written = os.write(self._master_fd, data)
+                except OSError:
+                    return
+                data = data[written:]
+
+    def _log(self, level: str, tag: str, message: str):
+        """Emit an ESP_LOG style line with ANSI colors"""
+        colors = {"E": "31", "W": "33", "I": "32"}
+        color = colors.get(level)
+        line = f"{level} ({self._tick_ms()}) {tag}: {message}"
+        if color:
+            line = f"\x1b[0;{color}m{line}\x1b[0m"
+        self._write(line + "\n")
+
+    def _reset_input(self):
+        self._line_buffer = b""
+        self._frame = bytearray()
+        self._in_frame = False
+
+    def _read_input(self) -> Optional[bytes]:
+        """Received bytes, b"" if none arrived within 0.1 s, None when the port is gone"""
+        if self.transport == "pty":
+            if self._master_fd is None:
+                return None
+            try:
+                ready, _, _ = select.select([self._master_fd], [], [], 0.1)
+                return os.read(self._master_fd, 4096) if ready else b""
+            except OSError:
+                return None
+
+        if self._link is None and self._server is not None:
+            # TCP: wait for the next client
+            try:
+                ready, _, _ = select.select([self._server], [], [], 0.1)
+                if ready:
+                    sock, address = self._server.accept()
+                    link = TcpTransport(address[0], address[1], timeout=0.1, sock=sock)
+                    self._reset_input()
+                    self._accept(link)
+            except OSError:
+                return None
+            return b""
+
+        link = self._link
+        if link is None:
+            # Idle until a host connects, without polling latency
+            self._link_event.wait(0.1)
+            self._link_event.clear()
+            return b""
+        link.timeout = 0.1
+        try:
+            data = link.read(1)
+            if data and link.in_waiting:
+                data += link.read(link.in_waiting)
+            return data
+        except (ConnectionError, OSError):
+            # Host closed the port; keep serving the next connection
+            if self._link is link:
+                self._link = None
+                link.close()
+            self._reset_input()
+            return b""
+
+    def _serve(self):
+        while self._running:
+            data = self._read_input()
+            if data is None:
+                break
+            if data:
+                self._feed(data)
+
+    def _feed(self, data: bytes):
+        # 0x00 delimits binary frames; everything else is JSON lines
+        while b'\x00' in data or self._in_frame:
+            delimiter = data.find(b'\x00')
+            if self._in_frame:
+                if delimiter == -1:
+                    self._frame += data
+                    data = b""
+                    break
+                self._frame += data[:delimiter]
+                if self._frame:
+                    self._process_binary_frame(bytes(self._frame))
+                    self._frame.clear()
+                    self._in_frame = False
+                # else: empty frame, this delimiter opens the next one
+            else:
+                self._line_buffer += data[:delimiter]
+                self._in_frame = True
+            data = data[delimiter + 1:]
+
+        self._line_buffer += data
+        while True:
+            positions = [p for p in (self._line_buffer.find(b'\n'), self._line_buffer.find(b'\r')) if p != -1]
+            if not positions:
+                break
+            end = min(positions)
+            line = self._line_buffer[:end].decode('utf-8', errors='ignore').strip()
+            self._line_buffer = self._line_buffer[end + 1:]
+            if line:
+                self._process_command(line)
+
+    # === Command handling (mirrors SerialCommandHandler::processCommand) ===
+
+    def _process_command(self, command_str: str):
+        self.commands_received += 1
+        try:
+            request = json.loads(command_str)
+        except json.JSONDecodeError:
+            request = None
+
+        # Streamed setpoints are not logged (the firmware skips them too)
+        is_setpoint = isinstance(request, dict) and request.get("command") == "setpoint"
+        if self.log_commands and not is_setpoint:
+            self._log("I", "SerialCmd", f"Processing command: {command_str}")
+
+        if self.response_delay and not is_setpoint:
+            self.clock.sleep(self.response_delay)
+
+        if request is None:
+            self._send_error("Invalid JSON format")
+            return
+        if not isinstance(request, dict):
+            self._send_error("Missing or invalid 'command' field")
+            return
+        self._dispatch(request, binary=False)
+
+    def _process_binary_frame(self, encoded: bytes):
+        self.commands_received += 1
+        try:
+            request = binary_protocol.decode_frame(encoded)
+        except binary_protocol.ProtocolError as e:
+            self._log("W", "SerialCmd", f"Dropping binary frame: {e}")
+            return
+        if request.get("type") != "command":
+            self._log("W", "SerialCmd", "Unexpected binary message type")
+            return
+        is_setpoint = request.get("command") == "setpoint"
+        if self.log_commands and not is_setpoint:
+            self._log("I", "SerialCmd", f"Processing binary command: {request.get('command', 'unknown')}")
+
+        if self.response_delay and not is_setpoint:
+            self.clock.sleep(self.response_delay)
+        self._dispatch(request, binary=True)
+
+    def _dispatch(self, request: Dict[str, Any], binary: bool):
+        # Echo the correlation ID (and request format) in every response to this command
+        request_id = request.get("id")
+        self._request_id = request_id if isinstance(request_id, int) and not isinstance(request_id, bool) else None
+        self._request_binary = binary
+        try:
+            command = request.get("command")
+            if not isinstance(command, str):
+                self._send_error("Missing or invalid 'command' field")
+                return
+
+            handler = getattr(self, f"_handle_{command}", None)
+            if handler is None:
+                self._send_error("Unknown command", command)
+                return
+            handler(request)
+        finally:
+            self._request_id = None
+            self._request_binary = False
+
+    def _handle_ping(self, request: Dict[str, Any]):
+        self._send_response("response", "ok", "ping")
+
+    def _handle_get_status(self, request: Dict[str, Any]):
+        self._send_response("response", "ok", "get_status", self._status_fields())
+
+    def _handle_set_vehicle(self, request: Dict[str, Any]):
+        vehicle = request.get("vehicle")
+        if not isinstance(vehicle, str):
+            self._send_error("Missing or invalid 'vehicle' field", "set_vehicle")
+            return
+        if vehicle not in SUPPORTED_VEHICLES:
+            self._send_error("Unsupported vehicle type", "set_vehicle")
+            return
+        self.vehicle = vehicle
+        self._send_response("response", "ok", "set_vehicle", {"vehicle": vehicle})
+        self._send_status_update()
+
+    def _handle_set_gear(self, request: Dict[str, Any]):
+        gear = request.get("gear")
+        if not isinstance(gear, str):
+            self._send_error("Missing or invalid 'gear' field", "set_gear")
+            return
+        if gear not in SUPPORTED_GEARS:
+            self._send_error("Invalid gear value", "set_gear")
+            return
+        self.gear = gear
+        self._send_response("response", "ok", "set_gear", {"gear": gear})
+        self._send_status_update()
+
+    def _handle_set_speed(self, request: Dict[str, Any]):
+        speed = request.get("speed")
+        if not isinstance(speed, (int, float)) or isinstance(speed, bool):
+            self._send_error("Missing or invalid 'speed' field", "set_speed")
+            return
+        speed = int(speed)
+        if speed < 0 or speed > 250:
+            self._send_error("Speed must be between 0 and 250 km/h", "set_speed")
+            return
+        self.speed = speed
+        self._send_response("response", "ok", "set_speed", {"speed": speed})
+        self._send_status_update()
+
+    def _handle_set_state(self, request: Dict[str, Any]):
+        vehicle, gear, speed = self.vehicle, self.gear, self.speed
+
+        # Validate every field before applying any of them
+        if "vehicle" in request:
+            vehicle = request["vehicle"]
+            if not isinstance(vehicle, str):
+                self._send_error("Invalid 'vehicle' field", "set_state")
+                return
+            if vehicle not in SUPPORTED_VEHICLES:
+                self._send_error("Unsupported vehicle type", "set_state")
+                return
+        if "gear" in request:
+            gear = request["gear"]
+            if not isinstance(gear, str):
+                self._send_error("Invalid 'gear' field", "set_state")
+                return
+            if gear not in SUPPORTED_GEARS:
+                self._send_error("Invalid gear value", "set_state")
+                return
+        if "speed" in request:
+            speed = request["speed"]
+            if not isinstance(speed, (int, float)) or isinstance(speed, bool):
+                self._send_error("Invalid 'speed' field", "set_state")
+                return
+            speed = int(speed)
+            if speed < 0 or speed > 250:
+                self._send_error("Speed must be between 0 and 250 km/h", "set_state")
+                return
+
+        with self._state_lock:
+            self.vehicle, self.gear, self.speed = vehicle, gear, speed
+        self._send_response("response", "ok", "set_state",
+                            {"vehicle": vehicle, "gear": gear, "speed": speed})
+        self._send_status_update()
+
+    def _handle_set_can_active(self, request: Dict[str, Any]):
+        active = request.get("active")
+        if not isinstance(active, bool):
+            self._send_error("Missing or invalid 'active' field", "set_can_active")
+            return
+        self._send_response("response", "ok", "set_can_active", {"active": active})
+
+    def _handle_get_supported_vehicles(self, request: Dict[str, Any]):
+        self._send_response("response", "ok", "get_supported_vehicles",
+                            {"vehicles": list(SUPPORTED_VEHICLES)})
+
+    def _handle_reset_settings(self, request: Dict[str, Any]):
+        with self._state_lock:
+            self.vehicle = "VWT6"
+            self.gear = "PARK"
+            self.speed = 0
+        self._send_response("response", "ok", "reset_settings")
+        self._send_status_update()
+
+    def _handle_set_format(self, request: Dict[str, Any]):
+        compact = request.get("compact")
+        if not isinstance(compact, bool):
+            self._send_error("Missing or invalid 'compact' field", "set_format")
+            return
+        # Switch first so the acknowledgement already uses the new format
+        self.compact_output = compact
+        self._send_response("response", "ok", "set_format", {"compact": compact})
+
+    def _handle_set_protocol(self, request: Dict[str, Any]):
+        protocol = request.get("protocol")
+        if not isinstance(protocol, str):
+            self._send_error("Missing or invalid 'protocol' field", "set_protocol")
+            return
+        if protocol not in binary_protocol.PROTOCOLS:
+            self._send_error("Unsupported protocol", "set_protocol")
+            return
+        # Only status updates follow this; responses use the request format
+        self.binary_output = protocol == "binary"
+        self._send_response("response", "ok", "set_protocol", {"protocol": protocol})
+
+    def _handle_setpoint(self, request: Dict[str, Any]):
+        # The sequence number is not a request ID; binary frames carry it as "id"
+        seq = request.get("seq", request.get("id"))
+        self._request_id = None
+        if not isinstance(seq, int) or isinstance(seq, bool):
+            self._send_error("Missing or invalid 'seq' field", "setpoint")
+            return
+        seq &= 0xFFFF
+
+        gear, speed = self.gear, self.speed
+        if "gear" in request:
+            gear = request["gear"]
+            if not isinstance(gear, str):
+                self._send_error("Invalid 'gear' field", "setpoint")
+                return
+            if gear not in SUPPORTED_GEARS:
+                self._send_error("Invalid gear value", "setpoint")
+                return
+        if "speed" in request:
+            speed = request["speed"]
+            if not isinstance(speed, (int, float)) or isinstance(speed, bool):
+                self._send_error("Invalid 'speed' field", "setpoint")
+                return
+            speed = int(speed)
+            if speed < 0 or speed > 250:
+                self._send_error("Speed must be between 0 and 250 km/h", "setpoint")
+                return
+
+        # 0 starts a new stream, then sequence numbers run 1..65535 and wrap to 1
+        if seq == 0 or not self._setpoint_stream_active:
+            self.setpoint_received = 0
+            self.setpoint_lost = 0
+            self._setpoint_stream_active = True
+        else:
+            last = self.setpoint_last_seq
+            gap = seq - last if seq > last else seq + 0xFFFF - last
+            if seq == last or gap >= 0x8000:
+                return  # Duplicate or stale
+            self.setpoint_lost += gap - 1
+        self.setpoint_last_seq = seq
+        self.setpoint_received += 1
+
+        # The firmware applies this on its next CAN tick; no tick here
+        with self._state_lock:
+            self.gear, self.speed = gear, speed
+
+        if request.get("ack") is True or self.setpoint_received % SETPOINT_ACK_INTERVAL == 0:
+            self._send_response("setpoint_ack", "ok", "setpoint", {
+                "seq": self.setpoint_last_seq,
+                "received": self.setpoint_received,
+                "lost": self.setpoint_lost,
+            })
+
+    # === Responses (mirror SerialCommandHandler::sendResponse) ===
+
+    def _print_json(self, obj: Dict[str, Any]):
+        text = cjson_print_unformatted(obj) if self.compact_output else cjson_print(obj)
+        self._write(text + "\n")
+
+    def _status_fields(self) -> Dict[str, Any]:
+        return {
+            "vehicle": self.vehicle,
+            "gear": self.gear,
+            "speed": self.speed,
+            "can_active": self.can_active,
+            "uptime": self._tick_ms() // 1000,
+            "firmware_version": FIRMWARE_VERSION,
+        }
+
+    def _send_response(self, type_: str, status: str, command: Optional[str] = None,
+                       data: Optional[Dict[str, Any]] = None):
+        response: Dict[str, Any] = {"type": type_, "status": status}
+        if command:
+            response["command"] = command
+        if self._request_id is not None:
+            response["id"] = self._request_id
+        response["timestamp"] = self._tick_ms()
+        if data:
+            response.update(data)
+        if self._request_binary:
+            self._write_bytes(binary_protocol.encode_message(response))
+        else:
+            self._print_json(response)
+
+    def _send_error(self, message: str, command: Optional[str] = None):
+        self._send_response("error", "error", command, {"message": message})
+
+    def _send_status_update(self):
+        update: Dict[str, Any] = {"type": "status_update"}
+        update.update(self._status_fields())
+        update["timestamp"] = self._tick_ms()
+        if self.binary_output:
+            self._write_bytes(binary_protocol.encode_message(update))
+        else:
+            self._print_json(update)
+
+    # === CAN output (mirrors twai_task / CarCanController::sendPeriodicMessages) ===
+
+    def _twai_task(self):
+        import can
+        clock = self.clock
+        next_tick = clock.monotonic()
+        epoch_offset = clock.time() - next_tick
+        while not self._can_stop.is_set():
+            with self._state_lock:
+                vehicle, gear, speed = self.vehicle, self.gear, self.speed
+            generator = get_message_generator(vehicle)
+            if generator is not None:
+                gear_id, speed_id = generator.required_message_ids()
+                stamp = epoch_offset + next_tick
+                try:
+                    self._can_bus.send(can.Message(timestamp=stamp, arbitration_id=gear_id, is_extended_id=False,
+                                                   data=generator.generate_gear_message(gear)))
+                    self._can_bus.send(can.Message(timestamp=stamp, arbitration_id=speed_id, is_extended_id=False,
+                                                   data=generator.generate_speed_message(speed)))
+                    self.can_frames_sent += 2
+                except can.CanError as e:
+                    self._log("E", "CarCan", f"Failed to send CAN message: {e}")
+
+            # Fixed cadence. In real time a stall skips ticks instead of
+            # bursting; in simulated time every tick is sent, late if need be
+            next_tick += self.can_period
+            delay = next_tick - clock.monotonic()
+            if delay < 0 and not clock.virtual:
+                next_tick = clock.monotonic()
+            if delay > 0:
+                clock.wait(self._can_stop, delay)
+
+def main():
+    parser = argparse.ArgumentParser(description="Host-side ESP32 CAN simulator emulator")
+    parser.add_argument("--tcp", type=int, metavar="PORT", help="Serve on TCP port PORT instead of a pty")
+    parser.add_argument("--can-channel", help="Publish CAN frames on this python-can channel")
+    parser.add_argument("--can-interface", default="virtual",
+                        help="python-can interface for --can-channel (default: virtual, or e.g. socketcan)")
+    args = parser.parse_args()
+
+    can_options = dict(can_channel=args.can_channel, can_interface=args.can_interface)
+    if args.tcp is not None:
+        emulator = ESP32Emulator(transport="tcp", tcp_port=args.tcp, **can_options)
+    else:
+        emulator = ESP32Emulator(**can_options)
+    emulator.start()
+    print(f"🧪 ESP32 emulator running on {emulator.port}")
+    print("Press Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        print("\n⏹️  Emulator stopped by user")
+    finally:
+        emulator.stop()
+
+if __name__ == "__main__":
+    main()
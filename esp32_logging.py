@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Logging for the ESP32 controllers
+
+The controllers report through standard logging loggers instead of print(),
+one per category so each can be tuned on its own:
+
+    esp32.tx      commands sent (DEBUG), send errors and timeouts (WARNING+)
+    esp32.rx      responses (DEBUG), device errors and bad frames (WARNING)
+    esp32.device  ESP_LOG text from the firmware (INFO)
+    esp32.status  status_update frames (DEBUG)
+
+Messages use lazy %-formatting, so nothing on the hot path is formatted
+unless a handler will actually emit it. Without configuration only
+warnings and errors are shown, on stderr (logging's last-resort handler).
+
+Usage:
+    configure_logging()                                  # INFO to stdout (device log visible)
+    configure_logging(tx=logging.DEBUG, rx=logging.DEBUG)  # Full traffic dump
+    ring = configure_logging(console=False, ring_buffer=10000)
+    ...
+    print("\\n".join(ring.lines(category="device")))    # Last device log lines on failure
+"""
+
+import sys
+import logging
+import threading
+from collections import deque
+from typing import Optional, List
+
+LOGGER_NAME = "esp32"
+CATEGORIES = ("tx", "rx", "device", "status")
+
+tx_log = logging.getLogger(f"{LOGGER_NAME}.tx")
+rx_log = logging.getLogger(f"{LOGGER_NAME}.rx")
+device_log = logging.getLogger(f"{LOGGER_NAME}.device")
+status_log = logging.getLogger(f"{LOGGER_NAME}.status")
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the most recent records in memory without formatting them.
+
+    emit() only appends the LogRecord to a bounded deque; formatting happens
+    when the buffer is read, typically once after a failure.
+    """
+
+    def __init__(self, capacity: int = 10000, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.buffer = deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter("%(relativeCreated)10.1f %(name)-13s %(message)s"))
+
+    def emit(self, record: logging.LogRecord):
+        self.buffer.append(record)
+
+    def records(self, category: Optional[str] = None) -> List[logging.LogRecord]:
+        """Buffered records, optionally only one category ("tx", "rx", ...)"""
+        records = list(self.buffer)
+        if category:
+            name = f"{LOGGER_NAME}.{category}"
+            records = [r for r in records if r.name == name]
+        return records
+
+    def lines(self, category: Optional[str] = None) -> List[str]:
+        """Buffered records formatted as text"""
+        return [self.format(record) for record in self.records(category)]
+
+    def clear(self):
+        self.buffer.clear()
+
+_installed: List[logging.Handler] = []
+_install_lock = threading.Lock()
+
+def configure_logging(level: int = logging.INFO, tx: Optional[int] = None, rx: Optional[int] = None,
+                      device: Optional[int] = None, status: Optional[int] = None,
+                      console: bool = True, ring_buffer: int = 0,
+                      stream=None) -> Optional[RingBufferHandler]:
+    """
+    Set per-category levels and install handlers on the "esp32" logger.
+
+    level is the default for categories not given explicitly. With console
+    the messages go to stdout as plain text (as the old print() calls did).
+    ring_buffer > 0 also keeps that many records in memory; the handler is
+    returned. Calling again replaces the handlers from the previous call.
+    """
+    root = logging.getLogger(LOGGER_NAME)
+    levels = {"tx": tx, "rx": rx, "device": device, "status": status}
+    for category in CATEGORIES:
+        value = levels[category]
+        logging.getLogger(f"{LOGGER_NAME}.{category}").setLevel(level if value is None else value)
+
+    ring = None
+    with _install_lock:
+        for handler in _installed:
+            root.removeHandler(handler)
+        _installed.clear()
+
+        if console:
+            handler = logging.StreamHandler(stream or sys.stdout)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _installed.append(handler)
+        if ring_buffer > 0:
+            ring = RingBufferHandler(ring_buffer)
+            _installed.append(ring)
+
+        for handler in _installed:
+            root.addHandler(handler)
+        # Handled here; don't print twice through a configured root logger
+        root.propagate = not _installed
+
+    return ring
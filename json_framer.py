@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON framer for the ESP32 serial stream
+
+The ESP32 writes pretty-printed JSON objects (cJSON_Print) interleaved with
+ESP_LOG text lines on the same UART. JsonFramer splits that byte stream into
+complete JSON frames and text lines. It keeps its scan position, brace depth
+and string/escape state between chunks, so every received byte is examined
+once no matter how many reads a frame is split over.
+
+When the firmware has been switched to compact output (set_format), every
+JSON object is known to fit on one line. In single_line mode the framer
+then only splits on newlines and skips brace matching entirely.
+
+Usage:
+    framer = JsonFramer()
+    for kind, payload in framer.feed(serial_bytes):
+        if kind == JsonFramer.JSON:
+            response = json.loads(payload)
+        else:
+            print(payload.decode())
+"""
+
+import re
+from typing import List, Tuple
+
+# ESP_LOG color codes, e.g. "\x1b[0;32m"
+ANSI_ESCAPE = re.compile(rb'\x1b\[[0-9;]*m')
+
+# Structural bytes we need to stop at in each scanner state
+_OUTSIDE = re.compile(rb'[{\n]')
+_IN_OBJECT = re.compile(rb'[{}"]')
+_IN_STRING = re.compile(rb'["\\]')
+
+_OPEN_BRACE = ord('{')
+_CLOSE_BRACE = ord('}')
+_QUOTE = ord('"')
+_NEWLINE = ord('\n')
+
+class JsonFramer:
+    """Stateful splitter of a serial byte stream into JSON frames and text lines"""
+
+    TEXT = 0
+    JSON = 1
+
+    def __init__(self, max_frame_size: int = 8192, single_line: bool = False):
+        self.max_frame_size = max_frame_size
+        self.single_line = single_line
+        self._initial_single_line = single_line
+
+        self._buffer = bytearray()
+        self._scan = 0          # Bytes of _buffer already examined
+        self._depth = 0         # Brace depth, 0 while outside a JSON object
+        self._in_string = False
+        self._escape = False    # Backslash seen as the last byte of a string chunk
+
+    def reset(self):
+        """Drop any partial frame or line and return to the constructed framing mode"""
+        self.single_line = self._initial_single_line
+        self._buffer.clear()
+        self._scan = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def set_single_line(self, enabled: bool):
+        """Switch framing mode, keeping any bytes received but not yet framed"""
+        self.single_line = enabled
+        self._scan = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, data: bytes) -> List[Tuple[int, bytes]]:
+        """Add received bytes and return the (kind, payload) items they complete"""
+        if self.single_line:
+            return self._feed_lines(data)
+
+        out: List[Tuple[int, bytes]] = []
+        buf = self._buffer
+        buf += data
+
+        while True:
+            if self._depth == 0:
+                match = _OUTSIDE.search(buf, self._scan)
+                if match is None:
+                    self._scan = len(buf)
+                    break
+                pos = match.start()
+                if buf[pos] == _NEWLINE:
+                    self._emit_text(out, buf[:pos])
+                    del buf[:pos + 1]
+                else:
+                    # Text before the JSON start (e.g. a log prefix)
+                    self._emit_text(out, buf[:pos])
+                    del buf[:pos]
+                    self._depth = 1
+                self._scan = 0 if self._depth == 0 else 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    if self._scan >= len(buf):
+                        break
+                    self._scan += 1
+                    self._escape = False
+                match = _IN_STRING.search(buf, self._scan)
+                if match is None:
+                    self._scan = len(buf)
+                    if not self._check_overflow(out):
+                        break
+                    continue
+                pos = match.start()
+                if buf[pos] == _QUOTE:
+                    self._in_string = False
+                    self._scan = pos + 1
+                elif pos + 1 < len(buf):
+                    self._scan = pos + 2   # Skip escaped byte
+                else:
+                    self._escape = True
+                    self._scan = pos + 1
+                continue
+
+            match = _IN_OBJECT.search(buf, self._scan)
+            if match is None:
+                self._scan = len(buf)
+                if not self._check_overflow(out):
+                    break
+                continue
+            pos = match.start()
+            char = buf[pos]
+            if char == _QUOTE:
+                self._in_string = True
+            elif char == _OPEN_BRACE:
+                self._depth += 1
+            elif char == _CLOSE_BRACE:
+                self._depth -= 1
+                if self._depth == 0:
+                    out.append((self.JSON, bytes(buf[:pos + 1])))
+                    del buf[:pos + 1]
+                    self._scan = 0
+                    continue
+            self._scan = pos + 1
+
+        return out
+
+    def _feed_lines(self, data: bytes) -> List[Tuple[int, bytes]]:
+        """Fast path: one frame or log line per newline"""
+        buf = self._buffer
+        buf += data
+        end = buf.rfind(b'\n')
+        if end == -1:
+            if len(buf) > self.max_frame_size:
+                buf.clear()
+            return []
+
+        out: List[Tuple[int, bytes]] = []
+        for line in bytes(buf[:end]).split(b'\n'):
+            line = line.strip()
+            if line[:1] == b'{' and line[-1:] == b'}':
+                out.append((self.JSON, line))
+            else:
+                self._emit_text(out, line)
+        del buf[:end + 1]
+        return out
+
+    def _emit_text(self, out: List[Tuple[int, bytes]], raw) -> None:
+        line = ANSI_ESCAPE.sub(b'', raw).strip()
+        if line:
+            out.append((self.TEXT, line))
+
+    def _check_overflow(self, out: List[Tuple[int, bytes]]) -> bool:
+        """Give up on an unterminated object; returns True if the buffer was rescanned"""
+        if len(self._buffer) <= self.max_frame_size:
+            return False
+
+        # Most likely a stray '{' in a log line: treat its line as text and resync
+        buf = self._buffer
+        newline = buf.find(b'\n')
+        end = newline if newline != -1 else len(buf)
+        self._emit_text(out, buf[:end])
+        del buf[:end + 1]
+        self._scan = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        return True
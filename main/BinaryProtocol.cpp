@@ -0,0 +1,140 @@
+#include "BinaryProtocol.h"
+#include <cstring>
+
+namespace {
+
+struct NameCode {
+    const char* name;
+    uint8_t code;
+};
+
+// Command codes (must match binary_protocol.py)
+const NameCode COMMANDS[] = {
+    {"ping", 0x01},
+    {"get_status", 0x02},
+    {"set_vehicle", 0x03},
+    {"set_gear", 0x04},
+    {"set_speed", 0x05},
+    {"set_can_active", 0x06},
+    {"get_supported_vehicles", 0x07},
+    {"reset_settings", 0x08},
+    {"set_state", 0x09},
+    {"set_format", 0x0A},
+    {"set_protocol", 0x0B},
+    {"setpoint", 0x0C},
+};
+
+const NameCode FIELDS[] = {
+    {"vehicle", BinaryProtocol::FIELD_VEHICLE},
+    {"gear", BinaryProtocol::FIELD_GEAR},
+    {"speed", BinaryProtocol::FIELD_SPEED},
+    {"can_active", BinaryProtocol::FIELD_CAN_ACTIVE},
+    {"active", BinaryProtocol::FIELD_ACTIVE},
+    {"uptime", BinaryProtocol::FIELD_UPTIME},
+    {"firmware_version", BinaryProtocol::FIELD_FIRMWARE_VERSION},
+    {"vehicles", BinaryProtocol::FIELD_VEHICLES},
+    {"message", BinaryProtocol::FIELD_MESSAGE},
+    {"compact", BinaryProtocol::FIELD_COMPACT},
+    {"protocol", BinaryProtocol::FIELD_PROTOCOL},
+    {"status", BinaryProtocol::FIELD_STATUS},
+    {"seq", BinaryProtocol::FIELD_SEQ},
+    {"received", BinaryProtocol::FIELD_RECEIVED},
+    {"lost", BinaryProtocol::FIELD_LOST},
+    {"ack", BinaryProtocol::FIELD_ACK},
+};
+
+template <size_t N>
+uint8_t lookupCode(const NameCode (&table)[N], const char* name) {
+    if (!name) {
+        return 0;
+    }
+    for (const auto& entry : table) {
+        if (strcmp(entry.name, name) == 0) {
+            return entry.code;
+        }
+    }
+    return 0;
+}
+
+template <size_t N>
+const char* lookupName(const NameCode (&table)[N], uint8_t code) {
+    for (const auto& entry : table) {
+        if (entry.code == code) {
+            return entry.name;
+        }
+    }
+    return nullptr;
+}
+
+} // namespace
+
+uint16_t BinaryProtocol::crc16(const uint8_t* data, size_t len) {
+    uint16_t crc = 0xFFFF;
+    for (size_t i = 0; i < len; i++) {
+        crc ^= static_cast<uint16_t>(data[i]) << 8;
+        for (int bit = 0; bit < 8; bit++) {
+            crc = (crc & 0x8000) ? static_cast<uint16_t>((crc << 1) ^ 0x1021) : static_cast<uint16_t>(crc << 1);
+        }
+    }
+    return crc;
+}
+
+size_t BinaryProtocol::cobsEncode(const uint8_t* in, size_t len, uint8_t* out) {
+    size_t code_pos = 0;   // Where the current block's code byte goes
+    size_t write_pos = 1;
+    uint8_t code = 1;
+
+    for (size_t i = 0; i < len; i++) {
+        if (in[i] == 0) {
+            out[code_pos] = code;
+            code_pos = write_pos++;
+            code = 1;
+        } else {
+            out[write_pos++] = in[i];
+            code++;
+            if (code == 0xFF) {
+                out[code_pos] = code;
+                code_pos = write_pos++;
+                code = 1;
+            }
+        }
+    }
+    out[code_pos] = code;
+    return write_pos;
+}
+
+bool BinaryProtocol::cobsDecode(const uint8_t* in, size_t len, uint8_t* out, size_t& out_len) {
+    size_t pos = 0;
+    out_len = 0;
+
+    while (pos < len) {
+        uint8_t code = in[pos];
+        if (code == 0 || pos + code > len) {
+            return false;
+        }
+        for (size_t i = pos + 1; i < pos + code; i++) {
+            out[out_len++] = in[i];
+        }
+        pos += code;
+        if (code < 0xFF && pos < len) {
+            out[out_len++] = 0;
+        }
+    }
+    return true;
+}
+
+uint8_t BinaryProtocol::commandCode(const char* name) {
+    return lookupCode(COMMANDS, name);
+}
+
+const char* BinaryProtocol::commandName(uint8_t code) {
+    return lookupName(COMMANDS, code);
+}
+
+uint8_t BinaryProtocol::fieldKey(const char* name) {
+    return lookupCode(FIELDS, name);
+}
+
+const char* BinaryProtocol::fieldName(uint8_t key) {
+    return lookupName(FIELDS, key);
+}
@@ -0,0 +1,84 @@
+#ifndef BINARY_PROTOCOL_H
+#define BINARY_PROTOCOL_H
+
+#include <cstdint>
+#include <cstddef>
+
+/**
+ * Binary framed protocol for the serial command link
+ *
+ * Compact alternative to the JSON commands (see binary_protocol.py on the
+ * host side). Frames are delimited by 0x00 and COBS encoded, so ESP_LOG text
+ * can interleave with them:
+ *
+ *   0x00 | COBS( type:u8 | seq:u16 | command:u8 | fields... | crc16:u16 ) | 0x00
+ *
+ * All integers are little endian. The CRC is CRC-16/CCITT-FALSE over
+ * everything before it. Fields are a key byte followed by a value whose
+ * encoding is fixed per key (see FieldKey).
+ */
+class BinaryProtocol {
+public:
+    // Message types
+    static constexpr uint8_t MSG_COMMAND = 0x01;
+    static constexpr uint8_t MSG_RESPONSE = 0x02;
+    static constexpr uint8_t MSG_ERROR = 0x03;
+    static constexpr uint8_t MSG_STATUS_UPDATE = 0x04;
+    static constexpr uint8_t MSG_SETPOINT_ACK = 0x05;
+
+    // Header (type + seq + command) and trailer (crc) sizes
+    static constexpr size_t HEADER_SIZE = 4;
+    static constexpr size_t CRC_SIZE = 2;
+    static constexpr size_t MAX_FRAME_SIZE = 256;
+
+    // Field keys; the comment gives the value encoding
+    enum FieldKey : uint8_t {
+        FIELD_VEHICLE = 0x01,           // u8 button_id_t
+        FIELD_GEAR = 0x02,              // u8 Gear enum
+        FIELD_SPEED = 0x03,             // u8 km/h
+        FIELD_CAN_ACTIVE = 0x04,        // u8 bool
+        FIELD_ACTIVE = 0x05,            // u8 bool
+        FIELD_UPTIME = 0x06,            // u32 seconds
+        FIELD_FIRMWARE_VERSION = 0x07,  // u8 length + UTF-8
+        FIELD_VEHICLES = 0x08,          // u8 count + u8 button_id_t each
+        FIELD_MESSAGE = 0x09,           // u8 length + UTF-8
+        FIELD_COMPACT = 0x0A,           // u8 bool
+        FIELD_PROTOCOL = 0x0B,          // u8 (0 = json, 1 = binary)
+        FIELD_STATUS = 0x0C,            // u8 (0 = ok, 1 = error)
+        FIELD_SEQ = 0x0D,               // u16 setpoint sequence number
+        FIELD_RECEIVED = 0x0E,          // u32 setpoints received
+        FIELD_LOST = 0x0F,              // u32 setpoints missing from the sequence
+        FIELD_ACK = 0x10,               // u8 bool, request an immediate setpoint_ack
+    };
+
+    /**
+     * CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)
+     */
+    static uint16_t crc16(const uint8_t* data, size_t len);
+
+    /**
+     * COBS encode; out must hold at least len + len / 254 + 1 bytes
+     * @return Number of bytes written (no delimiters)
+     */
+    static size_t cobsEncode(const uint8_t* in, size_t len, uint8_t* out);
+
+    /**
+     * COBS decode; out must hold at least len bytes
+     * @return false if the input is malformed
+     */
+    static bool cobsDecode(const uint8_t* in, size_t len, uint8_t* out, size_t& out_len);
+
+    /**
+     * Map between command names and command codes (0 = unknown)
+     */
+    static uint8_t commandCode(const char* name);
+    static const char* commandName(uint8_t code);
+
+    /**
+     * Map between JSON field names and field keys (0 = not encodable)
+     */
+    static uint8_t fieldKey(const char* name);
+    static const char* fieldName(uint8_t key);
+};
+
+#endif // BINARY_PROTOCOL_H
@@ -16,7 +16,8 @@ void twai_task(void *pvParameter);
 void twai_receive_task(void *pvParameter);
 void send_can_message(uint32_t message_id, uint8_t* data, uint8_t dlc);
 
-CarCanController::CarCanController() : current_vehicle(VW_T6), current_speed_kmh(0), current_gear(Gear::PARK) {
+CarCanController::CarCanController() : current_vehicle(VW_T6), current_speed_kmh(0), current_gear(Gear::PARK),
+    setpoint_has_gear(false), setpoint_has_speed(false), setpoint_gear(Gear::PARK), setpoint_speed_kmh(0) {
     button_map = {
         { VW_T5,             {"VW T5"} },        
         { VW_T6,             {"VW T6"} },
@@ -42,7 +43,10 @@ void CarCanController::btnCallback(button_id_t button){
 
 void CarCanController::setCurrentVehicle(button_id_t vehicle) {
     if (button_map.find(vehicle) != button_map.end()) {
-        current_vehicle = vehicle;
+        {
+            std::lock_guard<std::mutex> lock(state_mutex);
+            current_vehicle = vehicle;
+        }
         ESP_LOGI(TAG, "Selected vehicle: %s", button_map[vehicle].label);
         
         // Reconfigure CAN controller with new vehicle's baud rate
@@ -52,17 +56,63 @@ void CarCanController::setCurrentVehicle(button_id_t vehicle) {
 
 void CarCanController::setSpeed(uint8_t speed_kmh) {
     if (speed_kmh <= 250) {
-        current_speed_kmh = speed_kmh;
+        {
+            std::lock_guard<std::mutex> lock(state_mutex);
+            current_speed_kmh = speed_kmh;
+            setpoint_has_speed = false;  // An explicit command overrides a pending setpoint
+        }
         ESP_LOGI(TAG, "Speed set to: %d km/h", speed_kmh);
     }
 }
 
 void CarCanController::setGear(Gear gear) {
-    current_gear = gear;
+    {
+        std::lock_guard<std::mutex> lock(state_mutex);
+        current_gear = gear;
+        setpoint_has_gear = false;
+    }
     const char* gear_names[] = {"PARK", "REVERSE", "NEUTRAL", "DRIVE"};
     ESP_LOGI(TAG, "Gear set to: %s", gear_names[static_cast<int>(gear)]);
 }
 
+void CarCanController::applyState(button_id_t vehicle, Gear gear, uint8_t speed_kmh) {
+    bool vehicle_changed = false;
+    {
+        std::lock_guard<std::mutex> lock(state_mutex);
+        if (button_map.find(vehicle) != button_map.end() && vehicle != current_vehicle) {
+            current_vehicle = vehicle;
+            vehicle_changed = true;
+        }
+        current_gear = gear;
+        if (speed_kmh <= 250) {
+            current_speed_kmh = speed_kmh;
+        }
+        setpoint_has_gear = false;
+        setpoint_has_speed = false;
+    }
+    
+    const char* gear_names[] = {"PARK", "REVERSE", "NEUTRAL", "DRIVE"};
+    ESP_LOGI(TAG, "State set to: %s, %s, %d km/h", button_map[current_vehicle].label,
+             gear_names[static_cast<int>(gear)], current_speed_kmh);
+    
+    if (vehicle_changed) {
+        reconfigureCANController();
+    }
+}
+
+void CarCanController::setSetpoint(bool has_gear, Gear gear, bool has_speed, uint8_t speed_kmh) {
+    // No logging here: setpoints arrive at up to 100 Hz
+    std::lock_guard<std::mutex> lock(state_mutex);
+    if (has_gear) {
+        setpoint_gear = gear;
+        setpoint_has_gear = true;
+    }
+    if (has_speed && speed_kmh <= 250) {
+        setpoint_speed_kmh = speed_kmh;
+        setpoint_has_speed = true;
+    }
+}
+
 ButtonMap CarCanController::getButtonMap(){
     return button_map;
 }
@@ -132,9 +182,31 @@ void CarCanController::reconfigureCANController() {
 }
 
 void CarCanController::sendPeriodicMessages() {
-    auto generator = getCurrentMessageGenerator();
+    // Snapshot state so gear and speed frames of one tick are consistent
+    Gear gear;
+    uint8_t speed_kmh;
+    button_id_t vehicle;
+    {
+        std::lock_guard<std::mutex> lock(state_mutex);
+        
+        // Apply the latest streamed setpoint
+        if (setpoint_has_gear) {
+            current_gear = setpoint_gear;
+            setpoint_has_gear = false;
+        }
+        if (setpoint_has_speed) {
+            current_speed_kmh = setpoint_speed_kmh;
+            setpoint_has_speed = false;
+        }
+        
+        gear = current_gear;
+        speed_kmh = current_speed_kmh;
+        vehicle = current_vehicle;
+    }
+    
+    auto generator = MessageGeneratorFactory::getInstance().getMessageGenerator(vehicle);
     if (!generator) {
-        ESP_LOGW(TAG, "No message generator available for vehicle %d", current_vehicle);
+        ESP_LOGW(TAG, "No message generator available for vehicle %d", vehicle);
         return;
     }
 
@@ -146,13 +218,13 @@ void CarCanController::sendPeriodicMessages() {
     
     // Send gear message (first ID in the vector)
     if (!ids.empty()) {
-        generator->generateGearMessage(current_gear, data, dlc);
+        generator->generateGearMessage(gear, data, dlc);
         send_can_message(ids[0], data, dlc);
     }
     
     // Send speed message (second ID in the vector)
     if (ids.size() > 1) {
-        generator->generateSpeedMessage(current_speed_kmh, data, dlc);
+        generator->generateSpeedMessage(speed_kmh, data, dlc);
         send_can_message(ids[1], data, dlc);
     }
 }
@@ -4,6 +4,7 @@
 #include <map>
 #include <cstdint>
 #include <memory>
+#include <mutex>
 #include "common.h"
 #include "BaseMessageGenerator.h"
 #include "MessageGeneratorFactory.h"
@@ -26,6 +27,16 @@ public:
     // Gear control
     void setGear(Gear gear);
     Gear getGear() const { return current_gear; }
+    
+    // Apply vehicle, gear and speed together; the CAN task never sees a mix
+    // of old and new values. The CAN driver is only reconfigured if the
+    // vehicle actually changes.
+    void applyState(button_id_t vehicle, Gear gear, uint8_t speed_kmh);
+    
+    // Streamed setpoint (profile replay): stored and applied at the start of
+    // the next sendPeriodicMessages() tick. A newer setpoint replaces one
+    // that has not been applied yet; fields without has_* stay unchanged.
+    void setSetpoint(bool has_gear, Gear gear, bool has_speed, uint8_t speed_kmh);
 
     // Message generation
     bool hasMessageGenerator() const;
@@ -38,6 +49,15 @@ private:
     uint8_t current_speed_kmh;
     Gear current_gear;
     
+    // Pending setpoint, applied by the CAN task
+    bool setpoint_has_gear;
+    bool setpoint_has_speed;
+    Gear setpoint_gear;
+    uint8_t setpoint_speed_kmh;
+    
+    // Guards vehicle/gear/speed against concurrent reads from the CAN task
+    mutable std::mutex state_mutex;
+    
     // CAN controller management
     void reconfigureCANController();
     
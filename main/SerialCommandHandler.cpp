@@ -1,19 +1,30 @@
 #include "SerialCommandHandler.h"
+#include "BinaryProtocol.h"
 #include "CarCanController.h"
 #include "CarCanGui.h"
 #include "common.h"
 #include "esp_system.h"
 #include "freertos/FreeRTOS.h"
 #include "freertos/task.h"
+#include "driver/uart.h"
+#include "driver/uart_vfs.h"
 #include <cstring>
 #include <iostream>
 
 #define TAG "SerialCmd"
 #define BUFFER_SIZE 1024
-#define COMMAND_QUEUE_SIZE 10
+#define UART_PORT CONFIG_ESP_CONSOLE_UART_NUM
+#define UART_RX_BUFFER_SIZE 2048
+#define UART_TX_BUFFER_SIZE 2048
+#define UART_EVENT_QUEUE_SIZE 20
+#define UART_READ_CHUNK 256
+#define SETPOINT_ACK_INTERVAL 10
 
 SerialCommandHandler::SerialCommandHandler(CarCanController& controller, CarCanGui& gui)
-    : controller(controller), gui(gui), serial_task_handle(nullptr), command_queue(nullptr), running(false) {
+    : controller(controller), gui(gui), serial_task_handle(nullptr), uart_queue(nullptr), running(false),
+      in_binary_frame(false), has_request_id(false), request_id(0), request_binary(false),
+      compact_output(false), binary_output(false),
+      setpoint_last_seq(0), setpoint_received(0), setpoint_lost(0), setpoint_stream_active(false) {
 }
 
 SerialCommandHandler::~SerialCommandHandler() {
@@ -23,13 +34,23 @@ SerialCommandHandler::~SerialCommandHandler() {
 bool SerialCommandHandler::initialize() {
     ESP_LOGI(TAG, "Initializing serial command handler...");
     
-    // Create command queue
-    command_queue = xQueueCreate(COMMAND_QUEUE_SIZE, sizeof(char*));
-    if (!command_queue) {
-        ESP_LOGE(TAG, "Failed to create command queue");
+    // Binary frames need an 8-bit clean console: no CR/LF translation
+    uart_vfs_dev_port_set_rx_line_endings(UART_PORT, ESP_LINE_ENDINGS_LF);
+    uart_vfs_dev_port_set_tx_line_endings(UART_PORT, ESP_LINE_ENDINGS_LF);
+    
+    // Install the UART driver on the console port: received bytes are
+    // buffered by the ISR and announced through the event queue
+    esp_err_t err = uart_driver_install(UART_PORT, UART_RX_BUFFER_SIZE, UART_TX_BUFFER_SIZE,
+                                        UART_EVENT_QUEUE_SIZE, &uart_queue, 0);
+    if (err != ESP_OK) {
+        ESP_LOGE(TAG, "Failed to install UART driver: %s", esp_err_to_name(err));
         return false;
     }
     
+    // Route printf/ESP_LOG through the driver so output is buffered and
+    // does not interleave with the driver's own TX
+    uart_vfs_dev_use_driver(UART_PORT);
+    
     // Create background task
     running = true;
     BaseType_t result = xTaskCreate(
@@ -44,8 +65,9 @@ bool SerialCommandHandler::initialize() {
     if (result != pdPASS) {
         ESP_LOGE(TAG, "Failed to create serial task");
         running = false;
-        vQueueDelete(command_queue);
-        command_queue = nullptr;
+        uart_vfs_dev_use_nonblocking(UART_PORT);
+        uart_driver_delete(UART_PORT);
+        uart_queue = nullptr;
         return false;
     }
     
@@ -66,9 +88,11 @@ void SerialCommandHandler::stop() {
             serial_task_handle = nullptr;
         }
         
-        if (command_queue) {
-            vQueueDelete(command_queue);
-            command_queue = nullptr;
+        if (uart_queue) {
+            // The event queue belongs to the driver
+            uart_vfs_dev_use_nonblocking(UART_PORT);
+            uart_driver_delete(UART_PORT);
+            uart_queue = nullptr;
         }
         
         ESP_LOGI(TAG, "Serial command handler stopped");
@@ -84,53 +108,219 @@ void SerialCommandHandler::serialTaskWrapper(void* params) {
 void SerialCommandHandler::serialTask() {
     ESP_LOGI(TAG, "Serial command task started");
     
+    uart_event_t event;
+    uint8_t data[UART_READ_CHUNK];
+    
     while (running) {
-        // Read character by character from stdin
-        int c = getchar();
+        // Sleep until the driver reports received bytes (no polling)
+        if (xQueueReceive(uart_queue, &event, portMAX_DELAY) != pdTRUE) {
+            continue;
+        }
         
-        if (c != EOF && c != -1) {
-            char ch = (char)c;
-            
-            // Add character to buffer
-            if (ch == '\n' || ch == '\r') {
-                // Process complete command
-                if (!input_buffer.empty()) {
-                    processCommand(input_buffer);
-                    input_buffer.clear();
-                }
-            } else if (ch >= 32 && ch <= 126) {  // Printable ASCII characters
-                input_buffer += ch;
-                
-                // Prevent buffer overflow
-                if (input_buffer.length() > BUFFER_SIZE - 1) {
-                    ESP_LOGW(TAG, "Input buffer overflow, clearing");
-                    input_buffer.clear();
+        switch (event.type) {
+            case UART_DATA: {
+                // Drain everything that has arrived, a chunk at a time
+                int len;
+                while ((len = uart_read_bytes(UART_PORT, data, sizeof(data), 0)) > 0) {
+                    for (int i = 0; i < len; i++) {
+                        handleInputByte(data[i]);
+                    }
                 }
+                break;
             }
+            
+            case UART_FIFO_OVF:
+            case UART_BUFFER_FULL:
+                // Bytes were lost; drop everything and resynchronise on the next line/frame
+                ESP_LOGW(TAG, "UART RX overflow, flushing input");
+                uart_flush_input(UART_PORT);
+                xQueueReset(uart_queue);
+                input_buffer.clear();
+                binary_buffer.clear();
+                in_binary_frame = false;
+                break;
+            
+            case UART_FRAME_ERR:
+            case UART_PARITY_ERR:
+                ESP_LOGW(TAG, "UART receive error (event %d)", event.type);
+                break;
+            
+            default:
+                break;
         }
-        
-        // Small delay to prevent busy waiting
-        vTaskDelay(pdMS_TO_TICKS(50));  // Increased delay to reduce CPU usage
     }
     
     ESP_LOGI(TAG, "Serial command task stopped");
 }
 
-void SerialCommandHandler::processCommand(const std::string& command_str) {
-    ESP_LOGI(TAG, "Processing command: %s", command_str.c_str());
+void SerialCommandHandler::handleInputByte(uint8_t byte) {
+    // 0x00 only ever appears as a binary frame delimiter (COBS)
+    if (byte == 0x00) {
+        if (in_binary_frame && !binary_buffer.empty()) {
+            processBinaryFrame(binary_buffer);
+            binary_buffer.clear();
+            in_binary_frame = false;
+        } else {
+            // Opening delimiter (or an empty frame): start collecting
+            binary_buffer.clear();
+            in_binary_frame = true;
+        }
+        return;
+    }
+    
+    if (in_binary_frame) {
+        binary_buffer.push_back(byte);
+        if (binary_buffer.size() > BinaryProtocol::MAX_FRAME_SIZE) {
+            ESP_LOGW(TAG, "Binary frame too long, dropping");
+            binary_buffer.clear();
+            in_binary_frame = false;
+        }
+        return;
+    }
     
+    // JSON line
+    char ch = (char)byte;
+    if (ch == '\n' || ch == '\r') {
+        // Process complete command
+        if (!input_buffer.empty()) {
+            processCommand(input_buffer);
+            input_buffer.clear();
+        }
+    } else if (ch >= 32 && ch <= 126) {  // Printable ASCII characters
+        input_buffer += ch;
+        
+        // Prevent buffer overflow
+        if (input_buffer.length() > BUFFER_SIZE - 1) {
+            ESP_LOGW(TAG, "Input buffer overflow, clearing");
+            input_buffer.clear();
+        }
+    }
+}
+
+void SerialCommandHandler::processCommand(const std::string& command_str) {
     // Parse JSON
     cJSON* json = cJSON_Parse(command_str.c_str());
     if (!json) {
+        ESP_LOGI(TAG, "Processing command: %s", command_str.c_str());
         sendError("Invalid JSON format");
         return;
     }
     
+    // Streamed setpoints arrive at up to 100 Hz; logging each one would
+    // saturate the link
+    if (!isSetpoint(json)) {
+        ESP_LOGI(TAG, "Processing command: %s", command_str.c_str());
+    }
+    
+    dispatchCommand(json, false);
+    cJSON_Delete(json);
+}
+
+void SerialCommandHandler::processBinaryFrame(const std::vector<uint8_t>& encoded) {
+    uint8_t frame[BinaryProtocol::MAX_FRAME_SIZE];
+    size_t len = 0;
+    if (!BinaryProtocol::cobsDecode(encoded.data(), encoded.size(), frame, len) ||
+        len < BinaryProtocol::HEADER_SIZE + BinaryProtocol::CRC_SIZE) {
+        ESP_LOGW(TAG, "Malformed binary frame (%d bytes)", (int)encoded.size());
+        return;
+    }
+    
+    size_t body_len = len - BinaryProtocol::CRC_SIZE;
+    uint16_t crc = frame[body_len] | (frame[body_len + 1] << 8);
+    if (BinaryProtocol::crc16(frame, body_len) != crc) {
+        ESP_LOGW(TAG, "Binary frame CRC mismatch");
+        return;
+    }
+    
+    if (frame[0] != BinaryProtocol::MSG_COMMAND) {
+        ESP_LOGW(TAG, "Unexpected binary message type 0x%02X", frame[0]);
+        return;
+    }
+    
+    // Translate to the JSON form so both protocols share the handlers
+    cJSON* json = cJSON_CreateObject();
+    cJSON_AddNumberToObject(json, "id", frame[1] | (frame[2] << 8));
+    const char* command = BinaryProtocol::commandName(frame[3]);
+    if (command) {
+        cJSON_AddStringToObject(json, "command", command);
+    }
+    
+    size_t pos = BinaryProtocol::HEADER_SIZE;
+    bool valid = true;
+    while (valid && pos < body_len) {
+        uint8_t key = frame[pos++];
+        const char* name = BinaryProtocol::fieldName(key);
+        if (!name || pos >= body_len) {
+            valid = false;
+            break;
+        }
+        if (key == BinaryProtocol::FIELD_SEQ) {
+            if (pos + 2 > body_len) {
+                valid = false;
+                break;
+            }
+            cJSON_AddNumberToObject(json, name, frame[pos] | (frame[pos + 1] << 8));
+            pos += 2;
+            continue;
+        }
+        uint8_t value = frame[pos++];
+        switch (key) {
+            case BinaryProtocol::FIELD_VEHICLE:
+                cJSON_AddStringToObject(json, name, vehicleIdToString(static_cast<button_id_t>(value)));
+                break;
+            case BinaryProtocol::FIELD_GEAR:
+                // Out-of-range values become "UNKNOWN" and fail validation
+                cJSON_AddStringToObject(json, name, gearToString(static_cast<Gear>(value)));
+                break;
+            case BinaryProtocol::FIELD_SPEED:
+                cJSON_AddNumberToObject(json, name, value);
+                break;
+            case BinaryProtocol::FIELD_ACTIVE:
+            case BinaryProtocol::FIELD_CAN_ACTIVE:
+            case BinaryProtocol::FIELD_COMPACT:
+            case BinaryProtocol::FIELD_ACK:
+                cJSON_AddBoolToObject(json, name, value != 0);
+                break;
+            case BinaryProtocol::FIELD_PROTOCOL:
+                cJSON_AddStringToObject(json, name, value == 0 ? "json" : (value == 1 ? "binary" : "unknown"));
+                break;
+            default:
+                // Response-only fields are not valid in commands
+                valid = false;
+                break;
+        }
+    }
+    
+    if (!isSetpoint(json)) {
+        ESP_LOGI(TAG, "Processing binary command: %s", command ? command : "unknown");
+    }
+    if (!valid) {
+        has_request_id = true;
+        request_id = frame[1] | (frame[2] << 8);
+        request_binary = true;
+        sendError("Invalid binary field", command);
+        has_request_id = false;
+        request_binary = false;
+    } else {
+        dispatchCommand(json, true);
+    }
+    cJSON_Delete(json);
+}
+
+void SerialCommandHandler::dispatchCommand(cJSON* json, bool binary) {
+    // Remember correlation ID and request format so every response to this
+    // command echoes the ID and uses the same protocol
+    cJSON* id_item = cJSON_GetObjectItem(json, "id");
+    has_request_id = id_item && cJSON_IsNumber(id_item);
+    request_id = has_request_id ? id_item->valuedouble : 0;
+    request_binary = binary;
+    
     // Get command type
     cJSON* cmd_item = cJSON_GetObjectItem(json, "command");
     if (!cmd_item || !cJSON_IsString(cmd_item)) {
         sendError("Missing or invalid 'command' field");
-        cJSON_Delete(json);
+        has_request_id = false;
+        request_binary = false;
         return;
     }
     
@@ -147,17 +337,26 @@ void SerialCommandHandler::processCommand(const std::string& command_str) {
         handleSetGear(json);
     } else if (strcmp(command, "set_speed") == 0) {
         handleSetSpeed(json);
+    } else if (strcmp(command, "set_state") == 0) {
+        handleSetState(json);
     } else if (strcmp(command, "set_can_active") == 0) {
         handleSetCanActive(json);
     } else if (strcmp(command, "get_supported_vehicles") == 0) {
         handleGetSupportedVehicles(json);
     } else if (strcmp(command, "reset_settings") == 0) {
         handleResetSettings(json);
+    } else if (strcmp(command, "set_format") == 0) {
+        handleSetFormat(json);
+    } else if (strcmp(command, "set_protocol") == 0) {
+        handleSetProtocol(json);
+    } else if (strcmp(command, "setpoint") == 0) {
+        handleSetpoint(json);
     } else {
         sendError("Unknown command", command);
     }
     
-    cJSON_Delete(json);
+    has_request_id = false;
+    request_binary = false;
 }
 
 void SerialCommandHandler::handlePing(cJSON* json) {
@@ -262,6 +461,70 @@ void SerialCommandHandler::handleSetSpeed(cJSON* json) {
     notifyStatusUpdate();
 }
 
+void SerialCommandHandler::handleSetState(cJSON* json) {
+    // Every field is optional; missing ones keep their current value
+    button_id_t vehicle_id = controller.getCurrentVehicle();
+    Gear gear = controller.getGear();
+    int speed = controller.getSpeed();
+    
+    // Validate everything before touching the controller so a bad field
+    // leaves the simulator unchanged
+    cJSON* vehicle_item = cJSON_GetObjectItem(json, "vehicle");
+    if (vehicle_item) {
+        if (!cJSON_IsString(vehicle_item)) {
+            sendError("Invalid 'vehicle' field", "set_state");
+            return;
+        }
+        vehicle_id = stringToVehicleId(vehicle_item->valuestring);
+        if (vehicle_id == 0) {
+            sendError("Unsupported vehicle type", "set_state");
+            return;
+        }
+    }
+    
+    cJSON* gear_item = cJSON_GetObjectItem(json, "gear");
+    if (gear_item) {
+        if (!cJSON_IsString(gear_item)) {
+            sendError("Invalid 'gear' field", "set_state");
+            return;
+        }
+        gear = stringToGear(gear_item->valuestring);
+        if (gear == Gear::PARK && strcmp(gear_item->valuestring, "PARK") != 0) {
+            sendError("Invalid gear value", "set_state");
+            return;
+        }
+    }
+    
+    cJSON* speed_item = cJSON_GetObjectItem(json, "speed");
+    if (speed_item) {
+        if (!cJSON_IsNumber(speed_item)) {
+            sendError("Invalid 'speed' field", "set_state");
+            return;
+        }
+        speed = speed_item->valueint;
+        if (speed < 0 || speed > 250) {
+            sendError("Speed must be between 0 and 250 km/h", "set_state");
+            return;
+        }
+    }
+    
+    // Apply all values in one step
+    controller.applyState(vehicle_id, gear, static_cast<uint8_t>(speed));
+    
+    // Update GUI
+    updateGuiFromController();
+    
+    // Send a single response carrying the resulting state
+    cJSON* data = cJSON_CreateObject();
+    cJSON_AddStringToObject(data, "vehicle", vehicleIdToString(controller.getCurrentVehicle()));
+    cJSON_AddStringToObject(data, "gear", gearToString(controller.getGear()));
+    cJSON_AddNumberToObject(data, "speed", controller.getSpeed());
+    sendResponse("response", "ok", "set_state", data);
+    
+    // Send status update
+    notifyStatusUpdate();
+}
+
 void SerialCommandHandler::handleSetCanActive(cJSON* json) {
     cJSON* active_item = cJSON_GetObjectItem(json, "active");
     if (!active_item || !cJSON_IsBool(active_item)) {
@@ -310,6 +573,127 @@ void SerialCommandHandler::handleResetSettings(cJSON* json) {
     notifyStatusUpdate();
 }
 
+void SerialCommandHandler::handleSetFormat(cJSON* json) {
+    cJSON* compact_item = cJSON_GetObjectItem(json, "compact");
+    if (!compact_item || !cJSON_IsBool(compact_item)) {
+        sendError("Missing or invalid 'compact' field", "set_format");
+        return;
+    }
+    
+    // Switch first so the acknowledgement already uses the new format
+    compact_output = cJSON_IsTrue(compact_item);
+    
+    cJSON* data = cJSON_CreateObject();
+    cJSON_AddBoolToObject(data, "compact", compact_output);
+    sendResponse("response", "ok", "set_format", data);
+}
+
+void SerialCommandHandler::handleSetProtocol(cJSON* json) {
+    cJSON* protocol_item = cJSON_GetObjectItem(json, "protocol");
+    if (!protocol_item || !cJSON_IsString(protocol_item)) {
+        sendError("Missing or invalid 'protocol' field", "set_protocol");
+        return;
+    }
+    
+    if (strcmp(protocol_item->valuestring, "binary") == 0) {
+        binary_output = true;
+    } else if (strcmp(protocol_item->valuestring, "json") == 0) {
+        binary_output = false;
+    } else {
+        sendError("Unsupported protocol", "set_protocol");
+        return;
+    }
+    
+    // Only affects unsolicited output (status updates); responses always
+    // use the format of the request
+    cJSON* data = cJSON_CreateObject();
+    cJSON_AddStringToObject(data, "protocol", binary_output ? "binary" : "json");
+    sendResponse("response", "ok", "set_protocol", data);
+}
+
+bool SerialCommandHandler::isSetpoint(cJSON* json) {
+    cJSON* cmd_item = cJSON_GetObjectItem(json, "command");
+    return cmd_item && cJSON_IsString(cmd_item) && strcmp(cmd_item->valuestring, "setpoint") == 0;
+}
+
+void SerialCommandHandler::handleSetpoint(cJSON* json) {
+    // Fire-and-forget: the sequence number is not a request ID, so nothing
+    // sent from here may be matched against a pending request on the host.
+    // Binary frames carry the sequence number in the header ("id").
+    cJSON* seq_item = cJSON_GetObjectItem(json, "seq");
+    if (!seq_item) {
+        seq_item = cJSON_GetObjectItem(json, "id");
+    }
+    has_request_id = false;
+    
+    if (!seq_item || !cJSON_IsNumber(seq_item)) {
+        sendError("Missing or invalid 'seq' field", "setpoint");
+        return;
+    }
+    uint16_t seq = static_cast<uint16_t>(seq_item->valueint);
+    
+    bool has_gear = false;
+    Gear gear = Gear::PARK;
+    cJSON* gear_item = cJSON_GetObjectItem(json, "gear");
+    if (gear_item) {
+        if (!cJSON_IsString(gear_item)) {
+            sendError("Invalid 'gear' field", "setpoint");
+            return;
+        }
+        gear = stringToGear(gear_item->valuestring);
+        if (gear == Gear::PARK && strcmp(gear_item->valuestring, "PARK") != 0) {
+            sendError("Invalid gear value", "setpoint");
+            return;
+        }
+        has_gear = true;
+    }
+    
+    bool has_speed = false;
+    int speed = 0;
+    cJSON* speed_item = cJSON_GetObjectItem(json, "speed");
+    if (speed_item) {
+        if (!cJSON_IsNumber(speed_item)) {
+            sendError("Invalid 'speed' field", "setpoint");
+            return;
+        }
+        speed = speed_item->valueint;
+        if (speed < 0 || speed > 250) {
+            sendError("Speed must be between 0 and 250 km/h", "setpoint");
+            return;
+        }
+        has_speed = true;
+    }
+    
+    // 0 starts a new stream, then sequence numbers run 1..65535 and wrap to 1
+    if (seq == 0 || !setpoint_stream_active) {
+        setpoint_received = 0;
+        setpoint_lost = 0;
+        setpoint_stream_active = true;
+    } else {
+        uint32_t gap = seq > setpoint_last_seq ? seq - setpoint_last_seq : seq + 0xFFFF - setpoint_last_seq;
+        if (seq == setpoint_last_seq || gap >= 0x8000) {
+            // Duplicate or older than what was already applied
+            return;
+        }
+        setpoint_lost += gap - 1;
+    }
+    setpoint_last_seq = seq;
+    setpoint_received++;
+    
+    // Latest setpoint wins; the CAN task applies it on its next tick
+    controller.setSetpoint(has_gear, gear, has_speed, static_cast<uint8_t>(speed));
+    
+    // Periodic acks let the host detect loss without a reply per setpoint
+    cJSON* ack_item = cJSON_GetObjectItem(json, "ack");
+    if (cJSON_IsTrue(ack_item) || setpoint_received % SETPOINT_ACK_INTERVAL == 0) {
+        cJSON* data = cJSON_CreateObject();
+        cJSON_AddNumberToObject(data, "seq", setpoint_last_seq);
+        cJSON_AddNumberToObject(data, "received", setpoint_received);
+        cJSON_AddNumberToObject(data, "lost", setpoint_lost);
+        sendResponse("setpoint_ack", "ok", "setpoint", data);
+    }
+}
+
 void SerialCommandHandler::sendResponse(const char* type, const char* status, const char* command, cJSON* data) {
     cJSON* response = cJSON_CreateObject();
     
@@ -320,6 +704,10 @@ void SerialCommandHandler::sendResponse(const char* type, const char* status, co
         cJSON_AddStringToObject(response, "command", command);
     }
     
+    if (has_request_id) {
+        cJSON_AddNumberToObject(response, "id", request_id);
+    }
+    
     cJSON_AddNumberToObject(response, "timestamp", esp_timer_get_time() / 1000);
     
     if (data) {
@@ -333,11 +721,10 @@ void SerialCommandHandler::sendResponse(const char* type, const char* status, co
         }
     }
     
-    char* json_string = cJSON_Print(response);
-    if (json_string) {
-        printf("%s\n", json_string);
-        fflush(stdout);  // Ensure immediate output
-        free(json_string);
+    if (request_binary) {
+        sendBinary(response);
+    } else {
+        printJson(response);
     }
     
     cJSON_Delete(response);
@@ -364,14 +751,149 @@ void SerialCommandHandler::sendStatusUpdate() {
     cJSON_AddStringToObject(response, "firmware_version", "1.0.0");
     cJSON_AddNumberToObject(response, "timestamp", esp_timer_get_time() / 1000);
     
-    char* json_string = cJSON_Print(response);
+    if (binary_output) {
+        sendBinary(response);
+    } else {
+        printJson(response);
+    }
+    
+    cJSON_Delete(response);
+}
+
+void SerialCommandHandler::printJson(cJSON* json) {
+    // Compact output keeps every frame on one line and saves ~15% of the bytes
+    char* json_string = compact_output ? cJSON_PrintUnformatted(json) : cJSON_Print(json);
     if (json_string) {
         printf("%s\n", json_string);
         fflush(stdout);  // Ensure immediate output
         free(json_string);
     }
+}
+
+void SerialCommandHandler::sendBinary(cJSON* json) {
+    uint8_t frame[BinaryProtocol::MAX_FRAME_SIZE];
+    size_t len = 0;
+    
+    // Header: type, sequence number (request ID), command code
+    cJSON* type_item = cJSON_GetObjectItem(json, "type");
+    const char* type = cJSON_IsString(type_item) ? type_item->valuestring : "";
+    if (strcmp(type, "status_update") == 0) {
+        frame[len++] = BinaryProtocol::MSG_STATUS_UPDATE;
+    } else if (strcmp(type, "setpoint_ack") == 0) {
+        frame[len++] = BinaryProtocol::MSG_SETPOINT_ACK;
+    } else if (strcmp(type, "error") == 0) {
+        frame[len++] = BinaryProtocol::MSG_ERROR;
+    } else {
+        frame[len++] = BinaryProtocol::MSG_RESPONSE;
+    }
     
-    cJSON_Delete(response);
+    uint16_t seq = has_request_id ? static_cast<uint16_t>(request_id) : 0;
+    frame[len++] = seq & 0xFF;
+    frame[len++] = seq >> 8;
+    
+    cJSON* cmd_item = cJSON_GetObjectItem(json, "command");
+    frame[len++] = cJSON_IsString(cmd_item) ? BinaryProtocol::commandCode(cmd_item->valuestring) : 0;
+    
+    // Fields; anything without a key (type, command, id, timestamp) is header or dropped
+    const size_t limit = sizeof(frame) - BinaryProtocol::CRC_SIZE;
+    for (cJSON* item = json->child; item; item = item->next) {
+        uint8_t key = BinaryProtocol::fieldKey(item->string);
+        if (key == 0 || len + 2 > limit) {
+            continue;
+        }
+        
+        switch (key) {
+            case BinaryProtocol::FIELD_VEHICLE:
+                frame[len++] = key;
+                frame[len++] = cJSON_IsString(item) ? stringToVehicleId(item->valuestring) : 0;
+                break;
+            case BinaryProtocol::FIELD_GEAR:
+                frame[len++] = key;
+                frame[len++] = cJSON_IsString(item) ? static_cast<uint8_t>(stringToGear(item->valuestring)) : 0xFF;
+                break;
+            case BinaryProtocol::FIELD_SPEED:
+                frame[len++] = key;
+                frame[len++] = static_cast<uint8_t>(item->valueint);
+                break;
+            case BinaryProtocol::FIELD_SEQ: {
+                if (len + 3 > limit) {
+                    break;
+                }
+                uint16_t value = static_cast<uint16_t>(item->valueint);
+                frame[len++] = key;
+                frame[len++] = value & 0xFF;
+                frame[len++] = value >> 8;
+                break;
+            }
+            case BinaryProtocol::FIELD_UPTIME:
+            case BinaryProtocol::FIELD_RECEIVED:
+            case BinaryProtocol::FIELD_LOST: {
+                if (len + 5 > limit) {
+                    break;
+                }
+                uint32_t value = static_cast<uint32_t>(item->valuedouble);
+                frame[len++] = key;
+                for (int i = 0; i < 4; i++) {
+                    frame[len++] = (value >> (8 * i)) & 0xFF;
+                }
+                break;
+            }
+            case BinaryProtocol::FIELD_FIRMWARE_VERSION:
+            case BinaryProtocol::FIELD_MESSAGE: {
+                const char* text = cJSON_IsString(item) ? item->valuestring : "";
+                size_t text_len = strlen(text);
+                if (text_len > limit - len - 2) {
+                    text_len = limit - len - 2;
+                }
+                frame[len++] = key;
+                frame[len++] = static_cast<uint8_t>(text_len);
+                memcpy(&frame[len], text, text_len);
+                len += text_len;
+                break;
+            }
+            case BinaryProtocol::FIELD_VEHICLES: {
+                frame[len++] = key;
+                size_t count_pos = len++;
+                uint8_t count = 0;
+                cJSON* vehicle = nullptr;
+                cJSON_ArrayForEach(vehicle, item) {
+                    if (len >= limit || !cJSON_IsString(vehicle)) {
+                        break;
+                    }
+                    frame[len++] = stringToVehicleId(vehicle->valuestring);
+                    count++;
+                }
+                frame[count_pos] = count;
+                break;
+            }
+            case BinaryProtocol::FIELD_PROTOCOL:
+                frame[len++] = key;
+                frame[len++] = (cJSON_IsString(item) && strcmp(item->valuestring, "binary") == 0) ? 1 : 0;
+                break;
+            case BinaryProtocol::FIELD_STATUS:
+                frame[len++] = key;
+                frame[len++] = (cJSON_IsString(item) && strcmp(item->valuestring, "ok") == 0) ? 0 : 1;
+                break;
+            default:
+                // Booleans (can_active, active, compact)
+                frame[len++] = key;
+                frame[len++] = cJSON_IsTrue(item) ? 1 : 0;
+                break;
+        }
+    }
+    
+    uint16_t crc = BinaryProtocol::crc16(frame, len);
+    frame[len++] = crc & 0xFF;
+    frame[len++] = crc >> 8;
+    
+    // Delimiters + COBS overhead (one byte per 254)
+    uint8_t encoded[BinaryProtocol::MAX_FRAME_SIZE + BinaryProtocol::MAX_FRAME_SIZE / 254 + 3];
+    encoded[0] = 0x00;
+    size_t encoded_len = 1 + BinaryProtocol::cobsEncode(frame, len, &encoded[1]);
+    encoded[encoded_len++] = 0x00;
+    
+    fwrite(encoded, 1, encoded_len, stdout);
+    fflush(stdout);
 }
 
 void SerialCommandHandler::notifyStatusUpdate() {
@@ -10,6 +10,7 @@
 #include "common.h"
 #include "BaseMessageGenerator.h"
 #include <string>
+#include <vector>
 #include <functional>
 
 class CarCanController;
@@ -23,15 +24,34 @@ class CarCanGui;
  * - Getting current status
  * - Controlling CAN transmission
  * 
- * Commands are JSON objects sent over UART:
- * {"command": "set_vehicle", "vehicle": "VWT7"}
+ * Commands are JSON objects sent over UART. An optional numeric "id" is
+ * echoed back in the response so the host can match replies to requests:
+ * {"command": "set_vehicle", "vehicle": "VWT7", "id": 42}
  * {"command": "set_gear", "gear": "PARK"}
  * {"command": "set_speed", "speed": 120}
  * {"command": "get_status"}
+ * {"command": "set_state", "vehicle": "VWT7", "gear": "DRIVE", "speed": 50}
+ * {"command": "set_format", "compact": true}
+ * {"command": "set_protocol", "protocol": "binary"}
+ * {"command": "setpoint", "seq": 17, "speed": 88, "gear": "DRIVE"}
  * 
  * Responses are JSON objects:
- * {"type": "response", "status": "ok", "command": "set_vehicle", "vehicle": "VWT7"}
+ * {"type": "response", "status": "ok", "command": "set_vehicle", "id": 42, "vehicle": "VWT7"}
  * {"type": "status_update", "vehicle": "VWT7", "gear": "PARK", "speed": 120, "can_active": true}
+ * {"type": "setpoint_ack", "status": "ok", "command": "setpoint", "seq": 20, "received": 20, "lost": 0}
+ *
+ * setpoint is the streaming form of set_gear/set_speed for profile replay:
+ * no response per command and no log line. The 16-bit "seq" detects loss;
+ * every 10th setpoint (or one with "ack": true) is acknowledged with
+ * setpoint_ack. The value is applied on the next CAN transmit tick.
+ *
+ * Output is pretty-printed (cJSON_Print) by default. After set_format with
+ * "compact": true every JSON object is printed unformatted on a single line.
+ *
+ * The same commands can also be sent as COBS/CRC binary frames delimited by
+ * 0x00 (see BinaryProtocol.h). Both formats are accepted at any time and each
+ * response uses the format of its request. set_protocol selects the format
+ * of unsolicited status updates.
  */
 class SerialCommandHandler {
 public:
@@ -40,7 +60,8 @@ public:
     
     /**
      * Initialize serial command handler
-     * Creates background task for reading serial commands
+     * Installs the UART driver on the console port and creates the
+     * background task for reading serial commands
      */
     bool initialize();
     
@@ -60,23 +81,59 @@ private:
     
     // FreeRTOS task handling
     TaskHandle_t serial_task_handle;
-    QueueHandle_t command_queue;
+    QueueHandle_t uart_queue;  // UART driver event queue
     bool running;
     
-    // Serial buffer
+    // Serial buffers (JSON line, binary frame between 0x00 delimiters)
     std::string input_buffer;
+    std::vector<uint8_t> binary_buffer;
+    bool in_binary_frame;
+    
+    // Correlation ID of the command being processed (echoed in responses)
+    bool has_request_id;
+    double request_id;
+    
+    // The command being processed arrived as a binary frame
+    bool request_binary;
+    
+    // Single-line JSON output (negotiated by the host with set_format)
+    bool compact_output;
+    
+    // Binary status updates (negotiated by the host with set_protocol)
+    bool binary_output;
+    
+    // Setpoint stream statistics (reported in setpoint_ack)
+    uint16_t setpoint_last_seq;
+    uint32_t setpoint_received;
+    uint32_t setpoint_lost;
+    bool setpoint_stream_active;
     
     /**
-     * Background task that reads serial input
+     * Background task that waits on UART driver events and reads serial input
      */
     static void serialTaskWrapper(void* params);
     void serialTask();
     
+    /**
+     * Feed one received byte to the JSON line / binary frame assembler
+     */
+    void handleInputByte(uint8_t byte);
+    
     /**
      * Process a complete JSON command
      */
     void processCommand(const std::string& command_str);
     
+    /**
+     * Decode a COBS binary frame (without delimiters) and dispatch it
+     */
+    void processBinaryFrame(const std::vector<uint8_t>& encoded);
+    
+    /**
+     * Dispatch a parsed command to its handler
+     */
+    void dispatchCommand(cJSON* json, bool binary);
+    
     /**
      * Handle individual commands
      */
@@ -85,9 +142,14 @@ private:
     void handleSetVehicle(cJSON* json);
     void handleSetGear(cJSON* json);
     void handleSetSpeed(cJSON* json);
+    void handleSetState(cJSON* json);
     void handleSetCanActive(cJSON* json);
     void handleGetSupportedVehicles(cJSON* json);
     void handleResetSettings(cJSON* json);
+    void handleSetFormat(cJSON* json);
+    void handleSetProtocol(cJSON* json);
+    void handleSetpoint(cJSON* json);
+    bool isSetpoint(cJSON* json);
     
     /**
      * Send JSON response
@@ -95,6 +157,8 @@ private:
     void sendResponse(const char* type, const char* status, const char* command = nullptr, cJSON* data = nullptr);
     void sendError(const char* message, const char* command = nullptr);
     void sendStatusUpdate();
+    void printJson(cJSON* json);
+    void sendBinary(cJSON* json);
     
     /**
      * Helper functions
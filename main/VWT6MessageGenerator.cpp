@@ -5,15 +5,8 @@
 #define TAG "VWT6Gen"
 
 void VWT6MessageGenerator::generateSpeedMessage(uint8_t speed_kmh, uint8_t* data, uint8_t& dlc) {
-    dlc = 8;  // VW T6 uses 8-byte messages
-    clearDataBuffer(data, dlc);  // Initialize all bytes to 0
-    
-    // Convert speed using the real T6 factor (0.005)
-    uint16_t speed_value = static_cast<uint16_t>(speed_kmh / SPEED_FACTOR);
-    
-    // Pack speed value into the message (VW T6 format - bytes 2-3, little endian)
-    data[2] = speed_value & 0xFF;        // Low byte
-    data[3] = (speed_value >> 8) & 0xFF; // High byte
+    // Real T6 factor (0.005), bytes 2-3 little endian (signals/VWT6.json)
+    uint16_t speed_value = Signals::encodeSpeed(speed_kmh, data, dlc);
     
     ESP_LOGI(TAG, "T6 Speed DEBUG: %d km/h -> raw_value: %d -> data[2]=0x%02X, data[3]=0x%02X", 
              speed_kmh, speed_value, data[2], data[3]);
@@ -22,21 +15,8 @@ void VWT6MessageGenerator::generateSpeedMessage(uint8_t speed_kmh, uint8_t* data
 }
 
 void VWT6MessageGenerator::generateGearMessage(Gear gear, uint8_t* data, uint8_t& dlc) {
-    dlc = 8;  // VW T6 uses 8-byte messages
-    clearDataBuffer(data, dlc);  // Initialize all bytes to 0
-    
-    // Map our gear enum to real VW T6 gear values (from parser implementation)
-    uint8_t gear_value;
-    switch (gear) {
-        case Gear::PARK:     gear_value = 0x80; break; // Real T6 Park value
-        case Gear::REVERSE:  gear_value = 0x77; break; // Real T6 Reverse value (engine on)
-        case Gear::NEUTRAL:  gear_value = 0x60; break; // Real T6 Neutral value
-        case Gear::DRIVE:    gear_value = 0x50; break; // Real T6 Drive value
-        default:            gear_value = 0x80; break; // Default to PARK
-    }
-    
-    // Set gear value in byte 1 (VW T6 format - from parser)
-    data[1] = gear_value;
+    // Real T6 gear values in byte 1, REVERSE with engine on (signals/VWT6.json)
+    uint8_t gear_value = Signals::encodeGear(gear, data, dlc);
     
     ESP_LOGI(TAG, "T6 Gear DEBUG: %d -> gear_value: 0x%02X -> data[1]=0x%02X", 
              static_cast<int>(gear), gear_value, data[1]);
@@ -45,17 +25,17 @@ void VWT6MessageGenerator::generateGearMessage(Gear gear, uint8_t* data, uint8_t
 }
 
 std::vector<uint32_t> VWT6MessageGenerator::getRequiredMessageIds() const {
-    return {GEAR_MSG_ID, SPEED_MSG_ID};
+    return {Signals::GEAR_MSG_ID, Signals::SPEED_MSG_ID};
 }
 
 uint32_t VWT6MessageGenerator::getCANBaudRate() const {
-    return CAN_BAUDRATE;
+    return Signals::CAN_BAUDRATE;
 }
 
 button_id_t VWT6MessageGenerator::getVehicleType() const {
-    return VW_T6;
+    return Signals::VEHICLE_TYPE;
 }
 
 const char* VWT6MessageGenerator::getVehicleName() const {
-    return "VW T6";
+    return Signals::NAME;
 }
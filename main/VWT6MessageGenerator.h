@@ -2,6 +2,7 @@
 #define VWT6_MESSAGE_GENERATOR_H
 
 #include "BaseMessageGenerator.h"
+#include "VehicleSignals.h"  // Generated from signals/VWT6.json
 
 /**
  * CAN message generator for Volkswagen T6 vehicles
@@ -19,11 +20,8 @@ public:
     const char* getVehicleName() const override;
 
 private:
-    // VW T6 specific constants (from real parser implementation)
-    static constexpr uint32_t SPEED_MSG_ID = 0x01A0;  // Real VW T6 speed CAN ID
-    static constexpr uint32_t GEAR_MSG_ID = 0x0440;   // Real VW T6 gear CAN ID
-    static constexpr uint32_t CAN_BAUDRATE = 500000;  // 500k baud rate
-    static constexpr float SPEED_FACTOR = 0.005f;     // Real VW T6 speed factor
+    // VW T6 IDs, layout and encoders (from real parser implementation)
+    using Signals = vehicle_signals::VWT6;
 };
 
 #endif // VWT6_MESSAGE_GENERATOR_H
@@ -2,6 +2,7 @@
 #define VWT7_MESSAGE_GENERATOR_H
 
 #include "BaseMessageGenerator.h"
+#include "VehicleSignals.h"  // Generated from signals/VWT7.json
 
 /**
  * CAN message generator for Volkswagen T7 vehicles
@@ -19,11 +20,8 @@ public:
     const char* getVehicleName() const override;
 
 private:
-    // VW T7 specific constants
-    static constexpr uint32_t SPEED_MSG_ID = 0x0FD;
-    static constexpr uint32_t GEAR_MSG_ID = 0x3DC;
-    static constexpr uint32_t CAN_BAUDRATE = 500000;
-    static constexpr float SPEED_FACTOR = 0.01f;
+    // VW T7 IDs, layout and encoders
+    using Signals = vehicle_signals::VWT7;
 };
 
 #endif // VWT7_MESSAGE_GENERATOR_H
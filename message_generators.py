@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+CAN message generators (host-side mirror of the firmware)
+
+Python counterparts of VWT6MessageGenerator / VWT7MessageGenerator and
+MessageGeneratorFactory in main/, driven by the same signal definitions
+(signals/*.json, see signal_db.py). They produce byte-identical CAN payloads,
+including the single-precision speed conversion of
+static_cast<uint16_t>(speed_kmh / SPEED_FACTOR), so the emulator and tests
+can predict exactly what the board puts on the bus.
+
+Usage:
+    generator = get_message_generator("VWT7")
+    gear_id, speed_id = generator.required_message_ids()
+    data = generator.generate_speed_message(50)   # 8 bytes
+"""
+
+import struct
+from typing import Optional, List, Dict
+
+from signal_db import VehicleSignals, get_vehicle_signals, vehicle_signals
+
+def _float32(value: float) -> float:
+    """Round to IEEE single precision, like a C++ float"""
+    return struct.unpack('<f', struct.pack('<f', value))[0]
+
+class BaseMessageGenerator:
+    """Gear + speed frames for one vehicle, laid out by its signals/ definition (see BaseMessageGenerator.h)"""
+
+    def __init__(self, signals: VehicleSignals):
+        self.signals = signals
+        self.VEHICLE_NAME = signals.name
+        self.SPEED_MSG_ID = signals.speed.message_id
+        self.GEAR_MSG_ID = signals.gear.message_id
+        self.CAN_BAUDRATE = signals.bitrate
+        self.SPEED_FACTOR = signals.speed.factor
+        self.GEAR_VALUES: Dict[str, int] = signals.gear.values
+        self.DEFAULT_GEAR = signals.gear.default
+        # constexpr float in the firmware
+        self._speed_factor = _float32(self.SPEED_FACTOR)
+        # Speed frames only depend on the uint8 speed: build each once
+        self._speed_cache: Dict[int, bytes] = {}
+
+    def required_message_ids(self) -> List[int]:
+        """[gear_id, speed_id], in the order the firmware sends them"""
+        return self.signals.message_ids()
+
+    def can_baudrate(self) -> int:
+        return self.CAN_BAUDRATE
+
+    def vehicle_name(self) -> str:
+        return self.VEHICLE_NAME
+
+    def speed_raw(self, speed_kmh: int) -> int:
+        """Raw signal value: uint16_t(float(speed_kmh) / SPEED_FACTOR)"""
+        speed_kmh &= 0xFF  # uint8_t parameter
+        # Division of two floats rounded once to single precision, then truncated
+        return int(_float32(speed_kmh / self._speed_factor)) & 0xFFFF
+
+    def generate_speed_message(self, speed_kmh: int) -> bytes:
+        data = self._speed_cache.get(speed_kmh)
+        if data is None:
+            payload = bytearray(self.signals.dlc)
+            self.signals.speed.pack(payload, self.speed_raw(speed_kmh))
+            data = self._speed_cache[speed_kmh] = bytes(payload)
+        return data
+
+    def generate_gear_message(self, gear: str) -> bytes:
+        payload = bytearray(self.signals.dlc)
+        self.signals.gear.pack(payload, self.gear_value(gear))
+        return bytes(payload)
+
+    def gear_value(self, gear: str) -> int:
+        return self.GEAR_VALUES.get(gear, self.GEAR_VALUES[self.DEFAULT_GEAR])
+
+_generator_cache: Dict[str, BaseMessageGenerator] = {}
+
+def get_message_generator(vehicle: str) -> Optional[BaseMessageGenerator]:
+    """Cached generator for a vehicle name, None if the firmware has none"""
+    generator = _generator_cache.get(vehicle)
+    if generator is None:
+        signals = get_vehicle_signals(vehicle)
+        if signals is None:
+            return None
+        # Aliases (T6.1 and T5 use the T6 protocol) share one generator
+        generator = _generator_cache.get(signals.vehicle)
+        if generator is None:
+            generator = _generator_cache[signals.vehicle] = BaseMessageGenerator(signals)
+        _generator_cache[vehicle] = generator
+    return generator
+
+def supported_vehicles() -> List[str]:
+    return list(vehicle_signals())
@@ -2,147 +2,363 @@
 """
 Simple CLI tool to read PEAK CAN dongle at 500k baud
 
+Frames are captured by CaptureEngine: a receive thread does nothing but
+bus.recv() into a preallocated ring buffer, and a format thread turns the
+buffered frames into text in batches, writing each batch to a buffered
+output with a single write. A busy bus therefore never waits for the
+terminal, and frames that arrive while the output is slow are counted as
+ring overruns instead of silently backing up in the driver queue.
+
+With --write the frames are also recorded to a binary capture file
+(can_capture.py, needs NumPy) and indexed by ID and time when the capture
+ends; --quiet skips the text output entirely.
+
 Usage:
     python3 pcan_reader.py                    # Read all messages
     python3 pcan_reader.py --filter 0x1A0    # Filter specific ID
     python3 pcan_reader.py --decode-t6        # Decode VW T6 messages
+    python3 pcan_reader.py --interface socketcan --channel vcan0
+    python3 pcan_reader.py --write night.cancap --quiet   # Overnight recording
+
+    engine = CaptureEngine(bus, output=open("capture.txt", "w"))
+    engine.start()
+    ...
+    stats = engine.stop()
 """
 
+import io
 import can
+import sys
 import time
 import argparse
-import sys
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Optional, TextIO, Any
 
-def decode_vw_t6_message(msg):
-    """Decode VW T6 specific messages"""
-    if msg.arbitration_id == 0x01A0:  # Speed message
-        if len(msg.data) >= 4:
-            speed_raw = msg.data[2] | (msg.data[3] << 8)
-            speed_kmh = speed_raw * 0.005
+from signal_db import get_vehicle_signals
+from sim_clock import Clock, WALL_CLOCK
+
+# Layout from signals/VWT6.json
+_T6 = get_vehicle_signals("VWT6")
+T6_GEARS = _T6.gear.names
+_T6_SPEED_ID, _t6_speed = _T6.speed.message_id, _T6.speed.decode
+_T6_GEAR_ID, _t6_gear = _T6.gear.message_id, _T6.gear.decode
+
+def _decode_t6(arbitration_id: int, data) -> Optional[str]:
+    if arbitration_id == _T6_SPEED_ID:
+        speed_kmh = _t6_speed(data)
+        if speed_kmh is not None:
             return f"Speed: {speed_kmh:.1f} km/h"
-    elif msg.arbitration_id == 0x0440:  # Gear message
-        if len(msg.data) >= 2:
-            gear_raw = msg.data[1]
-            gear_map = {0x80: "PARK", 0x77: "REVERSE", 0x60: "NEUTRAL", 0x50: "DRIVE"}
-            gear = gear_map.get(gear_raw, f"UNKNOWN(0x{gear_raw:02X})")
+    elif arbitration_id == _T6_GEAR_ID:
+        gear = _t6_gear(data)
+        if gear is not None:
             return f"Gear: {gear}"
     return None
 
+def decode_vw_t6_message(msg):
+    """Decode VW T6 specific messages"""
+    return _decode_t6(msg.arbitration_id, msg.data)
+
+# Same values as can_capture.FLAG_*, which needs NumPy
+_FLAG_EXTENDED, _FLAG_REMOTE, _FLAG_ERROR, _FLAG_FD = 0x01, 0x02, 0x04, 0x08
+
+# Data column: always 8 bytes, "--" for missing ones
+_DATA_FILL = ["-- " * 7 + "--"] + [" --" * (8 - n) for n in range(1, 9)]
+_ASCII = "".join(chr(b) if 32 <= b <= 126 else "." for b in range(256))
+
+class FrameRing:
+    """
+    Preallocated single-producer/single-consumer ring of CAN frames.
+
+    head and tail count frames ever written/consumed; each is only advanced
+    by its own thread, after the slot is complete. A frame arriving while
+    the ring is full is dropped and counted in overruns. dlcs holds the
+    frame's DLC (what the bus reported, also for remote frames) and lengths
+    the number of payload bytes stored in data. Payloads are limited to 8
+    bytes (CAN FD frames are truncated and flagged).
+    """
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.ids = array('I', bytes(4 * capacity))
+        self.flags = bytearray(capacity)     # can_capture FLAG_* bits
+        self.dlcs = bytearray(capacity)
+        self.lengths = bytearray(capacity)
+        self.data = bytearray(8 * capacity)
+        self.head = 0
+        self.tail = 0
+        self.overruns = 0
+
+    def __len__(self) -> int:
+        return self.head - self.tail
+
+    def push(self, msg: can.Message) -> bool:
+        head = self.head
+        if head - self.tail >= self.capacity:
+            self.overruns += 1
+            return False
+        slot = head % self.capacity
+        data = msg.data
+        length = len(data)
+        flags = _FLAG_EXTENDED if msg.is_extended_id else 0
+        if msg.is_remote_frame or msg.is_error_frame or msg.is_fd or length > 8:
+            flags |= ((_FLAG_REMOTE if msg.is_remote_frame else 0) | (_FLAG_ERROR if msg.is_error_frame else 0)
+                      | (_FLAG_FD if msg.is_fd else 0))
+            if length > 8:
+                data, length = data[:8], 8
+        self.timestamps[slot] = msg.timestamp
+        self.ids[slot] = msg.arbitration_id
+        self.flags[slot] = flags
+        self.dlcs[slot] = min(msg.dlc, 8)
+        self.lengths[slot] = length
+        self.data[slot * 8:slot * 8 + length] = data
+        self.head = head + 1
+        return True
+
+@dataclass
+class CaptureStats:
+    """Counters of one capture; CPU times are per thread"""
+    received: int = 0         # Frames taken from the bus
+    written: int = 0          # Frames written (text lines and/or capture records)
+    filtered: int = 0         # Frames skipped by the ID filter
+    overruns: int = 0         # Frames dropped because the ring was full
+    bus_errors: int = 0
+    recv_cpu: float = 0.0     # Seconds of CPU in the receive thread
+    format_cpu: float = 0.0   # Seconds of CPU in the format thread
+
+class CaptureEngine:
+    """
+    Receives frames on one thread and formats them in batches on another.
+
+    Each batch is written as text to output (unless text is False) and,
+    with a recorder (can_capture.CaptureWriter), as binary records.
+    """
+
+    def __init__(self, bus: can.BusABC, output: Optional[TextIO] = None, id_filter: Optional[int] = None,
+                 show_ascii: bool = False, decode_t6: bool = False, count: Optional[int] = None,
+                 ring_capacity: int = 65536, batch_size: int = 4096, poll_interval: float = 0.005,
+                 clock: Clock = WALL_CLOCK, recorder: Optional[Any] = None, text: bool = True):
+        self.bus = bus
+        self.output = output if output is not None else sys.stdout
+        self.recorder = recorder
+        self.text = text
+        self.id_filter = id_filter
+        self.show_ascii = show_ascii
+        self.decode_t6 = decode_t6
+        self.count = count
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.ring = FrameRing(ring_capacity)
+        self.stats = CaptureStats()
+        self.error: Optional[Exception] = None
+        self.start_time = 0.0
+        self._running = False
+        self._receiver: Optional[threading.Thread] = None
+        self._formatter: Optional[threading.Thread] = None
+
+    def start(self):
+        self.start_time = self.clock.time()
+        self._running = True
+        self._receiver = threading.Thread(target=self._receive_loop, name="can-recv", daemon=True)
+        self._formatter = threading.Thread(target=self._format_loop, name="can-format", daemon=True)
+        self._receiver.start()
+        self._formatter.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the capture ends by itself (count reached or error); True if it did"""
+        self._receiver.join(timeout)
+        return not self._receiver.is_alive()
+
+    def stop(self) -> CaptureStats:
+        """Stop receiving, write everything still buffered and return the stats"""
+        self._running = False
+        if self._receiver:
+            self._receiver.join()
+        if self._formatter:
+            self._formatter.join()
+        self.stats.overruns = self.ring.overruns
+        return self.stats
+
+    def _receive_loop(self):
+        bus, ring, stats = self.bus, self.ring, self.stats
+        id_filter, count = self.id_filter, self.count
+        while self._running:
+            try:
+                msg = bus.recv(timeout=0.1)
+            except can.CanError as e:
+                if "Bus error" in str(e):
+                    # Bus errors are common and don't need to break the loop
+                    stats.bus_errors += 1
+                    continue
+                self.error = e
+                break
+            if msg is None:
+                continue
+            if id_filter is not None and msg.arbitration_id != id_filter:
+                stats.filtered += 1
+                continue
+            stats.received += 1
+            ring.push(msg)
+            if count and stats.received >= count:
+                break
+        stats.recv_cpu = time.thread_time()
+
+    def _format_loop(self):
+        ring = self.ring
+        while True:
+            # Read _running before draining so nothing pushed before stop() is missed
+            running = self._running and self._receiver.is_alive()
+            if len(ring):
+                self._drain_batch()
+            elif running:
+                time.sleep(self.poll_interval)
+            else:
+                break
+        self.output.flush()
+        if self.recorder is not None:
+            self.recorder.flush()
+        self.stats.format_cpu = time.thread_time()
+
+    def _drain_batch(self):
+        ring = self.ring
+        start, end = ring.tail, min(ring.head, ring.tail + self.batch_size)
+        if self.recorder is not None:
+            self.recorder.write_ring(ring, start, end)
+        if self.text:
+            self._write_text(start, end)
+        # Slots are free again once copied out
+        ring.tail = end
+        self.stats.written += end - start
+
+    def _write_text(self, start: int, end: int):
+        ring = self.ring
+        capacity = ring.capacity
+        timestamps, ids, dlcs, lengths = ring.timestamps, ring.ids, ring.dlcs, ring.lengths
+        data = memoryview(ring.data)
+        origin = self.start_time
+        show_ascii, decode_t6 = self.show_ascii, self.decode_t6
+        lines = []
+        append = lines.append
+        for position in range(start, end):
+            slot = position % capacity
+            length = lengths[slot]
+            payload = data[slot * 8:slot * 8 + length]
+            data_str = payload.hex(' ').upper() + _DATA_FILL[length] if length else _DATA_FILL[0]
+            line = "%8.3fs | 0x%03X | %d   | %-31s" % (timestamps[slot] - origin, ids[slot], dlcs[slot], data_str)
+            if show_ascii:
+                line += " [" + (bytes(payload).decode('latin-1').translate(_ASCII) + "." * (8 - length)) + "]"
+            if decode_t6:
+                decoded = _decode_t6(ids[slot], payload)
+                if decoded:
+                    line += " | " + decoded
+            append(line)
+        lines.append("")
+        self.output.write("\n".join(lines))
+        self.output.flush()
+
 def main():
     parser = argparse.ArgumentParser(description="Read PEAK CAN dongle at 500k baud")
     parser.add_argument("--filter", type=lambda x: int(x, 0), help="Filter specific CAN ID (e.g., 0x1A0)")
     parser.add_argument("--decode-t6", action="store_true", help="Decode VW T6 messages")
     parser.add_argument("--baud", type=int, default=500000, help="CAN baud rate (default: 500000)")
     parser.add_argument("--channel", type=str, default="PCAN_USBBUS1", help="PCAN channel (default: PCAN_USBBUS1)")
+    parser.add_argument("--interface", type=str, default="pcan", help="python-can interface (default: pcan)")
     parser.add_argument("--count", type=int, help="Number of messages to capture (default: unlimited)")
     parser.add_argument("--show-ascii", action="store_true", help="Show ASCII representation of data")
     parser.add_argument("--summary", action="store_true", help="Show message summary and analysis")
+    parser.add_argument("--ring-size", type=int, default=65536, help="Capture ring buffer in frames (default: 65536)")
+    parser.add_argument("--write", metavar="FILE", help="Record frames to a binary capture file (see can_capture.py)")
+    parser.add_argument("--quiet", action="store_true", help="Do not print frames (e.g. with --write)")
     args = parser.parse_args()
 
     print(f"🔌 Connecting to {args.channel} at {args.baud} baud...")
-    
+
+    bus = None
+    stats = None
+    recorder = None
     try:
         # Connect to PCAN device
         bus = can.Bus(
             channel=args.channel,
-            interface="pcan", 
+            interface=args.interface,
             bitrate=args.baud
         )
         print(f"✅ Connected successfully!")
-        
+
         if args.filter:
             print(f"🔍 Filtering for CAN ID: 0x{args.filter:03X}")
         if args.decode_t6:
             print("🚗 VW T6 decoding enabled")
         if args.count:
             print(f"📊 Will capture {args.count} messages")
-        
-        # Print header after connection to avoid bus error interference
-        print("")
-        print("=" * 90)
-        print("📡 CAN MESSAGE CAPTURE")
-        print("=" * 90)
-        
-        header = "Time      | ID    | DLC | Data (all 8 bytes)                     "
-        if args.show_ascii:
-            header += " | ASCII    "
-        if args.decode_t6:
-            header += " | Decoded"
-        print(header)
-        print("-" * len(header))
-        
-        start_time = time.time()
-        message_count = 0
-        
-        while True:
-            try:
-                message = bus.recv(timeout=1.0)
-                if message is None:
-                    continue
-                    
-                # Filter by ID if specified
-                if args.filter and message.arbitration_id != args.filter:
-                    continue
-                
-                message_count += 1
-                elapsed = time.time() - start_time
-                
-                # Format message data - always show 8 bytes, pad with -- for missing bytes
-                data_bytes = list(message.data) + [None] * (8 - len(message.data))
-                data_str = ' '.join(f'{b:02X}' if b is not None else '--' for b in data_bytes)
-                
-                # ASCII representation if requested
-                ascii_str = ""
-                if args.show_ascii:
-                    ascii_chars = ''.join(chr(b) if b is not None and 32 <= b <= 126 else '.' for b in data_bytes)
-                    ascii_str = f" [{ascii_chars}]"
-                
-                # Decode if requested
-                decoded = ""
-                if args.decode_t6:
-                    decoded_msg = decode_vw_t6_message(message)
-                    if decoded_msg:
-                        decoded = f" | {decoded_msg}"
-                
-                print(f"{elapsed:8.3f}s | 0x{message.arbitration_id:03X} | {message.dlc}   | {data_str:<31}{ascii_str}{decoded}")
-                
-                # Exit if count reached
-                if args.count and message_count >= args.count:
-                    break
-                    
-            except KeyboardInterrupt:
-                print(f"\n🛑 Interrupted by user")
-                break
-            except Exception as e:
-                error_msg = str(e)
-                if "Bus error" in error_msg:
-                    # Bus errors are common and don't need to break the loop
-                    continue
-                else:
-                    print(f"❌ Error receiving message: {e}")
-                    break
-                
+        if args.write:
+            from can_capture import CaptureWriter  # Needs NumPy
+            recorder = CaptureWriter(args.write, bitrate=args.baud, channel=args.channel)
+            print(f"💾 Recording to {args.write}")
+
+        if not args.quiet:
+            # Print header after connection to avoid bus error interference
+            print("")
+            print("=" * 90)
+            print("📡 CAN MESSAGE CAPTURE")
+            print("=" * 90)
+
+            header = "Time      | ID    | DLC | Data (all 8 bytes)                     "
+            if args.show_ascii:
+                header += " | ASCII    "
+            if args.decode_t6:
+                header += " | Decoded"
+            print(header)
+            print("-" * len(header))
+        sys.stdout.flush()
+
+        # Batches go straight to the stdout file descriptor through a large buffer
+        output = io.open(sys.stdout.fileno(), "w", buffering=1 << 16, encoding="utf-8", closefd=False)
+        engine = CaptureEngine(bus, output, id_filter=args.filter, show_ascii=args.show_ascii,
+                               decode_t6=args.decode_t6, count=args.count, ring_capacity=args.ring_size,
+                               recorder=recorder, text=not args.quiet)
+        engine.start()
+        try:
+            while not engine.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            print(f"\n🛑 Interrupted by user")
+        stats = engine.stop()
+        if engine.error:
+            print(f"❌ Error receiving message: {engine.error}")
+
     except Exception as e:
         print(f"❌ Failed to connect: {e}")
         return 1
-    
+
     finally:
         try:
-            bus.shutdown()
-            print(f"\n📊 Total messages received: {message_count}")
-            
+            if bus is not None:
+                bus.shutdown()
+            if recorder is not None:
+                recorder.close()
+            if stats is not None:
+                print(f"\n📊 Total messages received: {stats.received}")
+                if stats.overruns:
+                    print(f"⚠️  {stats.overruns} messages dropped (capture buffer full)")
+                if recorder is not None:
+                    print(f"💾 {recorder.frames} frames written to {args.write} (index: {args.write}.idx)")
+
             if args.summary:
                 print("\n💡 Message Analysis:")
                 print("   • ID 0x001-0x00F: Typically heartbeat/status messages")
-                print("   • ID 0x1A0: VW T6 Speed (if data[2:3] ≠ 00)")  
+                print("   • ID 0x1A0: VW T6 Speed (if data[2:3] ≠ 00)")
                 print("   • ID 0x440: VW T6 Gear (if data[1] = 80/77/60/50)")
                 print("   • Small DLC (1-4): Usually status/command messages")
                 print("   • All zeros: Device present but no active data")
-                
+
             print("🔌 Disconnected")
         except:
             pass
-    
+
     return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Driving Profile Player
+
+Replays a recorded speed/gear timeline into the ESP32 CAN simulator. Each
+point is scheduled against an absolute monotonic deadline (start + t), so
+sleep overshoot never accumulates into drift, and the achieved timing is
+reported as jitter (actual send time - deadline) and commands per second.
+
+Timelines can be loaded from:
+- CSV with a header: t (or time), speed, gear (gear optional)
+- JSON: a list of {"t": ..., "speed": ..., "gear": ...} objects, or
+  {"points": [...]}
+- NumPy: .npy/.npz arrays with columns t, speed[, gear] (gear as an index
+  into PARK/REVERSE/NEUTRAL/DRIVE) or a structured array with those fields
+- Parquet (requires pandas with a Parquet engine)
+
+By default points are sent as fire-and-forget setpoints (see
+ESP32Controller.send_setpoint), which sustains 50-100 Hz; mode="command"
+uses apply_state() round trips instead.
+
+Usage:
+    player = ProfilePlayer(controller)
+    stats = player.play(load_profile("highway.csv"))
+    print(stats.summary())
+
+    python3 profile_player.py highway.csv --port /dev/ttyACM0
+    python3 profile_player.py --ramp 10 --rate 100 --emulator    # No hardware needed
+"""
+
+import csv
+import sys
+import json
+import time
+import argparse
+import statistics
+from dataclasses import dataclass
+from typing import Optional, List, Any, Callable, Sequence
+
+from esp32_controller import ESP32Controller, SetpointStats
+
+GEARS = ["PARK", "REVERSE", "NEUTRAL", "DRIVE"]
+
+@dataclass
+class ProfilePoint:
+    """One timeline entry; None leaves the value unchanged"""
+    t: float
+    speed: Optional[int] = None
+    gear: Optional[str] = None
+
+@dataclass
+class PlaybackStats:
+    """Timing accuracy of one playback"""
+    commands: int
+    failures: int
+    duration: float
+    jitter_mean_ms: float
+    jitter_p50_ms: float
+    jitter_p99_ms: float
+    jitter_max_ms: float
+    setpoints: Optional[SetpointStats] = None
+
+    @property
+    def commands_per_second(self) -> float:
+        return self.commands / self.duration if self.duration > 0 else 0.0
+
+    def summary(self) -> str:
+        lines = [
+            f"Commands:    {self.commands} ({self.failures} failed)",
+            f"Duration:    {self.duration:.3f} s",
+            f"Rate:        {self.commands_per_second:.1f} commands/s",
+            f"Jitter:      mean {self.jitter_mean_ms:.3f} ms, p50 {self.jitter_p50_ms:.3f} ms, "
+            f"p99 {self.jitter_p99_ms:.3f} ms, max {self.jitter_max_ms:.3f} ms",
+        ]
+        if self.setpoints is not None:
+            lines.append(f"Setpoints:   {self.setpoints.received} received, {self.setpoints.lost} lost")
+        return "\n".join(lines)
+
+# === Loading ===
+
+def _gear_value(value: Any) -> Optional[str]:
+    """Gear name from a name or a GEARS index; empty/NaN means unchanged"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        name = value.strip().upper()
+        if not name:
+            return None
+        if name.lstrip('-').isdigit():
+            value = int(name)
+        elif name in GEARS:
+            return name
+        else:
+            raise ValueError(f"Unknown gear '{value}'")
+    value = float(value)
+    if value != value:  # NaN
+        return None
+    index = int(value)
+    if not 0 <= index < len(GEARS):
+        raise ValueError(f"Gear index {index} out of range")
+    return GEARS[index]
+
+def _speed_value(value: Any) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    value = float(value)
+    if value != value:  # NaN
+        return None
+    return int(round(value))
+
+def _point_from_mapping(row: Any) -> ProfilePoint:
+    t = row.get("t", row.get("time"))
+    if t is None:
+        raise ValueError(f"Profile row without 't': {row}")
+    return ProfilePoint(float(t), _speed_value(row.get("speed")), _gear_value(row.get("gear")))
+
+def profile_from_rows(rows: Any) -> List[ProfilePoint]:
+    """
+    Build a profile from (t, speed[, gear]) rows, mappings or a NumPy array
+    (plain 2-D or structured with t/speed/gear fields). Sorted by t.
+    """
+    names = getattr(getattr(rows, "dtype", None), "names", None)
+    if names:
+        # Structured NumPy array
+        rows = [{name: record[name] for name in names} for record in rows]
+
+    points = []
+    for row in rows:
+        if isinstance(row, ProfilePoint):
+            points.append(row)
+        elif isinstance(row, dict):
+            points.append(_point_from_mapping(row))
+        else:
+            values = list(row)
+            if len(values) < 2:
+                raise ValueError(f"Profile row needs at least t and speed: {values}")
+            gear = _gear_value(values[2]) if len(values) > 2 else None
+            points.append(ProfilePoint(float(values[0]), _speed_value(values[1]), gear))
+    points.sort(key=lambda p: p.t)
+    return points
+
+def load_profile(path: str) -> List[ProfilePoint]:
+    """Load a timeline from a .csv, .json, .npy, .npz or .parquet file"""
+    lower = path.lower()
+    if lower.endswith(".csv"):
+        with open(path, newline="") as f:
+            return profile_from_rows(csv.DictReader(f))
+
+    if lower.endswith(".json"):
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("points", [])
+        return profile_from_rows(data)
+
+    if lower.endswith((".npy", ".npz")):
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("Loading NumPy profiles requires numpy: pip3 install numpy")
+        data = np.load(path)
+        if lower.endswith(".npz"):
+            data = data[data.files[0]]
+        return profile_from_rows(data)
+
+    if lower.endswith(".parquet"):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("Loading Parquet profiles requires pandas and pyarrow: pip3 install pandas pyarrow")
+        return profile_from_rows(pd.read_parquet(path).to_dict("records"))
+
+    raise ValueError(f"Unsupported profile format: {path}")
+
+def ramp_profile(duration: float, rate_hz: float, max_speed: int = 120, gear: str = "DRIVE") -> List[ProfilePoint]:
+    """Synthetic 0 -> max_speed -> 0 triangle, useful for smoke tests"""
+    count = max(2, int(duration * rate_hz))
+    points = []
+    for i in range(count):
+        t = i / rate_hz
+        phase = t / duration
+        speed = max_speed * (1.0 - abs(2.0 * phase - 1.0))
+        points.append(ProfilePoint(t, int(round(speed)), gear))
+    return points
+
+# === Playback ===
+
+def _percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+class ProfilePlayer:
+    """Schedules a profile against a monotonic clock and measures timing accuracy"""
+
+    MODES = ("setpoint", "command")
+
+    def __init__(self, controller: ESP32Controller, mode: str = "setpoint",
+                 spin_threshold: float = 0.001,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {self.MODES}")
+        self.controller = controller
+        self.mode = mode
+        # Sleep until this close to the deadline, then spin for the rest
+        self.spin_threshold = spin_threshold
+        self.clock = clock
+        self.sleep = sleep
+        self._stop = False
+
+    def stop(self):
+        """Stop a running play() after the current point"""
+        self._stop = True
+
+    def _wait_until(self, deadline: float) -> float:
+        """Wait for an absolute deadline and return the time actually reached"""
+        while True:
+            now = self.clock()
+            remaining = deadline - now
+            if remaining <= 0:
+                return now
+            if remaining > self.spin_threshold:
+                self.sleep(remaining - self.spin_threshold)
+
+    def _send(self, point: ProfilePoint) -> bool:
+        if self.mode == "setpoint":
+            return self.controller.send_setpoint(speed=point.speed, gear=point.gear) is not None
+        return self.controller.apply_state(gear=point.gear, speed=point.speed)
+
+    def play(self, profile: Sequence[ProfilePoint], speedup: float = 1.0) -> PlaybackStats:
+        """
+        Replay a profile; t values are seconds relative to the first point.
+
+        Deadlines are absolute (start + t / speedup): a late point is sent
+        immediately and the following points keep their original schedule.
+        """
+        if not profile:
+            raise ValueError("Empty profile")
+        if speedup <= 0:
+            raise ValueError("speedup must be positive")
+
+        self._stop = False
+        if self.mode == "setpoint":
+            self.controller.start_setpoint_stream()
+
+        t0 = profile[0].t
+        lateness: List[float] = []
+        failures = 0
+        start = self.clock()
+
+        for point in profile:
+            if self._stop:
+                break
+            deadline = start + (point.t - t0) / speedup
+            sent_at = self._wait_until(deadline)
+            lateness.append(sent_at - deadline)
+            if not self._send(point):
+                failures += 1
+
+        duration = self.clock() - start
+
+        setpoints = None
+        if self.mode == "setpoint":
+            # Ask for a final ack so losses at the end of the stream are counted too
+            setpoints = self.controller.flush_setpoints()
+
+        jitter_ms = [late * 1000.0 for late in lateness]
+        return PlaybackStats(
+            commands=len(lateness),
+            failures=failures,
+            duration=duration,
+            jitter_mean_ms=statistics.mean(jitter_ms),
+            jitter_p50_ms=_percentile(jitter_ms, 50),
+            jitter_p99_ms=_percentile(jitter_ms, 99),
+            jitter_max_ms=max(jitter_ms),
+            setpoints=setpoints,
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a speed/gear profile into the ESP32 simulator")
+    parser.add_argument("profile", nargs="?", help="Profile file (.csv, .json, .npy, .npz, .parquet)")
+    parser.add_argument("--port", default="/dev/ttyACM0", help="Serial port (default: /dev/ttyACM0)")
+    parser.add_argument("--emulator", action="store_true", help="Play against the pty ESP32 emulator")
+    parser.add_argument("--mode", choices=ProfilePlayer.MODES, default="setpoint",
+                        help="setpoint (fire-and-forget, default) or command (apply_state round trips)")
+    parser.add_argument("--protocol", choices=["json", "binary"], default="json", help="Wire protocol (default: json)")
+    parser.add_argument("--speedup", type=float, default=1.0, help="Playback speed factor (default: 1.0)")
+    parser.add_argument("--ramp", type=float, metavar="SECONDS", help="Play a synthetic 0-120-0 km/h ramp instead of a file")
+    parser.add_argument("--rate", type=float, default=50.0, help="Ramp points per second (default: 50)")
+    args = parser.parse_args()
+
+    if args.ramp:
+        profile = ramp_profile(args.ramp, args.rate)
+    elif args.profile:
+        profile = load_profile(args.profile)
+    else:
+        parser.error("a profile file or --ramp is required")
+
+    print("🏁 Driving Profile Player")
+    print("=" * 50)
+    print(f"Points: {len(profile)}, length {profile[-1].t - profile[0].t:.2f} s, mode {args.mode}")
+
+    emulator = None
+    port = args.port
+    if args.emulator:
+        from esp32_emulator import ESP32Emulator
+        emulator = ESP32Emulator(log_commands=False)
+        emulator.start()
+        port = emulator.port
+
+    controller = ESP32Controller(port, protocol=args.protocol)
+    try:
+        connected = controller.connect()
+        stats = ProfilePlayer(controller, mode=args.mode).play(profile, args.speedup) if connected else None
+        if stats is None:
+            print(f"❌ Failed to connect to {port}")
+            return 1
+        print(stats.summary())
+        return 0 if stats.failures == 0 else 1
+    finally:
+        controller.disconnect()
+        if emulator:
+            emulator.stop()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Vehicle signal database
+
+One JSON file per vehicle in signals/ describes where its speed and gear
+signals live (DBC style: message ID, start byte, length, byte order,
+factor, enum values). It is the single source for:
+
+- the host decoders (pcan_reader, decode_vwt7_messages, capture_decode,
+  test_t6_parser_verification), which use the extraction closures and
+  decode tables compiled here
+- the host encoders in message_generators.py
+- the firmware encoders: main/CMakeLists.txt runs this script at build time
+  to generate VehicleSignals.h, which VWT6/VWT7MessageGenerator.cpp call
+
+Adding a vehicle with the same two signals means writing its JSON file,
+plus a thin generator class and factory entry in main/ for its button.
+
+Signal file:
+
+    {
+        "vehicle": "VWT6",                  Host name (binary_protocol.VEHICLE_IDS)
+        "name": "VW T6",                    getVehicleName()
+        "button": "VW_T6",                  button_id_t in main/common.h
+        "aliases": {"VWT61": "VW_T61"},     Vehicles using the same protocol
+        "bitrate": 500000,
+        "dlc": 8,
+        "signals": {
+            "speed": {"message_id": "0x1A0", "start_byte": 2, "length": 2,
+                      "byte_order": "little", "factor": 0.005, "unit": "km/h"},
+            "gear": {"message_id": "0x440", "start_byte": 1, "length": 1,
+                     "values": {"PARK": "0x80", ...}, "default": "PARK"}
+        }
+    }
+
+Usage:
+    t6 = get_vehicle_signals("VWT6")
+    t6.speed.decode(data)                   # km/h, None if data is too short
+    t6.gear.decode(data)                    # "DRIVE", "UNKNOWN(0x12)", None
+
+    python3 signal_db.py                    # List the vehicles
+    python3 signal_db.py --header -         # Print the generated C++ header
+"""
+
+import os
+import sys
+import json
+import argparse
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Tuple, Callable, Any
+
+SIGNALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "signals")
+
+# enum class Gear in main/BaseMessageGenerator.h
+GEARS = ("PARK", "REVERSE", "NEUTRAL", "DRIVE")
+
+_RAW_TYPES = {1: "uint8_t", 2: "uint16_t", 3: "uint32_t", 4: "uint32_t"}
+
+def _unknown(raw: int) -> str:
+    return f"UNKNOWN(0x{raw:02X})"
+
+@dataclass
+class Signal:
+    """One unsigned signal: raw = bytes [start_byte, start_byte + length), physical = raw * factor"""
+    name: str
+    message_id: int
+    start_byte: int
+    length: int = 1
+    byte_order: str = "little"
+    factor: float = 1.0
+    unit: str = ""
+    values: Dict[str, int] = field(default_factory=dict)   # Enum name -> raw value
+    default: Optional[str] = None
+
+    # Compiled from the above by __post_init__
+    min_length: int = field(init=False, repr=False)
+    names: Dict[int, str] = field(init=False, repr=False)
+    extract: Callable[[Any], Optional[int]] = field(init=False, repr=False)
+    decode: Callable[[Any], Any] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.length not in _RAW_TYPES:
+            raise ValueError(f"{self.name}: length must be 1-4 bytes, not {self.length}")
+        if self.byte_order not in ("little", "big"):
+            raise ValueError(f"{self.name}: byte_order must be 'little' or 'big'")
+        if self.values and self.default not in self.values:
+            raise ValueError(f"{self.name}: default {self.default!r} is not one of its values")
+        self.min_length = self.start_byte + self.length
+        self.names = {raw: name for name, raw in self.values.items()}
+        self.extract = self._compile_extract()
+        self.decode = self._compile_decode()
+
+    @property
+    def is_enum(self) -> bool:
+        return bool(self.values)
+
+    def _compile_extract(self) -> Callable[[Any], Optional[int]]:
+        """Raw value from a payload, None if it is too short"""
+        start, end = self.start_byte, self.min_length
+        if self.length == 1:
+            def extract(data):
+                return data[start] if len(data) >= end else None
+        elif self.length == 2:
+            low, high = (start, start + 1) if self.byte_order == "little" else (start + 1, start)
+            def extract(data):
+                return data[low] | data[high] << 8 if len(data) >= end else None
+        else:
+            byte_order = self.byte_order
+            def extract(data):
+                return int.from_bytes(bytes(data[start:end]), byte_order) if len(data) >= end else None
+        return extract
+
+    def _compile_decode(self) -> Callable[[Any], Any]:
+        """Physical value (or enum name) from a payload, None if it is too short"""
+        extract = self.extract
+        if self.is_enum:
+            if self.length == 1:
+                table = tuple(self.names.get(raw, _unknown(raw)) for raw in range(256))
+                def decode(data):
+                    raw = extract(data)
+                    return None if raw is None else table[raw]
+            else:
+                names = self.names
+                def decode(data):
+                    raw = extract(data)
+                    return None if raw is None else names.get(raw, _unknown(raw))
+        else:
+            factor = self.factor
+            def decode(data):
+                raw = extract(data)
+                return None if raw is None else raw * factor
+        return decode
+
+    def name_of(self, raw: int) -> str:
+        """Enum name of a raw value, UNKNOWN(0xNN) if it has none"""
+        return self.names.get(raw, _unknown(raw))
+
+    def pack(self, data: bytearray, raw: int):
+        """Write a raw value into a payload"""
+        raw &= (1 << 8 * self.length) - 1
+        data[self.start_byte:self.min_length] = raw.to_bytes(self.length, self.byte_order)
+
+    def byte_shifts(self) -> List[Tuple[int, int]]:
+        """(byte index, right shift of the raw value) for every byte of the signal"""
+        shifts = [8 * i for i in range(self.length)]
+        if self.byte_order == "big":
+            shifts.reverse()
+        return [(self.start_byte + i, shift) for i, shift in enumerate(shifts)]
+
+@dataclass
+class VehicleSignals:
+    """Speed and gear signals of one vehicle (one file in signals/)"""
+    vehicle: str
+    name: str
+    button: str
+    bitrate: int
+    dlc: int
+    speed: Signal
+    gear: Signal
+    aliases: Dict[str, str] = field(default_factory=dict)   # Host name -> button_id_t
+    path: str = ""
+
+    def message_ids(self) -> List[int]:
+        """[gear_id, speed_id], in the order the firmware sends them"""
+        return [self.gear.message_id, self.speed.message_id]
+
+def _int(value) -> int:
+    return int(value, 0) if isinstance(value, str) else int(value)
+
+def _signal(name: str, spec: Dict[str, Any]) -> Signal:
+    return Signal(name=name,
+                  message_id=_int(spec["message_id"]),
+                  start_byte=int(spec["start_byte"]),
+                  length=int(spec.get("length", 1)),
+                  byte_order=spec.get("byte_order", "little"),
+                  factor=float(spec.get("factor", 1.0)),
+                  unit=spec.get("unit", ""),
+                  values={key: _int(raw) for key, raw in spec.get("values", {}).items()},
+                  default=spec.get("default"))
+
+def load_vehicle(path: str) -> VehicleSignals:
+    """Parse and check one signal file; ValueError if it is inconsistent"""
+    with open(path) as f:
+        spec = json.load(f)
+    try:
+        signals = spec["signals"]
+        vehicle = VehicleSignals(vehicle=spec["vehicle"], name=spec["name"], button=spec["button"],
+                                 bitrate=int(spec["bitrate"]), dlc=int(spec.get("dlc", 8)),
+                                 speed=_signal("speed", signals["speed"]), gear=_signal("gear", signals["gear"]),
+                                 aliases=dict(spec.get("aliases", {})), path=path)
+    except KeyError as e:
+        raise ValueError(f"{path}: missing {e}") from None
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+
+    for signal in (vehicle.speed, vehicle.gear):
+        if signal.min_length > vehicle.dlc:
+            raise ValueError(f"{path}: {signal.name} does not fit in {vehicle.dlc} bytes")
+    if vehicle.speed.is_enum or vehicle.speed.factor <= 0:
+        raise ValueError(f"{path}: speed needs a positive factor and no values")
+    if sorted(vehicle.gear.values) != sorted(GEARS):
+        raise ValueError(f"{path}: gear values must cover exactly {', '.join(GEARS)}")
+    return vehicle
+
+def load_vehicles(directory: str = SIGNALS_DIR) -> Dict[str, VehicleSignals]:
+    """Every vehicle in a signal directory, keyed by host name (aliases included)"""
+    vehicles: Dict[str, VehicleSignals] = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        vehicle = load_vehicle(os.path.join(directory, filename))
+        for key in [vehicle.vehicle] + list(vehicle.aliases):
+            if key in vehicles:
+                raise ValueError(f"{vehicle.path}: {key} is already defined in {vehicles[key].path}")
+            vehicles[key] = vehicle
+    return vehicles
+
+_vehicles: Optional[Dict[str, VehicleSignals]] = None
+
+def vehicle_signals() -> Dict[str, VehicleSignals]:
+    """The signals/ database, loaded once"""
+    global _vehicles
+    if _vehicles is None:
+        _vehicles = load_vehicles()
+    return _vehicles
+
+def get_vehicle_signals(vehicle: str) -> Optional[VehicleSignals]:
+    """Signals of a vehicle (or alias), None if there is no definition"""
+    return vehicle_signals().get(vehicle)
+
+# === C++ encoders ===
+
+def _cpp_float(value: float) -> str:
+    text = repr(float(value))
+    return (text if "e" in text or "." in text else text + ".0") + "f"
+
+def _cpp_pack(signal: Signal) -> List[str]:
+    lines = []
+    for index, shift in signal.byte_shifts():
+        value = "raw & 0xFF" if shift == 0 else f"(raw >> {shift}) & 0xFF"
+        lines.append(f"        data[{index}] = {value};")
+    return lines
+
+def _cpp_vehicle(vehicle: VehicleSignals) -> List[str]:
+    speed, gear = vehicle.speed, vehicle.gear
+    speed_type, gear_type = _RAW_TYPES[speed.length], _RAW_TYPES[gear.length]
+    name = vehicle.vehicle
+    lines = [
+        f"/** {vehicle.name} ({os.path.relpath(vehicle.path, os.path.dirname(SIGNALS_DIR))}) */",
+        f"struct {name} {{",
+        f"    static constexpr const char* NAME = \"{vehicle.name}\";",
+        f"    static constexpr button_id_t VEHICLE_TYPE = {vehicle.button};",
+        f"    static constexpr uint32_t CAN_BAUDRATE = {vehicle.bitrate};",
+        f"    static constexpr uint8_t DLC = {vehicle.dlc};",
+        f"    static constexpr uint32_t SPEED_MSG_ID = 0x{speed.message_id:03X};",
+        f"    static constexpr uint32_t GEAR_MSG_ID = 0x{gear.message_id:03X};",
+        f"    static constexpr float SPEED_FACTOR = {_cpp_float(speed.factor)};",
+        "",
+        f"    /** Speed: bytes {speed.start_byte}-{speed.min_length - 1} ({speed.byte_order} endian), "
+        f"{speed.factor:g} {speed.unit} per bit; returns the raw value */",
+        f"    static inline {speed_type} encodeSpeed(uint8_t speed_kmh, uint8_t* data, uint8_t& dlc) {{",
+        "        dlc = DLC;",
+        "        memset(data, 0, DLC);",
+        f"        {speed_type} raw = static_cast<{speed_type}>(speed_kmh / SPEED_FACTOR);",
+        *_cpp_pack(speed),
+        "        return raw;",
+        "    }",
+        "",
+        f"    /** Gear: byte {gear.start_byte}; returns the raw value */",
+        f"    static inline {gear_type} encodeGear(Gear gear, uint8_t* data, uint8_t& dlc) {{",
+        "        dlc = DLC;",
+        "        memset(data, 0, DLC);",
+        f"        {gear_type} raw;",
+        "        switch (gear) {",
+    ]
+    for gear_name in GEARS:
+        lines.append(f"            case Gear::{gear_name}: raw = 0x{gear.values[gear_name]:02X}; break;")
+    lines += [
+        f"            default: raw = 0x{gear.values[gear.default]:02X}; break;  // {gear.default}",
+        "        }",
+        *_cpp_pack(gear),
+        "        return raw;",
+        "    }",
+        "};",
+    ]
+    return lines
+
+def generate_cpp_header(vehicles: Dict[str, VehicleSignals]) -> str:
+    """VehicleSignals.h: one struct of constants and encoders per vehicle"""
+    lines = [
+        "// Generated by signal_db.py from signals/*.json - do not edit",
+        "#ifndef VEHICLE_SIGNALS_H",
+        "#define VEHICLE_SIGNALS_H",
+        "",
+        "#include <cstdint>",
+        "#include <cstring>",
+        "#include \"BaseMessageGenerator.h\"",
+        "",
+        "namespace vehicle_signals {",
+        "",
+    ]
+    seen = set()
+    for vehicle in vehicles.values():
+        if vehicle.vehicle in seen:
+            continue  # Alias
+        seen.add(vehicle.vehicle)
+        lines += _cpp_vehicle(vehicle) + [""]
+    lines += ["}  // namespace vehicle_signals", "", "#endif // VEHICLE_SIGNALS_H", ""]
+    return "\n".join(lines)
+
+def write_if_changed(path: str, text: str) -> bool:
+    """Write text unless the file already holds it (keeps the build from recompiling)"""
+    try:
+        with open(path) as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Vehicle signal database (signals/*.json)")
+    parser.add_argument("--signals", default=SIGNALS_DIR, help="Signal directory (default: signals/)")
+    parser.add_argument("--header", metavar="FILE", help="Generate the C++ header (- for stdout)")
+    args = parser.parse_args()
+
+    try:
+        vehicles = load_vehicles(args.signals)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    if args.header:
+        header = generate_cpp_header(vehicles)
+        if args.header == "-":
+            sys.stdout.write(header)
+        elif write_if_changed(args.header, header):
+            print(f"🔧 Generated {args.header}")
+        return 0
+
+    for key, vehicle in vehicles.items():
+        speed, gear = vehicle.speed, vehicle.gear
+        alias = f" (alias of {vehicle.vehicle})" if key != vehicle.vehicle else ""
+        print(f"🚗 {key}{alias}: {vehicle.name}, {vehicle.bitrate} bit/s")
+        print(f"   speed 0x{speed.message_id:03X} bytes {speed.start_byte}-{speed.min_length - 1} "
+              f"x {speed.factor:g} {speed.unit}")
+        print(f"   gear  0x{gear.message_id:03X} byte {gear.start_byte}: "
+              + ", ".join(f"{name}=0x{raw:02X}" for name, raw in gear.values.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
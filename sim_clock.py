@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Clocks for accelerated-time scenarios
+
+Everything in the host stack that measures or waits on time - the ESP32
+emulator's TWAI task and uptime, ESP32Controller's response, ready and
+reconnect timeouts, the CAN monitors - can take a clock instead of calling
+the time module directly:
+
+    Clock          real time (the default)
+    VirtualClock   simulated time running speedup times faster than real time
+
+A VirtualClock starts at 0 s (monotonic) and at the real epoch time when it
+was created (time); sleeps and timeouts given in simulated seconds are
+divided by the speedup. Real I/O latency is not scaled, so a 0.2 ms pty
+round trip costs 0.2 ms * speedup of simulated time: pick a speedup that
+leaves the protocol timeouts enough real time.
+
+Usage:
+    clock = VirtualClock(speedup=600)                  # 1 simulated hour in 6 s
+    emulator = ESP32Emulator(can_channel="soak", clock=clock)
+    controller = ESP32Controller(emulator.port, clock=clock)
+    player = ProfilePlayer(controller, clock=clock.monotonic, sleep=clock.sleep)
+    ...
+    print(f"{clock.elapsed():.0f} simulated s in {clock.real_elapsed():.1f} s")
+"""
+
+import time
+import threading
+from typing import Optional
+
+class Clock:
+    """Real time; the interface shared by all clocks"""
+
+    virtual = False
+    speedup = 1.0
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def to_real(self, seconds: Optional[float]) -> Optional[float]:
+        """Real seconds corresponding to a duration on this clock (None stays None)"""
+        return seconds
+
+    def wait(self, event: threading.Event, timeout: Optional[float] = None) -> bool:
+        """event.wait() with the timeout in this clock's seconds"""
+        return event.wait(self.to_real(timeout))
+
+class VirtualClock(Clock):
+    """Simulated time advancing speedup times faster than real time"""
+
+    virtual = True
+
+    def __init__(self, speedup: float = 100.0, start_time: Optional[float] = None):
+        if speedup <= 0:
+            raise ValueError("speedup must be positive")
+        self.speedup = float(speedup)
+        self._real_origin = time.perf_counter()
+        self._epoch_origin = time.time() if start_time is None else start_time
+
+    def monotonic(self) -> float:
+        return (time.perf_counter() - self._real_origin) * self.speedup
+
+    def time(self) -> float:
+        return self._epoch_origin + self.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds / self.speedup)
+
+    def to_real(self, seconds: Optional[float]) -> Optional[float]:
+        return None if seconds is None else seconds / self.speedup
+
+    def elapsed(self) -> float:
+        """Simulated seconds since the clock was created"""
+        return self.monotonic()
+
+    def real_elapsed(self) -> float:
+        """Real seconds since the clock was created"""
+        return time.perf_counter() - self._real_origin
+
+# Shared default for every clock= parameter
+WALL_CLOCK = Clock()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+ESP32 Simulator Fleet
+
+Controls many ESP32 CAN simulators at once. Candidate serial ports are
+discovered by USB vendor ID (or given explicitly), all boards are connected
+in parallel - so bringing up a rack costs one readiness handshake instead of one per
+board - and commands are broadcast (same call everywhere) or scattered
+(different arguments per board) over a bounded thread pool.
+
+Every operation returns a DeviceResult per port with the return value, the
+latency of the call and the error, if any; one dead board never fails the
+whole fleet.
+
+Usage:
+    with SimulatorFleet() as fleet:                     # Discover and connect
+        fleet.broadcast("set_vehicle", "VWT7")
+        fleet.scatter("set_speed", {"/dev/ttyACM0": {"speed": 50},
+                                    "/dev/ttyACM1": {"speed": 80}})
+        results = fleet.broadcast("ping")
+        print(summarize(results))
+
+    python3 simulator_fleet.py                          # Ping every discovered board
+    python3 simulator_fleet.py --emulators 20           # Same against pty emulators
+"""
+
+import sys
+import time
+import glob
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Callable, Union
+
+from esp32_controller import ESP32Controller
+
+# USB-serial bridges found on ESP32 dev boards (vendor ID -> name)
+ESP32_USB_VENDORS = {
+    0x303A: "Espressif USB-Serial/JTAG",
+    0x10C4: "Silicon Labs CP210x",
+    0x1A86: "WCH CH340/CH343",
+    0x0403: "FTDI",
+}
+
+# Fallback when port metadata is unavailable
+DEFAULT_PORT_PATTERNS = ["/dev/ttyACM*", "/dev/ttyUSB*"]
+
+@dataclass
+class DeviceResult:
+    """Outcome of one operation on one board"""
+    port: str
+    ok: bool
+    value: Any = None
+    latency: float = 0.0          # Seconds spent in the call
+    error: Optional[str] = None
+
+def discover_ports(patterns: Optional[List[str]] = None) -> List[str]:
+    """
+    Serial ports that look like ESP32 boards, sorted.
+
+    Uses the USB vendor IDs in ESP32_USB_VENDORS; when pyserial reports no
+    matching ports, falls back to the device name patterns.
+    """
+    ports = []
+    try:
+        from serial.tools import list_ports
+        ports = [info.device for info in list_ports.comports() if info.vid in ESP32_USB_VENDORS]
+    except ImportError:
+        pass
+    if not ports:
+        for pattern in patterns or DEFAULT_PORT_PATTERNS:
+            ports.extend(glob.glob(pattern))
+    return sorted(set(ports))
+
+def summarize(results: Dict[str, DeviceResult]) -> str:
+    """One line per board plus a latency summary"""
+    lines = []
+    for port, result in sorted(results.items()):
+        mark = "✅" if result.ok else "❌"
+        detail = f"{result.latency * 1000:8.1f} ms"
+        if result.error:
+            detail += f"  {result.error}"
+        lines.append(f"{mark} {port:24} {detail}")
+    latencies = sorted(r.latency for r in results.values() if r.ok)
+    ok = len(latencies)
+    lines.append(f"{ok}/{len(results)} ok")
+    if latencies:
+        lines[-1] += (f", latency min {latencies[0] * 1000:.1f} ms, "
+                      f"median {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+                      f"max {latencies[-1] * 1000:.1f} ms")
+    return "\n".join(lines)
+
+class SimulatorFleet:
+    """A set of ESP32Controllers operated concurrently"""
+
+    def __init__(self, ports: Optional[List[str]] = None, max_workers: int = 32,
+                 controller_factory: Callable[..., ESP32Controller] = ESP32Controller,
+                 **controller_kwargs):
+        self.ports = list(ports) if ports is not None else None
+        self.max_workers = max_workers
+        self.controller_factory = controller_factory
+        self.controller_kwargs = controller_kwargs
+        self.controllers: Dict[str, ESP32Controller] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.controllers)
+
+    def __getitem__(self, port: str) -> ESP32Controller:
+        return self.controllers[port]
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="fleet")
+        return self._executor
+
+    def _run(self, calls: Dict[str, Callable[[], Any]]) -> Dict[str, DeviceResult]:
+        """Run one callable per port on the pool and time each"""
+        def timed(port: str, call: Callable[[], Any]) -> DeviceResult:
+            start = time.perf_counter()
+            try:
+                value = call()
+            except Exception as e:
+                return DeviceResult(port, False, None, time.perf_counter() - start, str(e))
+            latency = time.perf_counter() - start
+            # Controller methods report failure as False/None
+            ok = value is not None and value is not False
+            return DeviceResult(port, ok, value, latency, None if ok else "no response")
+
+        futures = {port: self._pool().submit(timed, port, call) for port, call in calls.items()}
+        return {port: future.result() for port, future in futures.items()}
+
+    def connect(self) -> Dict[str, DeviceResult]:
+        """Connect to every port in parallel; failed boards are left out of the fleet"""
+        if self.ports is None:
+            self.ports = discover_ports()
+
+        def connect_one(port: str) -> Callable[[], bool]:
+            def call() -> bool:
+                controller = self.controller_factory(port, **self.controller_kwargs)
+                if not controller.connect():
+                    raise ConnectionError("connect failed")
+                with self._lock:
+                    self.controllers[port] = controller
+                return True
+            return call
+
+        return self._run({port: connect_one(port) for port in self.ports
+                          if port not in self.controllers})
+
+    def disconnect(self):
+        """Disconnect every board and stop the worker pool"""
+        with self._lock:
+            controllers = list(self.controllers.values())
+            self.controllers.clear()
+        if controllers:
+            list(self._pool().map(lambda c: c.disconnect(), controllers))
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _bind(self, controller: ESP32Controller, method: Union[str, Callable], args, kwargs) -> Callable[[], Any]:
+        if callable(method):
+            return lambda: method(controller, *args, **kwargs)
+        bound = getattr(controller, method)
+        return lambda: bound(*args, **kwargs)
+
+    def broadcast(self, method: Union[str, Callable], *args,
+                  ports: Optional[List[str]] = None, **kwargs) -> Dict[str, DeviceResult]:
+        """
+        Call the same controller method (name, or callable taking the
+        controller) with the same arguments on every board, or only on ports.
+        """
+        targets = self.controllers if ports is None else {p: self.controllers[p] for p in ports}
+        return self._run({port: self._bind(controller, method, args, kwargs)
+                          for port, controller in targets.items()})
+
+    def scatter(self, method: Union[str, Callable],
+                arguments: Dict[str, Dict[str, Any]]) -> Dict[str, DeviceResult]:
+        """Call a controller method with per-board keyword arguments ({port: kwargs})"""
+        return self._run({port: self._bind(self.controllers[port], method, (), kwargs)
+                          for port, kwargs in arguments.items()})
+
+    def __enter__(self):
+        self.connect()
+        if not self.controllers:
+            self.disconnect()
+            raise ConnectionError("No ESP32 simulators connected")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser(description="Connect to and ping a fleet of ESP32 simulators")
+    parser.add_argument("--ports", nargs="+", help="Serial ports (default: discover)")
+    parser.add_argument("--emulators", type=int, default=0, help="Use this many pty emulators instead")
+    parser.add_argument("--workers", type=int, default=32, help="Max concurrent operations (default: 32)")
+    parser.add_argument("--pings", type=int, default=10, help="Broadcast pings after connecting (default: 10)")
+    args = parser.parse_args()
+
+    print("🚗 ESP32 Simulator Fleet")
+    print("=" * 50)
+
+    emulators = []
+    ports = args.ports
+    if args.emulators:
+        from esp32_emulator import ESP32Emulator
+        emulators = [ESP32Emulator(log_commands=False) for _ in range(args.emulators)]
+        for emulator in emulators:
+            emulator.start()
+        ports = [emulator.port for emulator in emulators]
+
+    fleet = SimulatorFleet(ports, max_workers=args.workers)
+    try:
+        start = time.perf_counter()
+        results = fleet.connect()
+        print(f"\n🔌 Connect ({time.perf_counter() - start:.2f} s total)")
+        print(summarize(results))
+        if not len(fleet):
+            print("❌ No simulators connected")
+            return 1
+
+        for i in range(args.pings):
+            results = fleet.broadcast("ping")
+        print(f"\n🏓 Ping (last of {args.pings})")
+        print(summarize(results))
+        return 0 if all(r.ok for r in results.values()) else 1
+    finally:
+        fleet.disconnect()
+        for emulator in emulators:
+            emulator.stop()
+
+if __name__ == "__main__":
+    sys.exit(main())
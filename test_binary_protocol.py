@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Binary Protocol Tests
+
+Checks the framing layer of binary_protocol.py without hardware: COBS,
+the CRC, field encoding and BinaryFramer's resynchronisation.
+
+Usage:
+    python3 -m pytest test_binary_protocol.py
+"""
+
+import pytest
+
+from binary_protocol import (BinaryFramer, ProtocolError, cobs_encode, cobs_decode, crc16_ccitt,
+                             decode_frame, encode_command, encode_message)
+
+COBS_CASES = [
+    b"",
+    b"\x00",
+    b"\x00\x00\x00",
+    b"\x11\x00\x00\x22",
+    b"\x11\x22\x00\x33",
+    bytes(range(1, 255)),                 # Exactly one full 254-byte block
+    bytes(range(1, 255)) + b"\x00",
+    bytes(range(1, 256)),                 # One byte past a full block
+    bytes(range(256)) * 3,
+    b"\x01" * 254 + b"\x00" + b"\x02" * 254,
+]
+
+@pytest.mark.parametrize("data", COBS_CASES)
+def test_cobs_round_trip(data):
+    encoded = cobs_encode(data)
+    assert b"\x00" not in encoded
+    assert cobs_decode(encoded) == data
+
+def test_cobs_known_encodings():
+    """Reference vectors from the COBS paper / Wikipedia"""
+    assert cobs_encode(b"\x00") == b"\x01\x01"
+    assert cobs_encode(b"\x00\x00") == b"\x01\x01\x01"
+    assert cobs_encode(b"\x11\x22\x00\x33") == b"\x03\x11\x22\x02\x33"
+    assert cobs_encode(bytes(range(1, 255))) == b"\xff" + bytes(range(1, 255)) + b"\x01"
+
+def test_cobs_rejects_malformed_input():
+    with pytest.raises(ProtocolError):
+        cobs_decode(b"\x05\x11\x22")       # Block runs past the end
+    with pytest.raises(ProtocolError):
+        cobs_decode(b"\x02\x11\x00\x22")   # 0x00 is never a valid code
+
+def test_crc16_ccitt_false_check_value():
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) check value"""
+    assert crc16_ccitt(b"123456789") == 0x29B1
+    assert crc16_ccitt(b"") == 0xFFFF
+    # Incremental use continues from a previous result
+    assert crc16_ccitt(b"56789", crc16_ccitt(b"1234")) == 0x29B1
+
+def test_command_round_trip():
+    frame = encode_command("set_state", 513, vehicle="VWT7", gear="DRIVE", speed=120)
+    assert frame[0] == 0 and frame[-1] == 0 and b"\x00" not in frame[1:-1]
+    assert decode_frame(frame[1:-1]) == {"type": "command", "command": "set_state", "id": 513,
+                                         "vehicle": "VWT7", "gear": "DRIVE", "speed": 120}
+
+def test_speed_out_of_range_is_clamped_to_0xff():
+    """Out-of-range U8 values become 0xFF so the firmware rejects them instead of wrapping"""
+    for speed in (256, 300, 1000, -1):
+        assert decode_frame(encode_command("set_speed", 1, speed=speed)[1:-1])["speed"] == 0xFF
+    assert decode_frame(encode_command("set_speed", 1, speed=255)[1:-1])["speed"] == 255
+    assert decode_frame(encode_command("set_speed", 1, speed=0)[1:-1])["speed"] == 0
+
+def test_corrupt_frame_fails_crc():
+    raw = bytearray(cobs_decode(encode_command("ping", 1)[1:-1]))
+    raw[1] ^= 0x01
+    with pytest.raises(ProtocolError, match="CRC"):
+        decode_frame(cobs_encode(bytes(raw)))
+
+def test_framer_resyncs_after_corrupt_frame():
+    response = {"type": "response", "status": "ok", "command": "set_speed", "id": 7, "speed": 50}
+    good = encode_message(response)
+    corrupt = bytearray(good)
+    corrupt[4] ^= 0x40   # Still COBS-clean, fails the CRC
+
+    framer = BinaryFramer()
+    out = framer.feed(bytes(corrupt) + good)
+    assert out[-1] == (BinaryFramer.BINARY, response)
+    assert framer.crc_errors == 1
+    assert [kind for kind, _ in out].count(BinaryFramer.BINARY) == 1
+
+    # Later frames and JSON keep decoding; the corrupt bytes surface as text
+    out = framer.feed(good + b'{"type": "status_update", "speed": 3}\r\n')
+    assert [item for item in out if item[0] != BinaryFramer.TEXT] == [
+        (BinaryFramer.BINARY, response), (BinaryFramer.JSON, b'{"type": "status_update", "speed": 3}')]
+
+def test_framer_splits_frames_across_chunks_and_log_text():
+    response = {"type": "response", "status": "ok", "command": "ping", "id": 2}
+    stream = b"I (10) CarCan: hello\r\n" + encode_message(response)
+    framer = BinaryFramer()
+    out = []
+    for i in range(len(stream)):
+        out += framer.feed(stream[i:i + 1])
+    assert out == [(BinaryFramer.TEXT, b"I (10) CarCan: hello"), (BinaryFramer.BINARY, response)]
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+CAN Cadence Soak Test (accelerated time)
+
+Runs the emulator, ESP32Controller and a CAN monitor on one VirtualClock and
+checks that the gear and speed frames are emitted every 100 ms for the whole
+scenario while the speed is changed every simulated minute. One simulated
+hour takes about 6 s at the default 600x.
+
+Reports frames per simulated second and the achieved speedup factor
+(simulated time covered / wall time spent).
+
+Usage:
+    python3 test_can_cadence.py                             # 1 simulated hour at 600x
+    python3 test_can_cadence.py --duration 86400 --speedup 2000
+    python3 -m pytest test_can_cadence.py                   # 10 simulated minutes
+"""
+
+import sys
+import argparse
+from typing import Dict, Optional, Tuple
+
+import can
+
+from esp32_controller import ESP32Controller
+from esp32_emulator import ESP32Emulator, CAN_PERIOD
+from message_generators import get_message_generator
+from sim_clock import VirtualClock
+
+class CadenceMonitor:
+    """Per-ID frame intervals and speed checks, from the frames' timestamps"""
+
+    def __init__(self, vehicle: str, period: float = CAN_PERIOD):
+        self.generator = get_message_generator(vehicle)
+        self.period = period
+        self.frames = 0
+        self.counts: Dict[int, int] = {}
+        self.last: Dict[int, float] = {}
+        self.intervals: Dict[int, Tuple[float, float]] = {}   # id -> (min, max)
+        self.first_stamp: Optional[float] = None
+        self.last_stamp = 0.0
+        self.max_lag = 0.0
+        self.speed_mismatches = 0
+        # Speed frames stamped at or after since must carry raw
+        self._expected_speed: Optional[Tuple[float, bytes]] = None
+
+    def expect_speed(self, since: float, speed: int):
+        self._expected_speed = (since, self.generator.generate_speed_message(speed))
+
+    def feed(self, message: can.Message, now: float):
+        stamp = message.timestamp
+        msg_id = message.arbitration_id
+        self.frames += 1
+        self.counts[msg_id] = self.counts.get(msg_id, 0) + 1
+        if self.first_stamp is None:
+            self.first_stamp = stamp
+        self.last_stamp = max(self.last_stamp, stamp)
+        self.max_lag = max(self.max_lag, now - stamp)
+
+        previous = self.last.get(msg_id)
+        if previous is not None:
+            interval = stamp - previous
+            low, high = self.intervals.get(msg_id, (interval, interval))
+            self.intervals[msg_id] = (min(low, interval), max(high, interval))
+        self.last[msg_id] = stamp
+
+        expected = self._expected_speed
+        if msg_id == self.generator.SPEED_MSG_ID and expected and stamp >= expected[0]:
+            if bytes(message.data) != expected[1]:
+                self.speed_mismatches += 1
+
+    @property
+    def simulated(self) -> float:
+        return 0.0 if self.first_stamp is None else self.last_stamp - self.first_stamp
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.simulated if self.simulated else 0.0
+
+    def cadence_ok(self, tolerance: float) -> bool:
+        ids = self.generator.required_message_ids()
+        return all(msg_id in self.intervals
+                   and abs(self.intervals[msg_id][0] - self.period) <= tolerance
+                   and abs(self.intervals[msg_id][1] - self.period) <= tolerance
+                   for msg_id in ids)
+
+def run_cadence_soak(duration: float = 3600.0, speedup: float = 600.0, vehicle: str = "VWT6",
+                     speed_step: float = 60.0, tolerance: float = 0.001) -> bool:
+    """Run the scenario, print the report and return True if the cadence held"""
+    print("⏱️  CAN Cadence Soak Test")
+    print("=" * 50)
+    print(f"{duration:g} simulated s at {speedup:g}x, {vehicle}, speed change every {speed_step:g} s")
+
+    clock = VirtualClock(speedup)
+    channel = f"cadence-{id(clock)}"
+    monitor = CadenceMonitor(vehicle)
+    changes = failed_changes = 0
+
+    with ESP32Emulator(log_commands=False, transport="loopback", can_channel=channel, clock=clock) as emulator:
+        bus = can.Bus(interface="virtual", channel=channel)
+        controller = ESP32Controller(emulator.port, clock=clock)
+        try:
+            if not controller.connect() or not controller.apply_state(vehicle=vehicle, gear="DRIVE", speed=0):
+                print("❌ Could not set up the emulator")
+                return False
+            monitor.expect_speed(clock.time() + CAN_PERIOD, 0)
+            while bus.recv(timeout=0) is not None:
+                pass  # Frames from before the state was applied
+
+            start = clock.monotonic()
+            real_start = clock.real_elapsed()
+            next_change = start + speed_step
+            while clock.monotonic() - start < duration:
+                message = bus.recv(timeout=clock.to_real(0.5))
+                if message is not None:
+                    monitor.feed(message, clock.time())
+                if clock.monotonic() >= next_change:
+                    next_change += speed_step
+                    changes += 1
+                    speed = changes * 37 % 251
+                    if controller.set_speed(speed):
+                        # One tick of grace: the tick in flight may predate the command
+                        monitor.expect_speed(clock.time() + CAN_PERIOD, speed)
+                    else:
+                        failed_changes += 1
+            wall = clock.real_elapsed() - real_start
+        finally:
+            controller.disconnect()
+            bus.shutdown()
+
+    simulated = monitor.simulated
+    print(f"\n📊 {simulated:.1f} simulated s in {wall:.2f} s wall: speedup {simulated / wall:.0f}x")
+    print(f"   Frames: {monitor.frames} ({monitor.frames_per_second:.2f} per simulated second)")
+    for msg_id in monitor.generator.required_message_ids():
+        low, high = monitor.intervals.get(msg_id, (0.0, 0.0))
+        print(f"   0x{msg_id:03X}: {monitor.counts.get(msg_id, 0)} frames, "
+              f"interval {low * 1000:.1f}-{high * 1000:.1f} ms")
+    print(f"   Speed changes: {changes - failed_changes}/{changes} acknowledged, "
+          f"{monitor.speed_mismatches} frames with a stale speed")
+    print(f"   Max delivery lag: {monitor.max_lag * 1000:.1f} simulated ms")
+
+    expected_frames = len(monitor.generator.required_message_ids()) * (duration / CAN_PERIOD)
+    ok = (monitor.cadence_ok(tolerance)
+          and monitor.frames >= expected_frames * 0.99
+          and failed_changes == 0
+          and monitor.speed_mismatches == 0)
+    print("✅ Cadence held" if ok else "❌ Cadence check failed")
+    return ok
+
+def test_can_cadence():
+    """10 simulated minutes: 100 ms cadence on both IDs, speed changes applied"""
+    assert run_cadence_soak(duration=600.0, speedup=600.0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the 100 ms CAN cadence in accelerated time")
+    parser.add_argument("--duration", type=float, default=3600.0, help="Simulated seconds (default: 3600)")
+    parser.add_argument("--speedup", type=float, default=600.0, help="Simulated/real time ratio (default: 600)")
+    parser.add_argument("--vehicle", default="VWT6", help="Vehicle to simulate (default: VWT6)")
+    parser.add_argument("--speed-step", type=float, default=60.0,
+                        help="Simulated seconds between speed changes (default: 60)")
+    args = parser.parse_args()
+    return 0 if run_cadence_soak(args.duration, args.speedup, args.vehicle, args.speed_step) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+CAN Capture Tests
+
+Writes binary captures with CaptureWriter (single messages, record arrays
+and pcan_reader's FrameRing) and reads them back with CaptureReader, with
+and without the sidecar index.
+
+Usage:
+    python3 -m pytest test_can_capture.py
+"""
+
+import io
+import os
+
+import can
+import numpy as np
+import pytest
+
+from can_capture import (CAPTURE_DTYPE, FLAG_EXTENDED, FLAG_FD, FLAG_REMOTE, HEADER_SIZE,
+                         INDEX_SUFFIX, RECORD_SIZE, CaptureWriter, CaptureReader, build_index,
+                         format_frame)
+from pcan_reader import CaptureEngine, FrameRing
+
+START_TIME = 1700000000.0
+
+def _message(timestamp, can_id, data=b"", **kwargs):
+    return can.Message(timestamp=START_TIME + timestamp, arbitration_id=can_id, is_extended_id=False,
+                       data=data, **kwargs)
+
+def test_header_round_trip(tmp_path):
+    path = str(tmp_path / "header.cancap")
+    with CaptureWriter(path, bitrate=250000, channel="PCAN_USBBUS2", start_time=START_TIME, index=False):
+        pass
+    assert os.path.getsize(path) == HEADER_SIZE
+    capture = CaptureReader(path)
+    assert (capture.start_time, capture.bitrate, capture.channel) == (START_TIME, 250000, "PCAN_USBBUS2")
+    assert len(capture) == 0 and capture.duration == 0.0
+
+def test_not_a_capture(tmp_path):
+    path = str(tmp_path / "text.cancap")
+    with open(path, "wb") as f:
+        f.write(b"timestamp,id,data\n" * 10)
+    with pytest.raises(ValueError):
+        CaptureReader(path)
+
+def test_write_message_round_trip(tmp_path):
+    path = str(tmp_path / "messages.cancap")
+    messages = [
+        _message(0.1, 0x1A0, bytes([1, 2, 3])),
+        can.Message(timestamp=START_TIME + 0.2, arbitration_id=0x18DAF110, data=bytes(range(8))),
+        _message(0.3, 0x7DF, is_remote_frame=True, dlc=8),
+    ]
+    with CaptureWriter(path, start_time=START_TIME, index=False) as writer:
+        for msg in messages:
+            writer.write_message(msg)
+
+    frames = CaptureReader(path).frames
+    assert frames["can_id"].tolist() == [0x1A0, 0x18DAF110, 0x7DF]
+    assert frames["flags"].tolist() == [0, FLAG_EXTENDED, FLAG_REMOTE]
+    # A remote frame keeps its requested length and carries no data
+    assert frames["dlc"].tolist() == [3, 8, 8]
+    assert frames["data"][0].tolist() == [1, 2, 3, 0, 0, 0, 0, 0]
+    assert frames["data"][1].tolist() == list(range(8))
+    assert not frames["data"][2].any()
+
+def test_partial_trailing_record_is_ignored(tmp_path):
+    path = str(tmp_path / "torn.cancap")
+    frames = np.zeros(5, dtype=CAPTURE_DTYPE)
+    frames["timestamp"] = START_TIME + np.arange(5)
+    frames["can_id"] = 0x100
+    with CaptureWriter(path, start_time=START_TIME, index=False) as writer:
+        writer.write_frames(frames)
+    with open(path, "ab") as f:
+        f.write(b"\x01" * (RECORD_SIZE - 3))   # Crash halfway through a record
+
+    capture = CaptureReader(path)
+    assert len(capture) == 5
+    assert np.array_equal(capture.frames, frames)
+
+def test_write_ring_wraps_and_zeroes_past_payload(tmp_path):
+    """Slots are reused: stale bytes of earlier, longer frames must not be recorded"""
+    path = str(tmp_path / "ring.cancap")
+    ring = FrameRing(capacity=4)
+    with CaptureWriter(path, start_time=START_TIME, index=False) as writer:
+        # Fill every slot with 8 bytes
+        for i in range(4):
+            ring.push(_message(i, 0x100 + i, b"\xff" * 8))
+        writer.write_ring(ring, 0, 4)
+        ring.tail = 4
+        # Positions 4..5: slots 0 and 1
+        ring.push(_message(4, 0x200, b"\x01"))
+        ring.push(_message(5, 0x201, b"\x01\x02"))
+        writer.write_ring(ring, 4, 6)
+        ring.tail = 6
+        # Positions 6..9: slots 2, 3, then wrapping round to 0, 1
+        ring.push(_message(6, 0x300, b"\x03"))
+        ring.push(_message(7, 0x7DF, is_remote_frame=True, dlc=4))
+        ring.push(_message(8, 0x301, b"\x04\x05\x06"))
+        ring.push(_message(9, 0x302))
+        writer.write_ring(ring, 6, 10)
+        ring.tail = 10
+
+    frames = CaptureReader(path).frames
+    assert frames["timestamp"].tolist() == [START_TIME + i for i in range(10)]
+    assert frames["can_id"][4:].tolist() == [0x200, 0x201, 0x300, 0x7DF, 0x301, 0x302]
+    assert frames["dlc"].tolist() == [8, 8, 8, 8, 1, 2, 1, 4, 3, 0]
+    assert frames["flags"].tolist() == [0] * 7 + [FLAG_REMOTE, 0, 0]
+    assert frames["data"][:4].tolist() == [[0xFF] * 8] * 4
+    assert frames["data"][4:].tolist() == [[1, 0, 0, 0, 0, 0, 0, 0],
+                                           [1, 2, 0, 0, 0, 0, 0, 0],
+                                           [3, 0, 0, 0, 0, 0, 0, 0],
+                                           [0] * 8,
+                                           [4, 5, 6, 0, 0, 0, 0, 0],
+                                           [0] * 8]
+
+def test_write_ring_matches_write_message(tmp_path):
+    """A frame recorded through the ring gives the same record as write_message()"""
+    messages = [
+        _message(0.1, 0x1A0, bytes([1, 2, 3])),
+        can.Message(timestamp=START_TIME + 0.2, arbitration_id=0x18DAF110, data=bytes(range(8))),
+        _message(0.3, 0x7DF, is_remote_frame=True, dlc=8),
+        _message(0.4, 0x0A0, is_error_frame=True),
+        _message(0.5, 0x123, bytes([9, 8]), is_fd=True),
+        _message(0.6, 0x124, bytes(range(12)), is_fd=True),
+    ]
+    ring = FrameRing(capacity=8)
+    for msg in messages:
+        ring.push(msg)
+    with CaptureWriter(str(tmp_path / "ring.cancap"), start_time=START_TIME, index=False) as writer:
+        writer.write_ring(ring, 0, len(messages))
+    with CaptureWriter(str(tmp_path / "messages.cancap"), start_time=START_TIME, index=False) as writer:
+        for msg in messages:
+            writer.write_message(msg)
+
+    from_ring = CaptureReader(str(tmp_path / "ring.cancap")).frames
+    from_messages = CaptureReader(str(tmp_path / "messages.cancap")).frames
+    assert np.array_equal(from_ring, from_messages)
+    assert from_ring["flags"][4] & FLAG_FD and from_ring["flags"][5] & FLAG_FD
+
+def test_format_frame_matches_live_output(tmp_path):
+    """can_capture prints a recorded frame exactly as pcan_reader printed it live"""
+    path = str(tmp_path / "lines.cancap")
+    engine = CaptureEngine(bus=None, output=io.StringIO())
+    engine.start_time = START_TIME
+    messages = [_message(0.1, 0x1A0, bytes([1, 2, 3])),
+                _message(0.2, 0x440, bytes(range(8))),
+                _message(0.3, 0x7DF, is_remote_frame=True, dlc=8),
+                _message(0.4, 0x7E8)]
+    for msg in messages:
+        engine.ring.push(msg)
+    engine._write_text(0, len(messages))
+    with CaptureWriter(path, start_time=START_TIME, index=False) as writer:
+        writer.write_ring(engine.ring, 0, len(messages))
+
+    lines = [format_frame(frame, START_TIME) for frame in CaptureReader(path).frames]
+    assert lines == engine.output.getvalue().splitlines()
+    assert lines[2].rstrip().endswith("| 8   | " + "-- " * 7 + "--")
+
+def _synthetic_capture(path, count, seed=3, jitter=0.0, bucket_width=1.0):
+    """count frames at 100 frames/s over five IDs, timestamps jittered by up to jitter seconds"""
+    rng = np.random.default_rng(seed)
+    frames = np.zeros(count, dtype=CAPTURE_DTYPE)
+    frames["timestamp"] = START_TIME + np.arange(count) / 100.0 + rng.uniform(-jitter, jitter, count)
+    frames["can_id"] = rng.choice([0x0FD, 0x1A0, 0x3DC, 0x440, 0x7E8], count)
+    frames["dlc"] = 8
+    frames["data"][:, 0] = np.arange(count) & 0xFF
+    with CaptureWriter(path, start_time=START_TIME, bucket_width=bucket_width) as writer:
+        writer.write_frames(frames)
+    return frames
+
+def test_build_index_on_empty_capture(tmp_path):
+    path = str(tmp_path / "empty.cancap")
+    with CaptureWriter(path, start_time=START_TIME):
+        pass
+    assert os.path.exists(path + INDEX_SUFFIX)
+    capture = CaptureReader(path)
+    assert capture.index is not None and capture.index.counts() == {}
+    assert len(capture.select(ids=[0x1A0])) == 0
+    assert len(capture.select(start=0.0, end=10.0)) == 0
+
+def test_stale_index_is_rejected(tmp_path):
+    """An index built for fewer frames than the capture holds is not used"""
+    path = str(tmp_path / "stale.cancap")
+    frames = _synthetic_capture(path, 500)
+    _synthetic_capture(str(tmp_path / "short.cancap"), 300)
+    os.replace(str(tmp_path / "short.cancap") + INDEX_SUFFIX, path + INDEX_SUFFIX)
+
+    capture = CaptureReader(path)
+    assert capture.index is None
+    assert np.array_equal(capture.select(ids=[0x1A0]), frames[frames["can_id"] == 0x1A0])
+
+    build_index(path)
+    assert CaptureReader(path).index is not None
+
+def test_writer_replaces_index_of_overwritten_capture(tmp_path):
+    path = str(tmp_path / "reused.cancap")
+    _synthetic_capture(path, 500)
+    with CaptureWriter(path, start_time=START_TIME, index=False):
+        pass
+    assert not os.path.exists(path + INDEX_SUFFIX)
+
+@pytest.mark.parametrize("jitter", [0.0, 0.2])   # Steps back by up to 0.4 s, within one bucket
+def test_indexed_select_matches_scan(tmp_path, jitter):
+    """Random ID sets and windows give identical results with and without the index"""
+    path = str(tmp_path / "random.cancap")
+    _synthetic_capture(path, 20000, jitter=jitter, bucket_width=0.5)
+    indexed, scanned = CaptureReader(path), CaptureReader(path, use_index=False)
+    assert indexed.index is not None
+
+    rng = np.random.default_rng(11)
+    ids = [0x0FD, 0x1A0, 0x3DC, 0x440, 0x7E8, 0x123]
+    for _ in range(200):
+        start, end = np.sort(rng.uniform(-5.0, 210.0, 2))
+        query = dict(start=None if rng.random() < 0.1 else float(start),
+                     end=None if rng.random() < 0.1 else float(end))
+        if rng.random() < 0.8:
+            query["ids"] = rng.choice(ids, rng.integers(1, 4), replace=False).tolist()
+        result = indexed.select(**query)
+        assert np.array_equal(result, scanned.select(**query, chunk_size=4096)), query
+
+def test_out_of_order_frame_at_window_end(tmp_path):
+    """A frame stamped before its predecessor is still found by a window that ends just after it"""
+    path = str(tmp_path / "late.cancap")
+    frames = np.zeros(4, dtype=CAPTURE_DTYPE)
+    frames["timestamp"] = START_TIME + np.array([0.5, 2.1, 1.95, 3.5])
+    frames["can_id"] = [0x100, 0x100, 0x1A0, 0x100]
+    with CaptureWriter(path, start_time=START_TIME) as writer:
+        writer.write_frames(frames)
+
+    capture = CaptureReader(path)
+    assert capture.index is not None
+    assert capture.select(ids=[0x1A0], start=1.0, end=1.99)["can_id"].tolist() == [0x1A0]
+    assert capture.select(start=1.0, end=1.99)["can_id"].tolist() == [0x1A0]
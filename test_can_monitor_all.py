@@ -4,42 +4,49 @@ Monitor ALL CAN Traffic
 
 This test listens to ALL CAN messages to see if the ESP32 
 is transmitting anything at all on the CAN bus.
+
+Pass an already open bus and a clock (sim_clock.py) to monitor an
+emulator's virtual bus, e.g. in accelerated time.
 """
 
 import can
-import time
 import sys
+from typing import Optional
+
+from sim_clock import Clock, WALL_CLOCK
 
-def monitor_all_can_traffic():
+def monitor_all_can_traffic(can_bus: Optional[can.BusABC] = None, duration: float = 30.0,
+                            clock: Clock = WALL_CLOCK):
     """Monitor all CAN traffic to diagnose transmission issues"""
     print("🔍 CAN Traffic Monitor - All Messages")
     print("=" * 50)
     
     # Connect to CAN bus with 500k baud rate (VW T6 default)
-    try:
-        can_bus = can.Bus(
-            channel="PCAN_USBBUS1", 
-            interface="pcan",
-            bitrate=500000
-        )
-        print(f"✅ Connected to CAN bus at 500k baud")
-    except Exception as e:
-        print(f"❌ Failed to connect to CAN: {e}")
-        return False
+    if can_bus is None:
+        try:
+            can_bus = can.Bus(
+                channel="PCAN_USBBUS1", 
+                interface="pcan",
+                bitrate=500000
+            )
+            print(f"✅ Connected to CAN bus at 500k baud")
+        except Exception as e:
+            print(f"❌ Failed to connect to CAN: {e}")
+            return False
     
     try:
-        print("👂 Monitoring ALL CAN messages for 30 seconds...")
+        print(f"👂 Monitoring ALL CAN messages for {duration:g} seconds...")
         print("Time     | ID    | DLC | Data                    | Description")
         print("-" * 70)
         
-        start_time = time.time()
+        start_time = clock.monotonic()
         message_count = 0
         
-        while time.time() - start_time < 30:  # Monitor for 30 seconds
-            message = can_bus.recv(timeout=0.1)
+        while clock.monotonic() - start_time < duration:
+            message = can_bus.recv(timeout=clock.to_real(0.1))
             if message:
                 message_count += 1
-                elapsed = time.time() - start_time
+                elapsed = clock.monotonic() - start_time
                 
                 # Format message data
                 data_str = ' '.join(f'{b:02X}' for b in message.data)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Device Log Tests
+
+Writes, reopens and appends binary device logs, including logs whose tail
+was torn by a crash, and reads them back through DeviceLogReader.
+
+Usage:
+    python3 -m pytest test_device_log.py
+"""
+
+import os
+
+from device_log import (MAGIC, HEAP_SUFFIX, BinaryLogWriter, DeviceLogReader, parse_log_line,
+                        _RECORD)
+
+LINES = [b"I (100) CarCan: Speed set to: 50 km/h",
+         b"W (200) SerialCmd: Unknown command",
+         b"E (300) CarCan: TWAI bus off",
+         b"plain text from the bootloader"]
+
+def _write(path, lines, host_time=1000.0):
+    writer = BinaryLogWriter(path)
+    for i, line in enumerate(lines):
+        writer.write(parse_log_line(line, host_time + i))
+    writer.close()
+
+def _messages(path, **filters):
+    return [record.message for record in DeviceLogReader(path).records(**filters)]
+
+def test_write_reopen_append_round_trip(tmp_path):
+    path = str(tmp_path / "soak.esplog")
+    _write(path, LINES[:2])
+    _write(path, LINES[2:], host_time=2000.0)
+
+    records = list(DeviceLogReader(path).records())
+    assert [record.message for record in records] == [
+        "Speed set to: 50 km/h", "Unknown command", "TWAI bus off", "plain text from the bootloader"]
+    assert [record.level for record in records] == ["I", "W", "E", "?"]
+    assert [record.tick for record in records] == [100, 200, 300, 0]
+    assert records[2].host_time == 2000.0
+
+    # Tag numbers are reused across sessions: CarCan is defined once
+    assert sorted(DeviceLogReader(path).tags().values()) == ["", "CarCan", "SerialCmd"]
+    assert _messages(path, tags={"CarCan"}) == ["Speed set to: 50 km/h", "TWAI bus off"]
+    assert _messages(path, min_level="W") == ["Unknown command", "TWAI bus off"]
+    assert _messages(path, since=1001.0) == ["Unknown command", "TWAI bus off", "plain text from the bootloader"]
+
+def test_empty_log(tmp_path):
+    path = str(tmp_path / "empty.esplog")
+    BinaryLogWriter(path).close()
+    assert _messages(path) == []
+    assert DeviceLogReader(path).tags() == {}
+
+def test_torn_index_record_is_ignored_and_trimmed(tmp_path):
+    path = str(tmp_path / "torn.esplog")
+    _write(path, LINES[:2])
+    with open(path, "ab") as f:
+        f.write(b"\x01" * (_RECORD.size // 2))   # Crash halfway through an index record
+    assert _messages(path) == ["Speed set to: 50 km/h", "Unknown command"]
+
+    _write(path, LINES[2:3])
+    assert (os.path.getsize(path) - len(MAGIC)) % _RECORD.size == 0
+    assert _messages(path) == ["Speed set to: 50 km/h", "Unknown command", "TWAI bus off"]
+
+def test_unindexed_heap_bytes_are_trimmed(tmp_path):
+    path = str(tmp_path / "heap.esplog")
+    _write(path, LINES[:1])
+    with open(path + HEAP_SUFFIX, "ab") as f:
+        f.write(b"message whose index record was never written")
+
+    _write(path, LINES[1:2])
+    assert _messages(path) == ["Speed set to: 50 km/h", "Unknown command"]
+
+def test_record_past_end_of_heap_is_dropped(tmp_path):
+    path = str(tmp_path / "short.esplog")
+    _write(path, LINES[:2])
+    # The heap lost the last message: its index record points past the end
+    heap_size = os.path.getsize(path + HEAP_SUFFIX)
+    os.truncate(path + HEAP_SUFFIX, heap_size - len("Unknown command"))
+
+    _write(path, LINES[2:3])
+    assert _messages(path) == ["Speed set to: 50 km/h", "TWAI bus off"]
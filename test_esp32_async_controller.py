@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Asyncio ESP32 Controller Tests
+
+Runs AsyncESP32Controller against the loopback ESP32 emulator, and against
+a scripted loopback device that answers out of order, so connecting,
+response matching and connection loss can be verified without hardware.
+
+Usage:
+    python3 -m pytest test_esp32_async_controller.py
+"""
+
+import io
+import json
+import asyncio
+import threading
+import contextlib
+
+from esp32_async_controller import AsyncESP32Controller
+from esp32_emulator import ESP32Emulator
+from transport import register_loopback, unregister_loopback
+
+def _run(coro):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(coro)
+
+def test_connect_waits_for_ready():
+    async def session(port):
+        controller = AsyncESP32Controller(port, compact=True)
+        assert await controller.connect()
+        try:
+            assert controller.is_connected
+            assert await controller.ping()
+            return await controller.get_status()
+        finally:
+            await controller.disconnect()
+            assert not controller.is_connected
+
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        status = _run(session(emulator.port))
+        assert emulator.compact_output
+    assert (status.vehicle, status.gear, status.speed) == ("VWT6", "PARK", 0)
+
+def test_connect_to_nothing_fails():
+    async def session():
+        controller = AsyncESP32Controller("loopback://nobody-home")
+        assert not await controller.connect()
+        assert not controller.is_connected
+    _run(session())
+
+class _ReversingDevice:
+    """Answers pings at once and every batch of set_speed commands in reverse order"""
+
+    def __init__(self, name: str, batch: int):
+        self.port = f"loopback://{name}"
+        self.batch = batch
+        self.name = name
+
+    def __enter__(self):
+        register_loopback(self.name, self._accept)
+        return self
+
+    def __exit__(self, *exc):
+        unregister_loopback(self.name)
+
+    def _accept(self, link):
+        threading.Thread(target=self._serve, args=(link,), daemon=True).start()
+
+    def _serve(self, link):
+        buffer, held = b"", []
+        while True:
+            try:
+                buffer += link.read(4096)
+            except ConnectionError:
+                return
+            *lines, buffer = buffer.split(b"\r\n")
+            for line in lines:
+                request = json.loads(line)
+                response = {"type": "response", "status": "ok", "command": request["command"],
+                            "id": request["id"]}
+                if request["command"] != "set_speed":
+                    link.write(json.dumps(response).encode() + b"\r\n")
+                    continue
+                held.append(dict(response, speed=request["speed"]))
+                if len(held) == self.batch:
+                    for response in reversed(held):
+                        link.write(json.dumps(response).encode() + b"\r\n")
+                    held.clear()
+
+def test_concurrent_requests_matched_by_id():
+    """gather()ed commands each get their own response, though the replies come back reversed"""
+    async def session(port):
+        async with AsyncESP32Controller(port) as controller:
+            responses = await asyncio.gather(*(controller._send_command("set_speed", speed=speed)
+                                               for speed in range(8)))
+            assert controller._pending == {}
+            return responses
+
+    with _ReversingDevice("async-reversing", batch=8) as device:
+        responses = _run(session(device.port))
+    assert [response["speed"] for response in responses] == list(range(8))
+    assert len({response["id"] for response in responses}) == 8
+
+def test_concurrent_commands_against_emulator():
+    async def session(port):
+        async with AsyncESP32Controller(port, protocol="binary") as controller:
+            results = await asyncio.gather(controller.set_vehicle("VWT7"), controller.set_gear("DRIVE"),
+                                           controller.set_speed(88), controller.ping())
+            return results, await controller.get_status()
+
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        results, status = _run(session(emulator.port))
+        assert emulator.binary_output
+    assert results == [True, True, True, True]
+    assert (status.vehicle, status.gear, status.speed) == ("VWT7", "DRIVE", 88)
+
+def test_timeout_forgets_pending_request():
+    async def session(emulator):
+        async with AsyncESP32Controller(emulator.port) as controller:
+            controller._response_timeout = 0.2
+            emulator.response_delay = 0.5
+            assert await controller.set_speed(42) is False
+            assert controller._pending == {}
+
+            emulator.response_delay = 0.0
+            controller._response_timeout = 5.0
+            assert await controller.ping()   # Answered after the late set_speed response
+            assert controller._pending == {}
+
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        _run(session(emulator))
+
+def test_connection_lost_cancels_pending_requests():
+    """A board that goes away wakes every waiting caller with a failure"""
+    async def session(emulator):
+        controller = AsyncESP32Controller(emulator.port)
+        assert await controller.connect()
+        try:
+            emulator.response_delay = 0.5
+            waiting = asyncio.gather(controller.set_speed(10), controller.get_status(),
+                                     controller.flush_setpoints())
+            await asyncio.sleep(0.1)
+            assert controller._pending
+            emulator.reboot()
+            results = await asyncio.wait_for(waiting, 2.0)
+            assert not controller.is_connected
+            assert controller._pending == {} and controller._setpoint_waiters == {}
+            return results
+        finally:
+            await controller.disconnect()
+
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        assert _run(session(emulator)) == [False, None, None]
+
+def test_setpoint_stream_acks_and_losses():
+    """Same stream as the threaded controller's test: seq 12-14 are lost on the wire"""
+    async def session(port):
+        acks = []
+        async with AsyncESP32Controller(port) as controller:
+            controller.on_setpoint_ack = lambda stats: acks.append((stats.acked_seq, stats.received, stats.lost))
+            controller.start_setpoint_stream()
+            seqs = [controller.send_setpoint(speed=i, gear="DRIVE") for i in range(30)]
+            stats = await controller.flush_setpoints(timeout=2.0)
+        return seqs, acks, stats
+
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        handle = emulator._handle_setpoint
+        def lossy(request):
+            if request.get("seq") not in {12, 13, 14}:
+                handle(request)
+        emulator._handle_setpoint = lossy
+        seqs, acks, stats = _run(session(emulator.port))
+        assert (emulator.gear, emulator.speed) == ("DRIVE", 29)
+
+    assert seqs == list(range(30))
+    assert acks[:2] == [(9, 10, 0), (22, 20, 3)]
+    assert (stats.sent, stats.acked_seq, stats.received, stats.lost) == (31, 30, 28, 3)
+
+def _without_set_state(emulator):
+    """Emulate firmware that predates set_state; returns the list of per-field commands it receives"""
+    emulator._handle_set_state = None   # Answered with "Unknown command"
+    received = []
+    for command in ("set_vehicle", "set_gear", "set_speed"):
+        handle = getattr(emulator, f"_handle_{command}")
+        def record(request, command=command, handle=handle):
+            received.append(command)
+            handle(request)
+        setattr(emulator, f"_handle_{command}", record)
+    return received
+
+def test_apply_state_falls_back_to_per_field_commands():
+    async def session(port):
+        async with AsyncESP32Controller(port) as controller:
+            return await controller.apply_state(vehicle="VWT7", gear="DRIVE", speed=50)
+
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        received = _without_set_state(emulator)
+        assert _run(session(emulator.port))
+    assert received == ["set_vehicle", "set_gear", "set_speed"]
+    assert (emulator.vehicle, emulator.gear, emulator.speed) == ("VWT7", "DRIVE", 50)
+
+def test_apply_state_fallback_stops_at_first_failure():
+    async def session(port):
+        async with AsyncESP32Controller(port) as controller:
+            return await controller.apply_state(vehicle="VWT7", gear="WARP", speed=50)
+
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        received = _without_set_state(emulator)
+        assert _run(session(emulator.port)) is False
+    assert received == ["set_vehicle", "set_gear"]
+    assert (emulator.vehicle, emulator.gear, emulator.speed) == ("VWT7", "PARK", 0)
@@ -10,17 +10,21 @@ This script tests the complete control flow:
 
 Usage:
     python3 test_esp32_control.py
+    python3 test_esp32_control.py --port /dev/ttyACM1 --can-channel PCAN_USBBUS2
+    python3 test_esp32_control.py --emulator     # No hardware: emulator + virtual CAN bus
+    python3 test_esp32_control.py --emulator --speedup 100   # ... in accelerated time
 
 This validates the entire chain: Serial Command -> ESP32 -> GUI Update -> CAN Output
 """
 
-import time
 import sys
+import argparse
 import can
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
 from esp32_controller import ESP32Controller, ESP32Status
+from sim_clock import Clock, VirtualClock, WALL_CLOCK
 
 @dataclass
 class TestCase:
@@ -37,9 +41,14 @@ class TestCase:
 class ESP32ControlTester:
     """Comprehensive ESP32 control and CAN verification tester"""
     
-    def __init__(self, serial_port: str = "/dev/ttyACM0", can_channel: str = "PCAN_USBBUS1"):
+    def __init__(self, serial_port: str = "/dev/ttyACM0", can_channel: str = "PCAN_USBBUS1",
+                 can_interface: str = "pcan", test_delay: float = 1.0, clock: Clock = WALL_CLOCK):
         self.serial_port = serial_port
         self.can_channel = can_channel
+        self.can_interface = can_interface
+        self.test_delay = test_delay
+        # Waits and listen windows below are in seconds of this clock
+        self.clock = clock
         
         # Controllers
         self.esp32: Optional[ESP32Controller] = None
@@ -89,7 +98,7 @@ class ESP32ControlTester:
         
         # Connect to ESP32
         print(f"📱 Connecting to ESP32 on {self.serial_port}...")
-        self.esp32 = ESP32Controller(self.serial_port)
+        self.esp32 = ESP32Controller(self.serial_port, clock=self.clock)
         
         # Set up status update callback
         self.esp32.on_status_update = self._on_status_update
@@ -104,7 +113,7 @@ class ESP32ControlTester:
         print(f"🚌 Connecting to CAN bus on {self.can_channel}...")
         try:
             self.can_bus = can.Bus(
-                interface='pcan',
+                interface=self.can_interface,
                 channel=self.can_channel,
                 bitrate=500000
             )
@@ -147,21 +156,16 @@ class ESP32ControlTester:
         }
         
         try:
-            # Step 1: Send commands to ESP32
+            # Step 1: Send commands to ESP32 (vehicle, gear and speed in one round trip)
             print(f"📤 Step 1: Sending commands to ESP32...")
             
-            commands_success = True
-            if not self.esp32.set_vehicle(test_case.vehicle):
-                result['errors'].append("Failed to set vehicle")
-                commands_success = False
-            
-            if not self.esp32.set_gear(test_case.gear):
-                result['errors'].append("Failed to set gear")
-                commands_success = False
-            
-            if not self.esp32.set_speed(test_case.speed):
-                result['errors'].append("Failed to set speed")
-                commands_success = False
+            commands_success = self.esp32.apply_state(
+                vehicle=test_case.vehicle,
+                gear=test_case.gear,
+                speed=test_case.speed
+            )
+            if not commands_success:
+                result['errors'].append("Failed to apply vehicle/gear/speed")
             
             result['serial_success'] = commands_success
             
@@ -175,17 +179,17 @@ class ESP32ControlTester:
             print(f"🖥️  Step 2: Waiting for GUI update...")
             
             gui_timeout = 3.0
-            start_time = time.time()
+            start_time = self.clock.monotonic()
             gui_updated = False
             
-            while (time.time() - start_time) < gui_timeout:
+            while (self.clock.monotonic() - start_time) < gui_timeout:
                 if (self.current_status and 
                     self.current_status.vehicle == test_case.vehicle and
                     self.current_status.gear == test_case.gear and
                     self.current_status.speed == test_case.speed):
                     gui_updated = True
                     break
-                time.sleep(0.1)
+                self.clock.sleep(0.1)
             
             result['gui_update_success'] = gui_updated
             
@@ -228,13 +232,17 @@ class ESP32ControlTester:
         """Verify CAN messages match expected values"""
         received_messages = {}
         
+        # Drop frames queued before the new state was applied
+        while self.can_bus.recv(timeout=0) is not None:
+            pass
+        
         # Listen for messages for a few seconds
         listen_time = 3.0
-        start_time = time.time()
+        start_time = self.clock.monotonic()
         
         try:
-            while (time.time() - start_time) < listen_time:
-                message = self.can_bus.recv(timeout=0.5)
+            while (self.clock.monotonic() - start_time) < listen_time:
+                message = self.can_bus.recv(timeout=self.clock.to_real(0.5))
                 
                 if message and message.arbitration_id in test_case.expected_can_ids:
                     received_messages[message.arbitration_id] = message
@@ -316,7 +324,7 @@ class ESP32ControlTester:
                 self.test_results.append(result)
                 
                 # Small delay between tests
-                time.sleep(1.0)
+                self.clock.sleep(self.test_delay)
             
             # Print final results
             self._print_final_results()
@@ -371,7 +379,25 @@ class ESP32ControlTester:
 
 def main():
     """Main test function"""
-    tester = ESP32ControlTester()
+    parser = argparse.ArgumentParser(description="ESP32 control and CAN output test")
+    parser.add_argument("--port", default="/dev/ttyACM0", help="ESP32 serial port (default: /dev/ttyACM0)")
+    parser.add_argument("--can-channel", default="PCAN_USBBUS1", help="PCAN channel (default: PCAN_USBBUS1)")
+    parser.add_argument("--emulator", action="store_true",
+                        help="Test against the host emulator on a virtual CAN bus instead of hardware")
+    parser.add_argument("--speedup", type=float,
+                        help="With --emulator: run in simulated time this many times faster than real time")
+    args = parser.parse_args()
+    
+    emulator = None
+    if args.emulator:
+        from esp32_emulator import ESP32Emulator
+        clock = VirtualClock(args.speedup) if args.speedup else WALL_CLOCK
+        emulator = ESP32Emulator(log_commands=False, can_channel="esp32-control-test", clock=clock)
+        emulator.start()
+        tester = ESP32ControlTester(emulator.port, emulator.can_channel, can_interface="virtual",
+                                    test_delay=0.0, clock=clock)
+    else:
+        tester = ESP32ControlTester(args.port, args.can_channel)
     
     try:
         success = tester.run_all_tests()
@@ -381,6 +407,10 @@ def main():
         print("\n⏹️  Test interrupted by user")
         tester.cleanup()
         sys.exit(1)
+    
+    finally:
+        if emulator:
+            emulator.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+ESP32 Controller Tests
+
+Feeds response frames straight into the controller's dispatch, and runs it
+against the loopback ESP32 emulator, so response matching and connection
+handling can be verified in CI without hardware.
+
+Usage:
+    python3 -m pytest test_esp32_controller.py
+"""
+
+import io
+import json
+import threading
+import contextlib
+from concurrent.futures import Future
+
+import pytest
+
+from esp32_controller import ESP32Controller, ESP32Status, parse_status_frame
+from esp32_emulator import ESP32Emulator
+
+# status_update as SerialCommandHandler::sendStatusUpdate() prints it (cJSON_Print)
+STATUS_FRAME = (b'{\n\t"type":\t"status_update",\n\t"vehicle":\t"VWT6",\n\t"gear":\t"DRIVE",\n'
+                b'\t"speed":\t87,\n\t"can_active":\ttrue,\n\t"uptime":\t123456,\n'
+                b'\t"firmware_version":\t"1.0.0",\n\t"timestamp":\t123456\n}')
+
+def _reconnect_after_reboot(**options):
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        controller = ESP32Controller(emulator.port, timeout=1.0, **options)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert controller.connect(), "First connect failed"
+                assert controller.get_status() is not None
+                controller.disconnect()
+
+                # A rebooted board is back in its default (pretty JSON) output format
+                emulator.compact_output = False
+                emulator.binary_output = False
+
+                assert controller.connect(), "Reconnect to the rebooted board failed"
+                status = controller.get_status()
+        finally:
+            controller.disconnect()
+        return emulator, status
+
+def test_compact_reconnect_to_rebooted_board():
+    """Compact framing is renegotiated instead of carried over to the new link"""
+    emulator, status = _reconnect_after_reboot(compact=True)
+    assert status is not None
+    assert emulator.compact_output
+
+def test_binary_reconnect_to_rebooted_board():
+    """Binary framing is renegotiated instead of carried over to the new link"""
+    emulator, status = _reconnect_after_reboot(compact=True, protocol="binary")
+    assert status is not None
+    assert emulator.binary_output
+
+def _register(controller, command, **kwargs):
+    future = Future()
+    request_id, _ = controller._encode_command(command, future, **kwargs)
+    return request_id, future
+
+def test_out_of_order_responses_reach_their_requests():
+    """Responses complete the request with their ID, whatever order they arrive in"""
+    controller = ESP32Controller()
+    requests = [_register(controller, "set_speed", speed=speed) for speed in (10, 20, 30)]
+    for request_id, _ in reversed(requests):
+        controller._process_chunk(json.dumps({"type": "response", "status": "ok", "command": "set_speed",
+                                              "id": request_id, "speed": request_id}).encode() + b"\r\n")
+    for request_id, future in requests:
+        assert future.result(timeout=0)["speed"] == request_id
+    assert controller._pending == {}
+
+def test_response_without_id_matches_oldest_request_for_its_command():
+    """Firmware without ID echo: the oldest pending request for the command wins"""
+    controller = ESP32Controller()
+    ping_id, ping = _register(controller, "ping")
+    _, first = _register(controller, "set_gear", gear="DRIVE")
+    second_id, second = _register(controller, "set_gear", gear="PARK")
+    controller._handle_json_response({"type": "response", "status": "ok", "command": "set_gear"})
+    assert first.done() and not second.done() and not ping.done()
+    assert set(controller._pending) == {ping_id, second_id}
+
+def test_unsolicited_frames_leave_requests_pending():
+    """Pushes and responses nobody asked for resolve nothing"""
+    controller = ESP32Controller()
+    request_id, future = _register(controller, "get_status")
+    controller._process_chunk(STATUS_FRAME + b"\r\n")
+    controller._handle_json_response({"type": "response", "status": "ok", "command": "ping"})
+    controller._handle_json_response({"type": "response", "status": "ok", "command": "get_status",
+                                      "id": request_id + 100})
+    controller._handle_json_response({"type": "error", "message": "Invalid JSON"})
+    assert not future.done()
+    assert list(controller._pending) == [request_id]
+    assert controller.cached_status is not None   # The push still updated the mirror
+
+def test_timeout_forgets_pending_request():
+    """A timed-out command leaves nothing behind, and its late response is dropped"""
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        controller = ESP32Controller(emulator.port)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert controller.connect()
+                controller._response_timeout = 0.2
+                emulator.response_delay = 0.5
+                assert controller.set_speed(42) is False
+                assert controller._pending == {}
+
+                emulator.response_delay = 0.0
+                controller._response_timeout = 5.0
+                assert controller.ping()   # Answered after the late set_speed response
+                assert controller._pending == {}
+        finally:
+            controller.disconnect()
+
+def _ack(command, **fields):
+    return json.dumps(dict(type="response", status="ok", command=command, id=0, **fields)).encode() + b"\r\n"
+
+def test_status_mirror_follows_pushes_and_acks():
+    controller = ESP32Controller()
+    assert controller.cached_status is None
+    # Partial acks cannot start the mirror
+    controller._process_chunk(_ack("set_speed", speed=10))
+    assert controller.cached_status is None
+
+    controller._process_chunk(STATUS_FRAME + b"\r\n")
+    assert controller.cached_status == ESP32Status("VWT6", "DRIVE", 87, True, 123456, "1.0.0")
+    assert controller.status_age is not None and controller.status_age < 1.0
+
+    controller._process_chunk(_ack("set_speed", speed=42))
+    controller._process_chunk(_ack("set_gear", gear="REVERSE"))
+    controller._process_chunk(_ack("set_state", vehicle="VWT7", gear="PARK", speed=0))
+    assert controller.cached_status == ESP32Status("VWT7", "PARK", 0, True, 123456, "1.0.0")
+
+    # Failed commands leave the mirror alone
+    controller._process_chunk(json.dumps({"type": "response", "status": "error", "command": "set_speed",
+                                          "speed": 99}).encode() + b"\r\n")
+    assert controller.cached_status.speed == 0
+
+def test_set_can_active_ack_is_not_mirrored():
+    """The firmware's set_can_active only echoes the request; CAN output keeps running"""
+    controller = ESP32Controller()
+    controller._process_chunk(STATUS_FRAME + b"\r\n")
+    controller._process_chunk(_ack("set_can_active", active=False))
+    assert controller.cached_status.can_active is True
+
+def test_status_mirror_against_emulator():
+    """Acks keep the mirror current without a get_status round trip"""
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        controller = ESP32Controller(emulator.port)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert controller.connect()
+                assert controller.get_status(max_age=5.0) is not None   # Initial push
+                assert controller.set_speed(64) and controller.set_gear("DRIVE")
+                status = controller.get_status(max_age=5.0)
+                emulator.speed = 5   # Not reported: proves no round trip happened
+                assert controller.get_status(max_age=5.0) == status
+        finally:
+            controller.disconnect()
+    assert (status.speed, status.gear) == (64, "DRIVE")
+
+def test_parse_status_frame_firmware_output():
+    """Both layouts the firmware prints parse without json.loads"""
+    expected = ESP32Status("VWT6", "DRIVE", 87, True, 123456, "1.0.0")
+    assert parse_status_frame(STATUS_FRAME) == expected
+    compact = (b'{"type":"status_update","vehicle":"VWT6","gear":"DRIVE","speed":87,"can_active":true,'
+               b'"uptime":123456,"firmware_version":"1.0.0","timestamp":123456}')
+    assert parse_status_frame(compact) == expected
+    assert parse_status_frame(compact.replace(b"true", b"false")).can_active is False
+
+@pytest.mark.parametrize("frame", [
+    STATUS_FRAME[:-1],                                              # Truncated
+    STATUS_FRAME.replace(b'"speed":\t87', b'"speed":\t"87"'),       # Wrong type
+    STATUS_FRAME.replace(b'\t"gear":\t"DRIVE",\n', b''),            # Missing field
+    STATUS_FRAME.replace(b'"VWT6"', b'"VW\\"T6"'),                  # Escaped string
+    STATUS_FRAME.replace(b'status_update', b'response'),
+    b'{"type":"status_update","gear":"DRIVE","vehicle":"VWT6","speed":87,"can_active":true,'
+    b'"uptime":1,"firmware_version":"1.0.0","timestamp":1}',        # Other field order
+])
+def test_parse_status_frame_rejects_other_layouts(frame):
+    assert parse_status_frame(frame) is None
+
+def test_status_frame_in_other_layout_still_updates_mirror():
+    """Frames the fast parser rejects fall back to json.loads"""
+    controller = ESP32Controller()
+    controller._process_chunk(b'{"type": "status_update", "gear": "NEUTRAL", "vehicle": "VWT7", "speed": 3, '
+                              b'"can_active": true, "uptime": 9, "firmware_version": "1.0.1"}\r\n')
+    assert controller.cached_status == ESP32Status("VWT7", "NEUTRAL", 3, True, 9, "1.0.1")
+
+def test_supervised_reconnect_after_reboot():
+    """auto_reconnect: a rebooted board gets its framing and the last requested state back"""
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        controller = ESP32Controller(emulator.port, compact=True, protocol="binary", auto_reconnect=True,
+                                     reconnect_delay=0.05, reconnect_max_delay=0.2)
+        reconnected = threading.Event()
+        lost = []
+        controller.on_connection_lost = lost.append
+        controller.on_reconnect = lambda outage: reconnected.set()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert controller.connect()
+                assert controller.apply_state(vehicle="VWT7", gear="DRIVE", speed=80)
+                assert controller.set_can_active(True)
+
+                emulator.reboot()
+                assert (emulator.vehicle, emulator.gear, emulator.speed) == ("VWT6", "PARK", 0)
+                assert reconnected.wait(5.0), "Supervisor did not reconnect"
+
+                assert len(controller.outages) == 1 and len(lost) == 1
+                outage = controller.outages[0]
+                assert outage.state_restored and outage.attempts >= 1 and outage.duration > 0
+                assert (emulator.vehicle, emulator.gear, emulator.speed) == ("VWT7", "DRIVE", 80)
+                assert emulator.compact_output and emulator.binary_output
+
+                assert controller.set_speed(90) and emulator.speed == 90
+                assert controller.get_status().speed == 90
+        finally:
+            controller.disconnect()
+    assert len(controller.outages) == 1
+
+def _drop_setpoints(emulator, lost):
+    """Make the emulator ignore the setpoints with these sequence numbers, as if lost on the wire"""
+    handle = emulator._handle_setpoint
+    def lossy(request):
+        if request.get("seq", request.get("id")) not in lost:
+            handle(request)
+    emulator._handle_setpoint = lossy
+
+@contextlib.contextmanager
+def _connected(emulator, **options):
+    controller = ESP32Controller(emulator.port, **options)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert controller.connect()
+            yield controller
+    finally:
+        controller.disconnect()
+
+def test_setpoint_stream_starts_at_seq_zero():
+    """seq 0 (re)starts the stream: the firmware resets its counters"""
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        with _connected(emulator) as controller:
+            controller.start_setpoint_stream()
+            assert [controller.send_setpoint(speed=10 + i, gear="DRIVE") for i in range(5)] == [0, 1, 2, 3, 4]
+            stats = controller.flush_setpoints(timeout=2.0)
+            assert (stats.sent, stats.acked_seq, stats.received, stats.lost) == (6, 5, 6, 0)
+            assert (emulator.gear, emulator.speed) == ("DRIVE", 14)
+
+            controller.start_setpoint_stream()
+            assert controller.send_setpoint(speed=20) == 0
+            stats = controller.flush_setpoints(timeout=2.0)
+            assert (stats.sent, stats.acked_seq, stats.received, stats.lost) == (2, 1, 2, 0)
+
+def test_setpoint_ack_every_ten_frames_reports_losses():
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        _drop_setpoints(emulator, {12, 13, 14})
+        acks = []
+        with _connected(emulator) as controller:
+            controller.on_setpoint_ack = lambda stats: acks.append((stats.acked_seq, stats.received, stats.lost))
+            controller.start_setpoint_stream()
+            for i in range(30):
+                controller.send_setpoint(speed=i)
+            stats = controller.flush_setpoints(timeout=2.0)
+
+    # Received counts 10 and 20 fall on seq 9 and seq 22 (12-14 never arrived)
+    assert acks[:2] == [(9, 10, 0), (22, 20, 3)]
+    assert (stats.sent, stats.acked_seq, stats.received, stats.lost) == (31, 30, 28, 3)
+
+def test_setpoint_seq_wraps_from_65535_to_1():
+    """After 65535 the sequence continues at 1 (0 only ever starts a stream); gaps across the wrap count"""
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        _drop_setpoints(emulator, {65535, 1})
+        with _connected(emulator, protocol="binary") as controller:
+            controller.start_setpoint_stream()
+            seqs = [controller.send_setpoint(speed=i % 250) for i in range(65539)]
+            stats = controller.flush_setpoints(timeout=10.0)
+
+    assert seqs[:2] == [0, 1] and seqs[-5:] == [65534, 65535, 1, 2, 3]
+    # Lost: seq 1 of both laps and 65535, i.e. the gaps 0 -> 2 and 65534 -> 2 across the wrap
+    assert stats.acked_seq == 4 and stats.lost == 3
+    assert stats.received == stats.sent - 3
+
+def _without_set_state(emulator):
+    """Emulate firmware that predates set_state; returns the list of per-field commands it receives"""
+    emulator._handle_set_state = None   # Answered with "Unknown command"
+    received = []
+    for command in ("set_vehicle", "set_gear", "set_speed"):
+        handle = getattr(emulator, f"_handle_{command}")
+        def record(request, command=command, handle=handle):
+            received.append(command)
+            handle(request)
+        setattr(emulator, f"_handle_{command}", record)
+    return received
+
+def test_apply_state_falls_back_to_per_field_commands():
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        received = _without_set_state(emulator)
+        with _connected(emulator) as controller:
+            assert controller.apply_state(vehicle="VWT7", gear="DRIVE", speed=50)
+            assert received == ["set_vehicle", "set_gear", "set_speed"]
+            assert (emulator.vehicle, emulator.gear, emulator.speed) == ("VWT7", "DRIVE", 50)
+
+            received.clear()
+            assert controller.apply_state(speed=20, gear="REVERSE")
+            assert received == ["set_gear", "set_speed"]   # Always vehicle, gear, speed order
+            assert (emulator.gear, emulator.speed) == ("REVERSE", 20)
+
+def test_apply_state_fallback_stops_at_first_failure():
+    with ESP32Emulator(log_commands=False, transport="loopback") as emulator:
+        received = _without_set_state(emulator)
+        with _connected(emulator) as controller:
+            assert controller.apply_state(vehicle="VWT7", gear="WARP", speed=50) is False
+    assert received == ["set_vehicle", "set_gear"]
+    assert (emulator.vehicle, emulator.gear, emulator.speed) == ("VWT7", "PARK", 0)
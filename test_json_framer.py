@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+JSON Framer Test
+
+Feeds JsonFramer the byte streams the ESP32 produces - pretty-printed
+objects, log lines, split reads - and checks the frames and text lines it
+returns.
+
+Usage:
+    python3 -m pytest test_json_framer.py
+"""
+
+import json
+
+from json_framer import JsonFramer
+
+JSON, TEXT = JsonFramer.JSON, JsonFramer.TEXT
+
+def feed_all(framer: JsonFramer, chunks):
+    out = []
+    for chunk in chunks:
+        out += framer.feed(chunk)
+    return out
+
+def test_frame_split_across_chunks():
+    frame = json.dumps({"type": "response", "status": "ok", "data": {"speed": 42}}, indent=2).encode() + b"\n"
+    expected = [(JSON, frame.strip())]
+    for size in (1, 2, 3, 7, len(frame) - 1):
+        framer = JsonFramer()
+        chunks = [frame[i:i + size] for i in range(0, len(frame), size)]
+        assert feed_all(framer, chunks) == expected, size
+
+def test_braces_and_escapes_inside_strings():
+    payload = {"message": 'a } b { c "quoted" \\ end}', "nested": {"x": "}}"}}
+    frame = json.dumps(payload).encode()
+    # Split right after a backslash, so the escape spans two chunks
+    split = frame.index(b"\\") + 1
+    framer = JsonFramer()
+    out = feed_all(framer, [frame[:split], frame[split:], b"\n"])
+    assert [kind for kind, _ in out] == [JSON]
+    assert json.loads(out[0][1]) == payload
+
+def test_text_lines_interleaved_with_json():
+    stream = (b"\x1b[0;32mI (123) CarCan: started\x1b[0m\n"
+              b'{"type": "status", "speed": 1}\n'
+              b"W (124) CarCan: warning\n"
+              b"prefix {\n  \"type\": \"response\"\n}\n"
+              b"\n")
+    out = JsonFramer().feed(stream)
+    assert out == [(TEXT, b"I (123) CarCan: started"),
+                   (JSON, b'{"type": "status", "speed": 1}'),
+                   (TEXT, b"W (124) CarCan: warning"),
+                   (TEXT, b"prefix"),
+                   (JSON, b'{\n  "type": "response"\n}')]
+
+def test_oversize_frame_resyncs():
+    framer = JsonFramer(max_frame_size=64)
+    # An unbalanced '{' in a log line would swallow everything after it
+    out = framer.feed(b"E (1) log with { stray brace\n" + b'{"ok": true}\n' + b"z" * 80 + b"\n")
+    out += framer.feed(b'{"after": 1}\n')
+    assert (TEXT, b"{ stray brace") in out
+    assert (JSON, b'{"ok": true}') in out
+    assert out[-1] == (JSON, b'{"after": 1}')
+    assert all(len(payload) <= 64 for kind, payload in out if kind == JSON)
+
+def test_single_line_mode():
+    framer = JsonFramer(single_line=True)
+    out = feed_all(framer, [b'{"a": "{"}\nI (1) lo', b"g line\n", b'{"b": 2}'])
+    assert out == [(JSON, b'{"a": "{"}'), (TEXT, b"I (1) log line")]
+    assert framer.feed(b"\n") == [(JSON, b'{"b": 2}')]
+
+def test_reset_returns_to_constructed_state():
+    framer = JsonFramer()
+    framer.feed(b'{"partial": "str')
+    framer.set_single_line(True)
+    framer.reset()
+    assert framer.single_line is False
+    # No leftover partial frame or string state
+    assert framer.feed(b'{"a": 1}\n') == [(JSON, b'{"a": 1}')]
+
+    framer = JsonFramer(single_line=True)
+    framer.set_single_line(False)
+    framer.reset()
+    assert framer.single_line is True
+
+def test_set_single_line_keeps_pending_bytes():
+    framer = JsonFramer()
+    assert framer.feed(b'{"a": 1}\n{"b":') == [(JSON, b'{"a": 1}')]
+    framer.set_single_line(True)
+    assert framer.feed(b' 2}\n') == [(JSON, b'{"b": 2}')]
+    framer.set_single_line(False)
+    assert framer.feed(b'{\n  "c": 3\n}\n') == [(JSON, b'{\n  "c": 3\n}')]
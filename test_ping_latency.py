@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+ESP32 Ping Latency Test
+
+Measures ping round-trip latency against a real ESP32. Firmware that polls
+the console with getchar() and a 50 ms delay per character needs several
+seconds per command; with the UART driver event task a ping should come
+back within a few milliseconds. Run it before and after flashing to compare.
+
+Usage:
+    python3 test_ping_latency.py
+    python3 test_ping_latency.py --port /dev/ttyUSB0 --pings 200 --max-p50 20
+"""
+
+import sys
+import time
+import argparse
+import statistics
+
+from esp32_controller import ESP32Controller
+
+def measure_ping_latency(port: str, pings: int, max_p50_ms: float) -> bool:
+    """Ping the ESP32 repeatedly and check the median latency"""
+    print("⏱️  ESP32 Ping Latency Test")
+    print("=" * 40)
+
+    controller = ESP32Controller(port, timeout=10.0)
+
+    try:
+        if not controller.connect():
+            print("❌ Failed to connect")
+            return False
+
+        print("✅ Connected successfully")
+        print(f"📤 Sending {pings} pings...")
+
+        samples = []
+        failures = 0
+        for _ in range(pings):
+            start = time.perf_counter()
+            ok = controller.ping()
+            elapsed = (time.perf_counter() - start) * 1000.0
+            if ok:
+                samples.append(elapsed)
+            else:
+                failures += 1
+
+        if len(samples) < 2:
+            print("❌ Fewer than two pings succeeded")
+            return False
+
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        p50 = cuts[49]
+        print(f"📊 p50: {p50:.2f} ms")
+        print(f"📊 p99: {cuts[98]:.2f} ms")
+        print(f"📊 max: {max(samples):.2f} ms")
+        print(f"📊 failures: {failures}/{pings}")
+
+        if failures:
+            print("❌ Some pings failed")
+            return False
+        if p50 > max_p50_ms:
+            print(f"❌ Median latency above {max_p50_ms:.0f} ms")
+            return False
+
+        print("✅ Ping latency OK")
+        return True
+
+    except Exception as e:
+        print(f"❌ Exception: {e}")
+        return False
+
+    finally:
+        controller.disconnect()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure ESP32 ping latency")
+    parser.add_argument("--port", default="/dev/ttyACM0", help="Serial port (default: /dev/ttyACM0)")
+    parser.add_argument("--pings", type=int, default=100, help="Number of pings (default: 100)")
+    parser.add_argument("--max-p50", type=float, default=20.0,
+                        help="Maximum acceptable median latency in ms (default: 20)")
+    args = parser.parse_args()
+
+    success = measure_ping_latency(args.port, args.pings, args.max_p50)
+    print(f"\n{'✅ SUCCESS' if success else '❌ FAILED'}")
+    sys.exit(0 if success else 1)
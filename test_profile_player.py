@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Profile Player Timing Test
+
+Replays a 100 Hz ramp into the pty ESP32 emulator and checks the achieved
+timing, so playback accuracy can be verified in CI without hardware.
+
+Usage:
+    python3 test_profile_player.py
+"""
+
+import io
+import contextlib
+
+from esp32_controller import ESP32Controller
+from esp32_emulator import ESP32Emulator
+from profile_player import ProfilePlayer, ramp_profile
+
+def test_profile_player_timing():
+    """100 Hz setpoint playback stays on schedule and loses nothing"""
+    print("🏁 Profile Player Timing Test")
+    print("=" * 40)
+
+    profile = ramp_profile(duration=2.0, rate_hz=100.0)
+
+    with ESP32Emulator(log_commands=False) as emulator:
+        controller = ESP32Controller(emulator.port)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert controller.connect(), "Failed to connect to emulator"
+                stats = ProfilePlayer(controller).play(profile)
+                status = controller.get_status()
+        finally:
+            controller.disconnect()
+
+    print(stats.summary())
+
+    assert stats.commands == len(profile)
+    assert stats.failures == 0
+    # Absolute deadlines: total duration matches the profile length
+    assert abs(stats.duration - profile[-1].t) < 0.05, f"Drifted: {stats.duration:.3f} s"
+    assert stats.jitter_p50_ms < 2.0, f"p50 jitter {stats.jitter_p50_ms:.2f} ms"
+    assert stats.commands_per_second > 90.0
+    assert stats.setpoints is not None and stats.setpoints.lost == 0
+    assert status is not None and status.speed == profile[-1].speed
+
+    print("✅ Profile playback timing OK")
+
+if __name__ == "__main__":
+    test_profile_player_timing()
+    print("\n✅ SUCCESS")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Signal Database Test
+
+Checks the signals/ definitions and everything generated from them: the
+host decoders and generators reproduce the original hand-written T6/T7
+layouts, bad definitions are rejected, and the generated C++ encoders
+(VehicleSignals.h) produce the same payloads as message_generators when
+a C++ compiler is available.
+
+Usage:
+    python3 -m pytest test_signal_db.py
+"""
+
+import os
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from message_generators import get_message_generator
+from signal_db import GEARS, generate_cpp_header, get_vehicle_signals, load_vehicle, vehicle_signals
+
+MAIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main")
+
+def test_layouts_match_firmware():
+    t6, t7 = get_vehicle_signals("VWT6"), get_vehicle_signals("VWT7")
+    assert get_vehicle_signals("VWT61") is t6 and get_vehicle_signals("VWT5") is t6
+    assert t6.message_ids() == [0x440, 0x1A0] and t7.message_ids() == [0x3DC, 0x0FD]
+    # 100 km/h: raw 20000 (T6) / 10000 (T7), little endian
+    assert get_message_generator("VWT6").generate_speed_message(100) == bytes([0, 0, 0x20, 0x4E, 0, 0, 0, 0])
+    assert get_message_generator("VWT7").generate_speed_message(100) == bytes([0, 0, 0, 0, 0x10, 0x27, 0, 0])
+    assert get_message_generator("VWT6").generate_gear_message("DRIVE") == bytes([0, 0x50, 0, 0, 0, 0, 0, 0])
+    assert get_message_generator("VWT7").generate_gear_message("BOGUS") == bytes([0, 0, 0, 0, 0, 0x05, 0, 0])
+
+def test_decoders():
+    t6 = get_vehicle_signals("VWT6")
+    assert t6.speed.extract(bytes([0, 0, 0x20, 0x4E])) == 20000
+    assert t6.speed.decode(bytes([0, 0, 0x20, 0x4E])) == 20000 * 0.005
+    assert t6.speed.decode(bytes([0, 0, 0x20])) is None
+    assert t6.gear.decode(bytes([0, 0x77])) == "REVERSE"
+    assert t6.gear.decode(bytes([0, 0x12])) == "UNKNOWN(0x12)"
+    assert t6.gear.decode(bytes([0])) is None
+
+def test_round_trip_every_vehicle():
+    for name, signals in vehicle_signals().items():
+        generator = get_message_generator(name)
+        for speed in range(256):
+            decoded = signals.speed.decode(generator.generate_speed_message(speed))
+            assert speed - signals.speed.factor - 1e-9 <= decoded <= speed
+        for gear in GEARS:
+            assert signals.gear.decode(generator.generate_gear_message(gear)) == gear
+
+def test_big_endian_and_validation(tmp_path):
+    spec = json.load(open(get_vehicle_signals("VWT6").path))
+    spec["signals"]["speed"]["byte_order"] = "big"
+    path = tmp_path / "big.json"
+    path.write_text(json.dumps(spec))
+    speed = load_vehicle(str(path)).speed
+    payload = bytearray(8)
+    speed.pack(payload, 0x1234)
+    assert payload[2:4] == b"\x12\x34" and speed.extract(payload) == 0x1234
+
+    spec["signals"]["gear"]["values"].pop("DRIVE")
+    path.write_text(json.dumps(spec))
+    with pytest.raises(ValueError):
+        load_vehicle(str(path))
+
+@pytest.mark.skipif(shutil.which("g++") is None, reason="needs a C++ compiler")
+def test_generated_cpp_matches_python(tmp_path):
+    vehicles = vehicle_signals()
+    (tmp_path / "VehicleSignals.h").write_text(generate_cpp_header(vehicles))
+    structs = sorted({signals.vehicle for signals in vehicles.values()})
+    calls = "\n".join(f"    dump<vehicle_signals::{name}>();" for name in structs)
+    (tmp_path / "harness.cpp").write_text(f"""
+#include <cstdio>
+#include "VehicleSignals.h"
+template <typename V> void dump() {{
+    uint8_t data[8], dlc;
+    for (int speed = 0; speed < 256; speed++) {{
+        V::encodeSpeed(speed, data, dlc);
+        for (int i = 0; i < dlc; i++) printf("%02X", data[i]);
+        printf("\\n");
+    }}
+    for (int gear = 0; gear < 4; gear++) {{
+        V::encodeGear(static_cast<Gear>(gear), data, dlc);
+        for (int i = 0; i < dlc; i++) printf("%02X", data[i]);
+        printf("\\n");
+    }}
+}}
+int main() {{
+{calls}
+}}
+""")
+    binary = tmp_path / "harness"
+    subprocess.run(["g++", "-std=c++17", "-Wall", "-Werror", f"-I{MAIN_DIR}", f"-I{tmp_path}",
+                    str(tmp_path / "harness.cpp"), "-o", str(binary)], check=True)
+    output = subprocess.run([str(binary)], check=True, capture_output=True, text=True).stdout.split()
+
+    expected = []
+    for name in structs:
+        generator = get_message_generator(name)
+        expected += [generator.generate_speed_message(speed).hex().upper() for speed in range(256)]
+        expected += [generator.generate_gear_message(gear).hex().upper() for gear in GEARS]
+    assert output == expected
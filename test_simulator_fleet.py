@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Simulator Fleet Tests
+
+Runs SimulatorFleet against a rack of loopback ESP32 emulators, including
+boards that cannot be reached or drop out, without hardware.
+
+Usage:
+    python3 -m pytest test_simulator_fleet.py
+"""
+
+import io
+import contextlib
+
+import pytest
+
+from esp32_emulator import ESP32Emulator
+from simulator_fleet import SimulatorFleet, summarize
+
+BOARDS = 6
+
+@pytest.fixture
+def emulators():
+    rack = [ESP32Emulator(log_commands=False, transport="loopback") for _ in range(BOARDS)]
+    for emulator in rack:
+        emulator.start()
+    yield rack
+    for emulator in rack:
+        emulator.stop()
+
+@pytest.fixture
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def test_broadcast_and_scatter(emulators, quiet):
+    ports = [emulator.port for emulator in emulators]
+    with SimulatorFleet(ports, max_workers=4) as fleet:
+        assert len(fleet) == BOARDS
+
+        results = fleet.broadcast("apply_state", vehicle="VWT7", gear="DRIVE", speed=30)
+        assert sorted(results) == sorted(ports)
+        assert all(result.ok and result.error is None for result in results.values())
+        assert all((e.vehicle, e.gear, e.speed) == ("VWT7", "DRIVE", 30) for e in emulators)
+
+        speeds = {port: {"speed": 10 * i} for i, port in enumerate(ports)}
+        assert all(result.ok for result in fleet.scatter("set_speed", speeds).values())
+        assert [emulator.speed for emulator in emulators] == [10 * i for i in range(BOARDS)]
+
+        statuses = fleet.broadcast(lambda controller: controller.get_status())
+        assert [statuses[port].value.speed for port in ports] == [10 * i for i in range(BOARDS)]
+        assert f"{BOARDS}/{BOARDS} ok" in summarize(statuses)
+
+def test_unreachable_board_is_left_out(emulators, quiet):
+    ports = [emulator.port for emulator in emulators] + ["loopback://nobody-home"]
+    fleet = SimulatorFleet(ports, ready_timeout=0.5)
+    try:
+        results = fleet.connect()
+        assert not results["loopback://nobody-home"].ok
+        assert "nobody-home" not in "".join(fleet.controllers)
+        assert len(fleet) == BOARDS
+        assert all(result.ok for result in fleet.broadcast("ping").values())
+    finally:
+        fleet.disconnect()
+
+def test_failing_member_does_not_fail_the_fleet(emulators, quiet):
+    ports = [emulator.port for emulator in emulators]
+    with SimulatorFleet(ports) as fleet:
+        dead = emulators[2]
+        dead.stop()   # Board unplugged mid-session
+
+        results = fleet.broadcast("set_speed", 55)
+        assert not results[dead.port].ok and results[dead.port].error
+        alive = [emulator for emulator in emulators if emulator is not dead]
+        assert all(results[emulator.port].ok for emulator in alive)
+        assert all(emulator.speed == 55 for emulator in alive)
+        assert f"{BOARDS - 1}/{BOARDS} ok" in summarize(results)
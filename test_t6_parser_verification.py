@@ -14,6 +14,9 @@ import can
 import time
 import sys
 from esp32_controller import ESP32Controller
+from signal_db import get_vehicle_signals
+
+T6 = get_vehicle_signals("VWT6")
 
 def simulate_parser_extraction(can_data, message_type):
     """Simulate what the C++ parser would extract from our CAN data"""
@@ -21,20 +24,14 @@ def simulate_parser_extraction(can_data, message_type):
     if message_type == "speed":
         # Parser does: tmp = (payload[3] << 8) | payload[2]
         # Then: speed_f = tmp * 0.005
-        raw_value = (can_data[3] << 8) | can_data[2]
-        speed_kmh = raw_value * 0.005
+        raw_value = T6.speed.extract(can_data)
+        speed_kmh = raw_value * T6.speed.factor
         return raw_value, speed_kmh
     
     elif message_type == "gear":
         # Parser does: lastGearRawValue = payload[1]
-        gear_raw = can_data[1]
-        gear_mapping = {
-            0x80: "PARK",
-            0x77: "REVERSE", 
-            0x60: "NEUTRAL",
-            0x50: "DRIVE"
-        }
-        gear_name = gear_mapping.get(gear_raw, f"UNKNOWN(0x{gear_raw:02X})")
+        gear_raw = T6.gear.extract(can_data)
+        gear_name = T6.gear.name_of(gear_raw)
         return gear_raw, gear_name
 
 def test_t6_parser_verification():
@@ -77,7 +74,7 @@ def test_t6_parser_verification():
         speed_found = False
         for _ in range(30):  # 3 seconds
             message = can_bus.recv(timeout=0.1)
-            if message and message.arbitration_id == 0x01A0:
+            if message and message.arbitration_id == T6.speed.message_id:
                 print(f"📨 Raw CAN: ID=0x{message.arbitration_id:03X}, Data=[{' '.join(f'{b:02X}' for b in message.data)}]")
                 
                 # Simulate parser extraction
@@ -114,7 +111,7 @@ def test_t6_parser_verification():
         gear_found = False
         for _ in range(30):  # 3 seconds
             message = can_bus.recv(timeout=0.1)
-            if message and message.arbitration_id == 0x0440:
+            if message and message.arbitration_id == T6.gear.message_id:
                 print(f"📨 Raw CAN: ID=0x{message.arbitration_id:03X}, Data=[{' '.join(f'{b:02X}' for b in message.data)}]")
                 
                 # Simulate parser extraction
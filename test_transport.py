@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Transport Tests
+
+Exercises the loopback and TCP transports without hardware: a round trip
+over a loopback pair, and waking or closing a TCP link while another
+thread is blocked in read().
+
+Usage:
+    python3 -m pytest test_transport.py
+"""
+
+import time
+import socket
+import threading
+
+import pytest
+
+from transport import LoopbackTransport, TcpTransport
+
+def _blocked_reader(link):
+    """Start a thread blocked in link.read(); returns (thread, results)"""
+    results = {}
+
+    def reader():
+        try:
+            results["data"] = link.read(64)
+        except Exception as e:   # Reported to the test thread
+            results["error"] = e
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    time.sleep(0.1)   # Let it reach select()
+    assert thread.is_alive(), "read() returned before anything was sent"
+    return thread, results
+
+@pytest.fixture
+def tcp_link():
+    server = socket.create_server(("127.0.0.1", 0))
+    link = TcpTransport("127.0.0.1", server.getsockname()[1], timeout=None)
+    link.open()
+    peer, _ = server.accept()
+    yield link, peer
+    link.close()
+    peer.close()
+    server.close()
+
+def test_loopback_round_trip():
+    """Bytes written at one end arrive in order at the other"""
+    host, device = LoopbackTransport.pair(timeout=1.0)
+    host.write(b'{"command": "ping", "id": 1}\r\n')
+    assert device.in_waiting == 30
+    assert device.read(100) == b'{"command": "ping", "id": 1}\r\n'
+
+    device.write(b"pong")
+    assert host.read(2) == b"po"
+    assert host.read(10) == b"ng"
+
+    device.close()
+    with pytest.raises(ConnectionError):
+        host.read(1)
+
+def test_tcp_round_trip(tcp_link):
+    link, peer = tcp_link
+    link.write(b"ping\n")
+    assert peer.recv(64) == b"ping\n"
+    peer.sendall(b"pong\n")
+    assert link.read(64) == b"pong\n"
+
+def test_tcp_cancel_read_wakes_reader(tcp_link):
+    """cancel_read() returns a blocked read() empty-handed, the link stays usable"""
+    link, peer = tcp_link
+    thread, results = _blocked_reader(link)
+    link.cancel_read()
+    thread.join(timeout=1.0)
+    assert not thread.is_alive()
+    assert results == {"data": b""}
+
+    peer.sendall(b"still open")
+    assert link.read(64) == b"still open"
+
+def test_tcp_close_while_reading(tcp_link):
+    """close() from another thread ends a blocked read() without EBADF"""
+    link, _ = tcp_link
+    thread, results = _blocked_reader(link)
+    link.close()
+    thread.join(timeout=1.0)
+    assert not thread.is_alive()
+    assert results == {"data": b""}
+
+    assert not link.is_open
+    assert link.read(64) == b""
+    assert link.in_waiting == 0
+    link.cancel_read()   # No-op once closed
+    link.close()
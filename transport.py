@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Byte-stream transports for the ESP32 controllers
+
+ESP32Controller talks to the firmware through an object with the subset of
+the pyserial API it needs (read/write/flush, in_waiting, timeout,
+reset_input_buffer, cancel_read, dtr/rts, is_open, close).
+open_transport() picks the implementation from the port string:
+
+    /dev/ttyACM0, COM3          serial.Serial (USB serial, the default)
+    socket://host:port          TcpTransport, e.g. ser2net or a WiFi bridge
+                                (same URL scheme as pyserial's serial_for_url,
+                                so the asyncio controller accepts it too)
+    loopback://name             LoopbackTransport, in-memory pipe to an
+                                in-process ESP32Emulator(transport="loopback")
+
+TCP and loopback links ignore DTR/RTS and baud rate. A closed peer shows up
+as ConnectionError from read(), like a serial device that disappeared.
+
+Usage:
+    link = open_transport("socket://192.168.4.1:3333", timeout=1.0)
+    link.write(b'{"command": "ping", "id": 1}\\r\\n')
+
+    host, device = LoopbackTransport.pair()
+"""
+
+import os
+import socket
+import select
+import threading
+from typing import Optional, Dict, Callable, Tuple
+
+import serial
+
+SOCKET_SCHEME = "socket://"
+LOOPBACK_SCHEME = "loopback://"
+
+class TcpTransport:
+    """
+    Serial-like TCP client; cancel_read() wakes a blocked read() through a self-pipe.
+
+    close() may be called from another thread while read() is blocked: it
+    wakes the reader, waits for it to leave select() and only then closes
+    the socket and the pipe, after which read() returns b"".
+    """
+
+    def __init__(self, host: str, port: int, timeout: Optional[float] = 1.0,
+                 write_timeout: Optional[float] = None, sock: Optional[socket.socket] = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.dtr = None   # Accepted and ignored
+        self.rts = None
+        self._sock = sock
+        self._rx = bytearray()
+        self._cancel_r, self._cancel_w = os.pipe()
+        self._closed = False
+        self._lock = threading.Lock()        # Guards _closed and the cancel pipe's write end
+        self._read_lock = threading.Lock()   # Held while a reader uses the socket and pipe
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "TcpTransport":
+        host, _, port = url[len(SOCKET_SCHEME):].rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Expected socket://host:port, got '{url}'")
+        return cls(host, int(port), **kwargs)
+
+    @property
+    def is_open(self) -> bool:
+        return self._sock is not None and not self._closed
+
+    def open(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.write_timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            os.write(self._cancel_w, b"x")   # Wake a reader blocked in select()
+        with self._read_lock, self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+            os.close(self._cancel_r)
+            os.close(self._cancel_w)
+            self._cancel_r = self._cancel_w = None
+
+    def _fill(self, timeout: Optional[float]):
+        """Append received bytes to the buffer, waiting up to timeout"""
+        with self._read_lock:
+            if self._closed or self._sock is None:
+                return
+            ready, _, _ = select.select([self._sock, self._cancel_r], [], [], timeout)
+            if self._cancel_r in ready:
+                os.read(self._cancel_r, 64)
+                return
+            if self._sock in ready:
+                chunk = self._sock.recv(4096)
+                if not chunk:
+                    raise ConnectionError(f"Connection to {self.host}:{self.port} closed")
+                self._rx += chunk
+
+    @property
+    def in_waiting(self) -> int:
+        self._fill(0)
+        return len(self._rx)
+
+    def read(self, size: int = 1) -> bytes:
+        """Up to size bytes; waits up to timeout for the first one (b"" once closed)"""
+        if not self._rx:
+            self._fill(self.timeout)
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def write(self, data: bytes) -> int:
+        self._sock.sendall(data)
+        return len(data)
+
+    def flush(self):
+        pass  # sendall() has handed everything to the kernel
+
+    def reset_input_buffer(self):
+        while self.is_open and self.in_waiting:
+            self._rx.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def cancel_read(self):
+        with self._lock:
+            if not self._closed:
+                os.write(self._cancel_w, b"x")
+
+class _Pipe:
+    """One direction of a loopback link"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.closed = False
+        self.cond = threading.Condition()
+
+class LoopbackTransport:
+    """One end of an in-memory byte link; create both ends with pair()"""
+
+    def __init__(self, rx: _Pipe, tx: _Pipe, timeout: Optional[float] = 1.0):
+        self._rx = rx
+        self._tx = tx
+        self.timeout = timeout
+        self.write_timeout = None
+        self.dtr = None   # Accepted and ignored
+        self.rts = None
+        self._open = True
+        self._cancelled = False
+
+    @classmethod
+    def pair(cls, timeout: Optional[float] = 1.0) -> Tuple["LoopbackTransport", "LoopbackTransport"]:
+        a_to_b, b_to_a = _Pipe(), _Pipe()
+        return cls(b_to_a, a_to_b, timeout), cls(a_to_b, b_to_a, timeout)
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    def close(self):
+        if self._open:
+            self._open = False
+            for pipe in (self._rx, self._tx):
+                with pipe.cond:
+                    pipe.closed = True
+                    pipe.cond.notify_all()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._rx.buffer)
+
+    def read(self, size: int = 1) -> bytes:
+        """Up to size bytes; waits up to timeout for the first one"""
+        pipe = self._rx
+        with pipe.cond:
+            if not pipe.buffer and not pipe.closed:
+                pipe.cond.wait_for(lambda: pipe.buffer or pipe.closed or self._cancelled, self.timeout)
+            self._cancelled = False
+            if not pipe.buffer and pipe.closed:
+                raise ConnectionError("Loopback peer closed")
+            data = bytes(pipe.buffer[:size])
+            del pipe.buffer[:size]
+            return data
+
+    def write(self, data: bytes) -> int:
+        pipe = self._tx
+        with pipe.cond:
+            if pipe.closed:
+                raise ConnectionError("Loopback peer closed")
+            pipe.buffer += data
+            pipe.cond.notify_all()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self._rx.cond:
+            self._rx.buffer.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def cancel_read(self):
+        with self._rx.cond:
+            self._cancelled = True
+            self._rx.cond.notify_all()
+
+# loopback://name -> called with the device end of every new connection
+_loopback_listeners: Dict[str, Callable[[LoopbackTransport], None]] = {}
+_loopback_lock = threading.Lock()
+
+def register_loopback(name: str, accept: Callable[[LoopbackTransport], None]):
+    """Serve loopback://name; accept receives the device end of each connection"""
+    with _loopback_lock:
+        _loopback_listeners[name] = accept
+
+def unregister_loopback(name: str):
+    with _loopback_lock:
+        _loopback_listeners.pop(name, None)
+
+def open_transport(port: str, baudrate: int = 115200, timeout: Optional[float] = 1.0,
+                   write_timeout: Optional[float] = None, dtr: Optional[bool] = None,
+                   rts: Optional[bool] = None):
+    """Open the transport for a port name or URL (see module docstring)"""
+    if port.startswith(SOCKET_SCHEME):
+        link = TcpTransport.from_url(port, timeout=timeout, write_timeout=write_timeout)
+        link.open()
+        return link
+
+    if port.startswith(LOOPBACK_SCHEME):
+        name = port[len(LOOPBACK_SCHEME):]
+        with _loopback_lock:
+            accept = _loopback_listeners.get(name)
+        if accept is None:
+            raise ConnectionError(f"Nothing is listening on {port}")
+        host, device = LoopbackTransport.pair(timeout)
+        accept(device)
+        return host
+
+    # Configure before opening so the requested DTR/RTS levels are applied
+    # by open() itself instead of toggling afterwards
+    link = serial.Serial()
+    link.port = port
+    link.baudrate = baudrate
+    link.timeout = timeout
+    link.write_timeout = write_timeout
+    if dtr is not None:
+        link.dtr = dtr
+    if rts is not None:
+        link.rts = rts
+    link.open()
+    return link